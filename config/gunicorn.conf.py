@@ -0,0 +1,49 @@
+# config/gunicorn.conf.py
+"""
+Configuration gunicorn de production, utilisée par `python manage.py serve`
+(ou directement : gunicorn -c config/gunicorn.conf.py config.wsgi:application).
+
+Réglages par variables d'environnement :
+  PORT                   port d'écoute (défaut 8000)
+  WEB_CONCURRENCY        nombre de workers (défaut : 2 × CPU + 1)
+  GUNICORN_WORKER_CLASS  gthread (défaut) ; uvicorn.workers.UvicornWorker
+                         pour servir config.asgi (paquet uvicorn requis)
+  GUNICORN_THREADS       threads par worker gthread (défaut 4)
+  GUNICORN_MAX_REQUESTS  recyclage d'un worker après N requêtes (défaut 1000)
+  GUNICORN_TIMEOUT       délai avant redémarrage d'un worker bloqué (défaut 300,
+                         comme FILE_UPLOAD_TIMEOUT)
+
+L'application est préchargée dans le maître (mémoire partagée entre workers,
+démarrage rapide). Conséquence : HUP redémarre les workers sans relire le
+code ; pour déployer sans coupure, USR2 (nouveau maître) puis QUIT à l'ancien.
+"""
+import multiprocessing
+
+from decouple import config
+
+bind = f"0.0.0.0:{config('PORT', default=8000, cast=int)}"
+worker_class = config("GUNICORN_WORKER_CLASS", default="gthread")
+workers = config("WEB_CONCURRENCY", default=multiprocessing.cpu_count() * 2 + 1, cast=int)
+threads = config("GUNICORN_THREADS", default=4, cast=int)
+
+preload_app = True
+
+# Recyclage des workers (fuites mémoire), étalé pour ne pas tous les relancer ensemble
+max_requests = config("GUNICORN_MAX_REQUESTS", default=1000, cast=int)
+max_requests_jitter = max(max_requests // 10, 1) if max_requests else 0
+
+timeout = config("GUNICORN_TIMEOUT", default=300, cast=int)
+graceful_timeout = config("GUNICORN_GRACEFUL_TIMEOUT", default=30, cast=int)
+keepalive = 5
+
+accesslog = "-"
+errorlog = "-"
+loglevel = config("GUNICORN_LOG_LEVEL", default="info")
+pidfile = config("GUNICORN_PIDFILE", default=None)
+
+
+def post_fork(server, worker):
+    # Connexions éventuellement ouvertes pendant le préchargement : jamais partagées entre processus
+    from django.db import connections
+
+    connections.close_all()
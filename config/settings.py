@@ -15,7 +15,9 @@ BASE_DIR = Path(__file__).resolve().parent.parent
 SECRET_KEY = config('SECRET_KEY')
 
 # SECURITY WARNING: don't run with debug turned on in production!
-DEBUG = True
+# DEBUG=True en développement uniquement : il enregistre chaque requête SQL
+# (connection.queries) et sert les fichiers statiques
+DEBUG = config("DEBUG", default=False, cast=bool)
 
 ALLOWED_HOSTS = [
    
@@ -102,10 +104,31 @@ ASGI_APPLICATION = "config.asgi.application"
 # Database
 # https://docs.djangoproject.com/en/5.2/ref/settings/#databases
 
+# SQLite : WAL (les lecteurs ne bloquent plus l'écrivain), attente sur verrou
+# au lieu d'un « database is locked » immédiat, cache et mmap plus grands.
+# Appliqué à chaque connexion (init_command) ; mesure : manage.py benchmark_sqlite
+SQLITE_PRAGMAS = {
+    'journal_mode': 'WAL',
+    'synchronous': 'NORMAL',       # sûr en WAL : seul le dernier commit peut être perdu sur coupure
+    'busy_timeout': config('SQLITE_BUSY_TIMEOUT', default=5000, cast=int),   # ms
+    'mmap_size': 256 * 1024 * 1024,
+    'cache_size': -64000,          # en Kio (≈ 64 Mo par connexion)
+    'temp_store': 'MEMORY',
+}
+
 DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
         'NAME': BASE_DIR / 'db.sqlite3',
+        # Connexions persistantes (une par thread de worker), vérifiées avant réutilisation
+        'CONN_MAX_AGE': config('CONN_MAX_AGE', default=600, cast=int),
+        'CONN_HEALTH_CHECKS': True,
+        'OPTIONS': {
+            # Verrou d'écriture pris dès le BEGIN : pas d'échec à la promotion
+            # lecture → écriture au milieu d'une transaction
+            'transaction_mode': 'IMMEDIATE',
+            'init_command': ';'.join(f'PRAGMA {nom}={valeur}' for nom, valeur in SQLITE_PRAGMAS.items()),
+        },
     }
 }
 
@@ -161,6 +184,8 @@ USE_TZ = True
 
 MEDIA_URL = '/media/'
 MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
+# Fichiers media servis par Django (sinon par le proxy frontal, ex. nginx)
+SERVE_MEDIA = config("SERVE_MEDIA", default=True, cast=bool)
 # dossiers collectés par « collectstatic »
 
 STATIC_URL = '/static/'  # This line must be present and correctly set
@@ -173,7 +198,7 @@ DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
 REST_FRAMEWORK = {
     "DEFAULT_AUTHENTICATION_CLASSES": (
-        "rest_framework_simplejwt.authentication.JWTAuthentication",
+        "users.authentication.RoleClaimsJWTAuthentication",
     ),
     "DEFAULT_PERMISSION_CLASSES": (
         "rest_framework.permissions.IsAuthenticated",
@@ -193,8 +218,40 @@ SIMPLE_JWT = {
     "ROTATE_REFRESH_TOKENS": True,
     "BLACKLIST_AFTER_ROTATION": True,
     "AUTH_HEADER_TYPES": ("Bearer",),
+    # Liste de refus des JTI (users/revocation.py) au lieu de token_blacklist
+    "AUTH_TOKEN_CLASSES": ("users.revocation.DenylistAccessToken",),
 }
 
+# Rôles universitaires embarqués dans les JWT (cf. users/authentication.py).
+# Nécessite un cache partagé entre workers (versions de rôles).
+JWT_ROLE_CLAIMS = config("JWT_ROLE_CLAIMS", default=False, cast=bool)
+
+# Verrouillage après échecs de connexion successifs (par IP)
+LOGIN_MAX_FAILURES = config("LOGIN_MAX_FAILURES", default=5, cast=int)
+LOGIN_FAILURE_WINDOW = config("LOGIN_FAILURE_WINDOW", default=300, cast=int)
+
+# Journal d'audit : insertion différée par lots (users/audit_sink.py)
+AUDIT_ASYNC = config("AUDIT_ASYNC", default=True, cast=bool)
+AUDIT_BUFFER_SIZE = config("AUDIT_BUFFER_SIZE", default=200, cast=int)
+AUDIT_FLUSH_INTERVAL = config("AUDIT_FLUSH_INTERVAL", default=2.0, cast=float)
+AUDIT_FALLBACK_FILE = config("AUDIT_FALLBACK_FILE", default=str(BASE_DIR / "audit_fallback.jsonl"))
+# Données avant/après : diff, textes longs tronqués ("truncate") ou hachés ("hash"),
+# compression zlib optionnelle (users/audit_payload.py)
+AUDIT_TEXT_MAX = config("AUDIT_TEXT_MAX", default=1000, cast=int)
+AUDIT_TEXT_POLICY = config("AUDIT_TEXT_POLICY", default="truncate")
+AUDIT_PAYLOAD_COMPRESS = config("AUDIT_PAYLOAD_COMPRESS", default=False, cast=bool)
+AUDIT_COMPRESS_MIN = config("AUDIT_COMPRESS_MIN", default=1024, cast=int)
+# Un couple avant/après complet par cible tous les N logs (base des reconstructions)
+AUDIT_SNAPSHOT_EVERY = config("AUDIT_SNAPSHOT_EVERY", default=20, cast=int)
+# Alertes CRITICAL : envoi hors requête, regroupées par (université, action)
+# sur une fenêtre, plafond par destinataire (users/audit_alerts.py)
+AUDIT_ALERT_ASYNC = config("AUDIT_ALERT_ASYNC", default=True, cast=bool)
+AUDIT_ALERT_WINDOW = config("AUDIT_ALERT_WINDOW", default=300, cast=int)
+AUDIT_ALERT_RECIPIENT_RATE = config("AUDIT_ALERT_RECIPIENT_RATE", default="20/h")
+AUDIT_ALERT_RECIPIENTS_TTL = config("AUDIT_ALERT_RECIPIENTS_TTL", default=600, cast=int)
+# Refus 401/403 répétés (même IP, même route) : résumés par fenêtre (users/middleware.py)
+AUDIT_DENIED_WINDOW = config("AUDIT_DENIED_WINDOW", default=60, cast=int)
+
 # Configure email backend for sending verification / reset emails
 
 EMAIL_BACKEND = 'django.core.mail.backends.smtp.EmailBackend'
@@ -210,12 +267,23 @@ EMAIL_USE_TLS = config('EMAIL_USE_TLS')
 REST_FRAMEWORK = {
     "DEFAULT_SCHEMA_CLASS": "drf_spectacular.openapi.AutoSchema",
     "DEFAULT_AUTHENTICATION_CLASSES": (
-        "rest_framework_simplejwt.authentication.JWTAuthentication",
+        "users.authentication.RoleClaimsJWTAuthentication",
     ),
     "DEFAULT_PERMISSION_CLASSES": (
         "rest_framework.permissions.IsAuthenticated",
     ),
     'EXCEPTION_HANDLER': 'rest_framework.views.exception_handler',
+    # Limitation déclarative : `throttle_scope = "<scope>"` sur la vue (users/throttling.py)
+    'DEFAULT_THROTTLE_CLASSES': [
+        'users.throttling.ScopedSlidingWindowThrottle',
+    ],
+    'DEFAULT_THROTTLE_RATES': {
+        'login': config('THROTTLE_LOGIN', default='20/min'),
+        'register': config('THROTTLE_REGISTER', default='10/hour'),
+        'password_reset': config('THROTTLE_PASSWORD_RESET', default='5/15m'),
+        'invitations': config('THROTTLE_INVITATIONS', default='60/hour'),
+        'interactions': config('THROTTLE_INTERACTIONS', default='120/min'),
+    },
 }
 
 SPECTACULAR_SETTINGS = {
@@ -274,21 +342,59 @@ CORS_ALLOW_METHODS = [
 
 # Redis vars
 # REDIS_HOST = config("REDIS_HOST", default="127.0.0.1")
-REDIS_URL = config("REDIS_URL", default="redis://redis:6379")
+REDIS_URL_CONFIGURED = config("REDIS_URL", default=None)
+REDIS_URL = REDIS_URL_CONFIGURED or "redis://redis:6379"
 # REDIS_PORT = config("REDIS_PORT", default=6379, cast=int)
 # REDIS_DB = config("REDIS_DB", default=0, cast=int)
 # REDIS_PASSWORD = config("REDIS_PASSWORD", default=None)
 
 
-# Redis pour la communication en temps réel
-CHANNEL_LAYERS = {
+# Cache partagé entre workers (limitation de débit, rôles, universités, révocation JWT)
+# CACHE_BACKEND : redis (défaut si REDIS_URL est défini), db (défaut sinon, table
+# créée par « manage.py createcachetable »), file (CACHE_LOCATION, dev uniquement :
+# chaque écriture liste le répertoire) ou locmem (par processus, dev/tests uniquement)
+CACHE_BACKEND = config("CACHE_BACKEND", default="redis" if REDIS_URL_CONFIGURED else "db")
+CACHE_LOCATION = config("CACHE_LOCATION", default=str(BASE_DIR / ".cache"))
+_CACHE_BACKENDS = {
+    "redis": ("django.core.cache.backends.redis.RedisCache", REDIS_URL),
+    "file": ("django.core.cache.backends.filebased.FileBasedCache", CACHE_LOCATION),
+    "db": ("django.core.cache.backends.db.DatabaseCache", "django_cache"),
+    "locmem": ("django.core.cache.backends.locmem.LocMemCache", "memocloud"),
+}
+CACHES = {
     "default": {
-        "BACKEND": "channels_redis.core.RedisChannelLayer",
-        "CONFIG": {
-            "hosts": [REDIS_URL],  # ou ("127.0.0.1", 6379) en local
-        },
-    },
+        "BACKEND": _CACHE_BACKENDS[CACHE_BACKEND][0],
+        "LOCATION": _CACHE_BACKENDS[CACHE_BACKEND][1],
+        "KEY_PREFIX": "mcb",
+        "TIMEOUT": 300,
+        # file/db : nettoyage (liste du répertoire, COUNT(*)) à chaque écriture, coût
+        # proportionnel au nombre d'entrées
+        "OPTIONS": {"MAX_ENTRIES": {"file": 1000, "db": 5000, "locmem": 10000}.get(CACHE_BACKEND)}
+        if CACHE_BACKEND != "redis" else {},
+    }
 }
+
+
+# Redis pour la communication en temps réel
+# CHANNEL_LAYER_BACKEND=memory → couche en mémoire (tests, dev sans Redis)
+CHANNEL_LAYER_BACKEND = config("CHANNEL_LAYER_BACKEND", default="redis")
+if CHANNEL_LAYER_BACKEND == "memory":
+    CHANNEL_LAYERS = {
+        "default": {"BACKEND": "channels.layers.InMemoryChannelLayer"},
+    }
+else:
+    CHANNEL_LAYERS = {
+        "default": {
+            "BACKEND": "channels_redis.core.RedisChannelLayer",
+            "CONFIG": {
+                "hosts": [REDIS_URL],  # ou ("127.0.0.1", 6379) en local
+            },
+        },
+    }
+
+# Fenêtre (s) de regroupement des événements WebSocket ; 0 = envoi immédiat.
+# Ignorée (envoi immédiat) avec CHANNEL_LAYER_BACKEND=memory : cf. interactions/realtime.py
+REALTIME_COALESCE_WINDOW = config("REALTIME_COALESCE_WINDOW", default=0.5, cast=float)
 from cryptography.fernet import Fernet
 
 # clé 32 bytes base64 → générée une fois : Fernet.generate_key()
@@ -1,6 +1,9 @@
 # config/urls.py
+import re
+
 from django.contrib import admin
-from django.urls import path, include
+from django.urls import path, include, re_path
+from django.views.static import serve
 from django.conf import settings
 from django.conf.urls.static import static
 from django.views.generic import RedirectView
@@ -33,7 +36,13 @@ urlpatterns = [
     # path('api/', include(router.urls)),
 ]
 
-# Media & Static (uniquement en développement)
+# Media : servis par Django tant que SERVE_MEDIA (static() ne sert qu'en DEBUG)
+if settings.SERVE_MEDIA:
+    urlpatterns += [
+        re_path(r'^%s(?P<path>.*)$' % re.escape(settings.MEDIA_URL.lstrip('/')), serve,
+                {'document_root': settings.MEDIA_ROOT}),
+    ]
+
+# Static (uniquement en développement ; WhiteNoise en production)
 if settings.DEBUG:
-    urlpatterns += static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT)
     urlpatterns += static(settings.STATIC_URL, document_root=settings.STATIC_ROOT)
\ No newline at end of file
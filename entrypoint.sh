@@ -11,6 +11,8 @@ echo "Applying Django migrations (fake-initial)..."
 echo "---------------------------------"
 # --fake-initial : ignore les tables déjà créées
 python manage.py migrate --fake-initial
+# Table du cache (CACHE_BACKEND=db, défaut sans REDIS_URL) ; sans effet si elle existe
+python manage.py createcachetable
 
 echo "---------------------------------"
 echo "Collecting static files..."
@@ -28,4 +30,9 @@ echo "---------------------------------"
 echo "Starting Django server..."
 echo "---------------------------------"
 # Utiliser exec pour remplacer le shell et ne pas bloquer le container
-exec python3 manage.py runserver 0.0.0.0:8000
\ No newline at end of file
+# Production : gunicorn (ou daphne si SERVE_ASGI=True), cf. manage.py serve
+# Développement : SERVER=runserver
+if [ "$SERVER" = "runserver" ]; then
+    exec python3 manage.py runserver 0.0.0.0:${PORT:-8000}
+fi
+exec python3 manage.py serve
\ No newline at end of file
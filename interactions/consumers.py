@@ -0,0 +1,34 @@
+# interactions/consumers.py
+from channels.generic.websocket import AsyncJsonWebsocketConsumer
+
+from interactions.realtime import memoire_group, universite_group
+
+
+class EngagementConsumer(AsyncJsonWebsocketConsumer):
+    """
+    Flux en lecture seule des interactions d'un mémoire ou d'une université.
+    ws/interactions/memoires/<memoire_id>/
+    ws/interactions/universites/<univ_slug>/
+    Les données diffusées sont déjà publiques (mêmes que les listes AllowAny).
+    """
+
+    async def connect(self):
+        kwargs = self.scope["url_route"]["kwargs"]
+        if "memoire_id" in kwargs:
+            self.group_name = memoire_group(kwargs["memoire_id"])
+        else:
+            self.group_name = universite_group(kwargs["univ_slug"])
+        await self.channel_layer.group_add(self.group_name, self.channel_name)
+        await self.accept()
+
+    async def disconnect(self, code):
+        if hasattr(self, "group_name"):
+            await self.channel_layer.group_discard(self.group_name, self.channel_name)
+
+    async def receive_json(self, content, **kwargs):
+        # Seul un ping applicatif est accepté (keep-alive côté client)
+        if content.get("type") == "ping":
+            await self.send_json({"type": "pong"})
+
+    async def engagement_update(self, event):
+        await self.send_json({"type": "engagement", **event["payload"]})
@@ -0,0 +1,17 @@
+# Generated by Django 5.2.6 on 2026-10-19 05:44
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('interactions', '0003_initial'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='commentaire',
+            index=models.Index(fields=['memoire', 'modere', '-date', '-id'], name='interactions_com_mem_mod_date'),
+        ),
+    ]
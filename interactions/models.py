@@ -65,6 +65,33 @@ class Commentaire(models.Model):
 
     class Meta:
         ordering = ['-date']
+        indexes = [
+            # Couvre filtre (memoire, modere) + tri (date, id) de la pagination keyset
+            models.Index(
+                fields=['memoire', 'modere', '-date', '-id'],
+                name='interactions_com_mem_mod_date',
+            ),
+        ]
 
     def __str__(self):
-        return f"{self.utilisateur} sur {self.memoire} : {self.contenu[:50]}..."
\ No newline at end of file
+        return f"{self.utilisateur} sur {self.memoire} : {self.contenu[:50]}..."
+
+    @classmethod
+    def publics(cls, memoire_id, since=None, user_fields=("id", "nom", "prenom", "photo_profil")):
+        """
+        Commentaires visibles d'un mémoire, auteur joint en une requête.
+        `user_fields` : colonnes de l'auteur réellement sérialisées.
+        """
+        # modere__in plutôt que modere=False : SQLite traduit ce dernier en
+        # « NOT modere », qui empêche l'usage de la 2e colonne de l'index
+        qs = cls.objects.filter(memoire_id=memoire_id, modere__in=[False])
+        if since is not None:
+            qs = qs.filter(date__gt=since)
+        return (
+            qs.select_related("utilisateur")
+            .only(
+                "id", "memoire_id", "contenu", "date", "modere", "utilisateur_id",
+                *(f"utilisateur__{f}" for f in user_fields),
+            )
+            .order_by("-date", "-id")
+        )
@@ -0,0 +1,52 @@
+# interactions/pagination.py
+import base64
+import json
+
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+from rest_framework import pagination
+from rest_framework.exceptions import ValidationError
+
+
+class CommentaireCursorPagination(pagination.CursorPagination):
+    """
+    Pagination keyset des commentaires d'un mémoire : ?cursor=... (next/previous).
+    Ordre aligné sur l'index interactions_com_mem_mod_date.
+    """
+    page_size = 20
+    page_size_query_param = "page_size"
+    max_page_size = 100
+    ordering = ("-date", "-id")
+
+
+def parse_since(request):
+    """?since=<datetime ISO 8601> → datetime aware, None si absent."""
+    raw = request.query_params.get("since")
+    if not raw:
+        return None
+    since = parse_datetime(raw)
+    if since is None:
+        raise ValidationError({"since": "Date ISO 8601 attendue (ex. 2025-01-31T12:00:00Z)."})
+    if timezone.is_naive(since):
+        since = timezone.make_aware(since)
+    return since
+
+
+def encode_cursor(values):
+    """Curseur opaque (base64 JSON) pour les paginations keyset faites à la main."""
+    raw = json.dumps(values, separators=(",", ":"), default=str)
+    return base64.urlsafe_b64encode(raw.encode()).decode()
+
+
+def decode_cursor(request, size):
+    """?cursor=... → liste de `size` valeurs, None si absent."""
+    raw = request.query_params.get("cursor")
+    if not raw:
+        return None
+    try:
+        values = json.loads(base64.urlsafe_b64decode(raw.encode()))
+    except (ValueError, TypeError):
+        values = None
+    if not isinstance(values, list) or len(values) != size:
+        raise ValidationError({"cursor": "Curseur invalide."})
+    return values
@@ -1,6 +1,8 @@
 # interactions/permissions.py
 from rest_framework import permissions
 
+from universites.roles import ADMIN_ROLES, has_role
+
 
 class IsAuthenticated(permissions.BasePermission):
     def has_permission(self, request, view):
@@ -11,14 +13,10 @@ class IsAdminOrModerateur(permissions.BasePermission):
     def has_permission(self, request, view):
         return request.user.is_staff or request.user.groups.filter(name='moderateur').exists()
 class IsAdminOfUniversite(permissions.BasePermission):
-    admin_roles = {'admin', 'superadmin', 'bigboss'}
+    admin_roles = ADMIN_ROLES
 
     def has_permission(self, request, view):
         if not request.user.is_authenticated:
             return False
         slug = view.kwargs.get('univ_slug')
-        return permissions.models.RoleUniversite.objects.filter(
-            utilisateur=request.user,
-            universite__slug=slug,
-            role__in=self.admin_roles
-        ).exists()    
\ No newline at end of file
+        return has_role(request.user, self.admin_roles, slug=slug)    
\ No newline at end of file
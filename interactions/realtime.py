@@ -0,0 +1,214 @@
+# interactions/realtime.py
+"""
+Diffusion temps réel des interactions (commentaires, likes, téléchargements,
+modération) vers les groupes Channels :
+
+    memoire_<id>          → clients abonnés à un mémoire
+    universite_<slug>     → clients abonnés à une université
+
+Les événements sont regroupés par fenêtre courte (REALTIME_COALESCE_WINDOW,
+en secondes) : un mémoire viral produit un message par fenêtre et par groupe,
+avec des compteurs cumulés, au lieu d'un message par clic.
+Avec une fenêtre à 0 l'envoi est immédiat. Le regroupement suppose
+channels_redis : avec InMemoryChannelLayer, la fenêtre est forcée à 0 (les
+files de la couche appartiennent à la boucle du serveur ; un envoi depuis le
+thread du minuteur, sur une autre boucle, n'atteindrait aucun consommateur).
+"""
+import logging
+import threading
+from collections import Counter
+
+from asgiref.sync import async_to_sync
+from channels.layers import get_channel_layer
+from django.conf import settings
+from django.db import transaction
+
+logger = logging.getLogger(__name__)
+
+# Au-delà, les commentaires d'une même fenêtre sont tronqués (le client recharge)
+MAX_COMMENTAIRES_PAR_FENETRE = 20
+
+
+def memoire_group(memoire_id):
+    return f"memoire_{memoire_id}"
+
+
+def universite_group(univ_slug):
+    return f"universite_{univ_slug}"
+
+
+def groupes_par_memoire(memoire_ids):
+    """{memoire_id: [groupes]} en une requête sur la table de liaison."""
+    from memoires.models import Memoire
+
+    groupes = {memoire_id: [memoire_group(memoire_id)] for memoire_id in memoire_ids}
+    liens = Memoire.universites.through.objects.filter(
+        memoire_id__in=groupes
+    ).values_list("memoire_id", "universite__slug")
+    for memoire_id, slug in liens:
+        groupes[memoire_id].append(universite_group(slug))
+    return groupes
+
+
+def couche_en_memoire():
+    """True si la couche Channels par défaut est InMemoryChannelLayer."""
+    backend = getattr(settings, "CHANNEL_LAYERS", {}).get("default", {}).get("BACKEND", "")
+    return backend.endswith(".InMemoryChannelLayer")
+
+
+class EngagementBroadcaster:
+    """Tampon par processus : {groupe: {memoire_id: événement cumulé}}."""
+
+    def __init__(self, window=None):
+        self._window = window
+        self._lock = threading.Lock()
+        self._pending = {}
+        self._timer = None
+
+    @property
+    def window(self):
+        if self._window is not None:
+            return self._window
+        if couche_en_memoire():
+            return 0
+        return getattr(settings, "REALTIME_COALESCE_WINDOW", 0.5)
+
+    # ---------- API publique ----------
+    def publish(self, memoire, counters=None, commentaire=None, moderation=None):
+        """
+        Enregistre un événement pour le mémoire et ses universités.
+        Envoyé après le commit de la transaction courante uniquement.
+        """
+        self.publish_many({memoire.pk: (counters, commentaire, moderation)})
+
+    def publish_many(self, events):
+        """events : {memoire_id: (counters, commentaire, moderation)}."""
+        groupes = groupes_par_memoire(list(events))
+
+        def enqueue_all():
+            for memoire_id, (counters, commentaire, moderation) in events.items():
+                self._enqueue(groupes[memoire_id], memoire_id, counters, commentaire, moderation)
+
+        transaction.on_commit(enqueue_all)
+
+    def flush(self):
+        with self._lock:
+            pending, self._pending = self._pending, {}
+            self._timer = None
+        layer = get_channel_layer()
+        if layer is None or not pending:
+            return
+        for group, events in pending.items():
+            payload = {
+                "events": [
+                    {
+                        "memoire_id": memoire_id,
+                        "counters": dict(event["counters"]),
+                        "commentaires": event["commentaires"],
+                        "commentaires_tronques": event["commentaires_tronques"],
+                        "moderation": [
+                            {"commentaire_id": cid, "etat": etat}
+                            for cid, etat in event["moderation"].items()
+                        ],
+                    }
+                    for memoire_id, event in events.items()
+                ]
+            }
+            try:
+                async_to_sync(layer.group_send)(
+                    group, {"type": "engagement.update", "payload": payload}
+                )
+            except Exception as e:
+                # Le temps réel ne doit jamais casser une écriture
+                logger.error(f"Échec diffusion temps réel vers {group}: {e}")
+
+    # ---------- Interne ----------
+    def _enqueue(self, groups, memoire_id, counters, commentaire, moderation):
+        with self._lock:
+            for group in groups:
+                event = self._pending.setdefault(group, {}).setdefault(
+                    memoire_id,
+                    {
+                        "counters": Counter(),
+                        "commentaires": [],
+                        "commentaires_tronques": 0,
+                        "moderation": {},
+                    },
+                )
+                if counters:
+                    event["counters"].update(counters)
+                if commentaire:
+                    if len(event["commentaires"]) < MAX_COMMENTAIRES_PAR_FENETRE:
+                        event["commentaires"].append(commentaire)
+                    else:
+                        event["commentaires_tronques"] += 1
+                if moderation:
+                    # Seul le dernier état d'un commentaire dans la fenêtre compte
+                    event["moderation"].update(moderation)
+
+            window = self.window
+            if window > 0 and self._timer is None:
+                self._timer = threading.Timer(window, self.flush)
+                self._timer.daemon = True
+                self._timer.start()
+
+        if window <= 0:
+            self.flush()
+
+
+broadcaster = EngagementBroadcaster()
+
+
+def publier_compteurs(memoire, **deltas):
+    """Ex. publier_compteurs(memoire, likes=1)."""
+    broadcaster.publish(memoire, counters=deltas)
+
+
+def publier_commentaire(commentaire):
+    user = commentaire.utilisateur
+    broadcaster.publish(
+        commentaire.memoire,
+        counters={"commentaires": 1},
+        commentaire={
+            "id": commentaire.id,
+            "contenu": commentaire.contenu,
+            "date": commentaire.date.isoformat() if commentaire.date else None,
+            "utilisateur": {
+                "id": user.id,
+                "nom": user.nom,
+                "prenom": user.prenom,
+                "photo_profil": str(user.photo_profil) if user.photo_profil else None,
+            } if user else None,
+        },
+    )
+
+
+def publier_moderation(commentaire, etat):
+    """etat : "modere", "demodere" ou "supprime"."""
+    delta = {"modere": -1, "supprime": -1, "demodere": 1}.get(etat, 0)
+    if etat == "supprime" and commentaire.modere:
+        delta = 0  # déjà invisible
+    broadcaster.publish(
+        commentaire.memoire,
+        counters={"commentaires": delta} if delta else None,
+        moderation={commentaire.id: etat},
+    )
+
+
+def publier_moderation_lot(commentaires, etat):
+    """
+    Version lot de publier_moderation.
+    commentaires : dicts {"id", "memoire_id", "modere"} (état avant l'action).
+    """
+    events = {}
+    for com in commentaires:
+        counters, _, moderation = events.setdefault(
+            com["memoire_id"], (Counter(), None, {})
+        )
+        if etat == "demodere":
+            counters["commentaires"] += 1
+        elif not com["modere"]:
+            counters["commentaires"] -= 1
+        moderation[com["id"]] = etat
+    if events:
+        broadcaster.publish_many(events)
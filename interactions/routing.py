@@ -0,0 +1,9 @@
+# interactions/routing.py
+from django.urls import path
+
+from .consumers import EngagementConsumer
+
+websocket_urlpatterns = [
+    path("ws/interactions/memoires/<int:memoire_id>/", EngagementConsumer.as_asgi()),
+    path("ws/interactions/universites/<slug:univ_slug>/", EngagementConsumer.as_asgi()),
+]
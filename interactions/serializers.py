@@ -1,5 +1,6 @@
 # These classes define serializers for various interactions and actions related to user interactions
 # with memories in a Django REST framework application.
+from django.conf import settings
 from rest_framework import serializers
 from users.models import  CustomUser
 from interactions.models import Telechargement, Like, Commentaire
@@ -88,4 +89,23 @@ class NotationCreateSerializer(serializers.ModelSerializer):
 class SignalementCreateSerializer(serializers.ModelSerializer):
     class Meta:
         model = Signalement
-        fields = ['memoire', 'motif', 'commentaire']
\ No newline at end of file
+        fields = ['memoire', 'motif', 'commentaire']
+
+# ---------- MODÉRATION EN MASSE ----------
+class ModerationBulkSerializer(serializers.Serializer):
+    MAX_IDS = getattr(settings, "MODERATION_BULK_MAX_IDS", 500)
+
+    ids = serializers.ListField(
+        child=serializers.IntegerField(min_value=1),
+        allow_empty=False,
+        max_length=MAX_IDS,
+    )
+    raison = serializers.CharField(required=False, allow_blank=True, max_length=500)
+
+
+class CommentaireBulkSerializer(ModerationBulkSerializer):
+    action = serializers.ChoiceField(choices=["moderer", "demoderer", "supprimer"])
+
+
+class SignalementBulkSerializer(ModerationBulkSerializer):
+    action = serializers.ChoiceField(choices=["traiter", "rouvrir"])
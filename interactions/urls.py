@@ -11,6 +11,7 @@ from .views import (
     UniversiteNotationListView,
     UniversiteSignalementListView,
     UniversiteInteractionsStatsView,
+    UniversiteModerationQueueView,
 )
 
 router = DefaultRouter()
@@ -50,6 +51,11 @@ urlpatterns = [
         UniversiteSignalementListView.as_view(),
         name="univ-signalements-list",
     ),
+    path(
+        "universites/<slug:univ_slug>/interactions/moderation/file/",
+        UniversiteModerationQueueView.as_view(),
+        name="univ-moderation-file",
+    ),
     path(
         "universites/<slug:univ_slug>/interactions/stats/",
         UniversiteInteractionsStatsView.as_view(),
@@ -57,6 +63,8 @@ urlpatterns = [
     ),
        path('interactions/notations/', NotationViewSet.as_view({'get': 'list', 'post': 'create'}), name='notation-list'),
     path('interactions/notations/par-memoire/<int:memoire_id>/', NotationViewSet.as_view({'get': 'par_memoire'}), name='notation-by-memoire'),
+    path('interactions/notations/stats/<int:memoire_id>/', NotationViewSet.as_view({'get': 'stats'}), name='notation-stats'),
+    path('interactions/notations/histogramme/<int:memoire_id>/', NotationViewSet.as_view({'get': 'histogramme'}), name='notation-histogramme'),
    
     path("", include(router.urls)),
 ]
@@ -2,7 +2,8 @@
 from django.shortcuts import get_object_or_404
 from rest_framework import generics, permissions, status, viewsets, serializers
 from rest_framework.decorators import action
-from django.db.models import Avg, Count
+from django.db.models import Avg, Count, Max, Q
+from django.utils.dateparse import parse_datetime
 from rest_framework.response import Response
 from drf_spectacular.utils import extend_schema, extend_schema_view, OpenApiTypes
 from interactions.models import Telechargement, Like, Commentaire
@@ -27,10 +28,12 @@ from interactions.serializers import (
     NotationListSerializer,
     SignalementCreateSerializer,
     SignalementListSerializer,
+    CommentaireBulkSerializer,
+    SignalementBulkSerializer,
 )
 from rest_framework import viewsets, status
 
-from rest_framework.exceptions import PermissionDenied  # ← Import manquant
+from rest_framework.exceptions import PermissionDenied, ValidationError  # ← Import manquant
 
 # Import de vos utilitaires existants
 from users.utils import create_audit_log, AuditLog, get_client_ip
@@ -43,14 +46,49 @@ from django.utils import timezone
 import logging
 # Import de vos utilitaires existants
 from users.utils import create_audit_log, AuditLog, get_client_ip
+from users.audit_sink import audit_sink
+from users.utils import build_audit_log
 
 
 logger = logging.getLogger(__name__)
 
-from memoires.models import Memoire, Notation, Signalement
+from django.db import transaction
+from memoires.models import Memoire, MemoireNotationStats, Notation, Signalement
+from interactions.pagination import (
+    CommentaireCursorPagination,
+    decode_cursor,
+    encode_cursor,
+    parse_since,
+)
+from interactions.realtime import (
+    publier_commentaire,
+    publier_compteurs,
+    publier_moderation,
+    publier_moderation_lot,
+)
 from interactions.permissions import IsAuthenticated, IsAdminOrModerateur
 
+from universites.models import Universite
+from universites.resolver import get_universite_or_404
 from universites.permissions import IsAdminOfUniversite
+
+
+def premiere_universite_par_memoire(memoire_ids):
+    """
+    {memoire_id: universite_id} en une requête, même choix que
+    memoire.universites.first() (tri par nom).
+    """
+    resultat = {}
+    liens = (
+        Memoire.universites.through.objects.filter(memoire_id__in=memoire_ids)
+        .order_by("memoire_id", "universite__nom")
+        .values_list("memoire_id", "universite_id")
+    )
+    for memoire_id, universite_id in liens:
+        resultat.setdefault(memoire_id, universite_id)
+    return resultat
+
+
 # --------------------------------------------------
 # 1. Téléchargement (tout user connecté)
 # --------------------------------------------------
@@ -62,6 +100,7 @@ from universites.permissions import IsAdminOfUniversite
 )
 class TelechargementOpenViewSet(viewsets.ViewSet):
     permission_classes = [IsAuthenticated]
+    throttle_scope = "interactions"
 
     @extend_schema(
         summary="Télécharger un mémoire",
@@ -83,7 +122,9 @@ class TelechargementOpenViewSet(viewsets.ViewSet):
         
         if not created:
             return Response({"detail": "Déjà téléchargé"}, status=status.HTTP_200_OK)
-        
+
+        publier_compteurs(memoire, telechargements=1)
+
         # Envoyer l'email à l'auteur et aux encadreurs uniquement lors du premier téléchargement
         self.envoyer_email_notification(memoire, request.user)
         
@@ -201,6 +242,7 @@ class TelechargementOpenViewSet(viewsets.ViewSet):
 # --------------------------------------------------
 class LikeOpenViewSet(viewsets.ViewSet):
     permission_classes = [IsAuthenticated]
+    throttle_scope = "interactions"
 
     @extend_schema(
         summary="Liké / unliké un mémoire",
@@ -216,10 +258,12 @@ class LikeOpenViewSet(viewsets.ViewSet):
         )
         if not created:
             like.delete()
+            publier_compteurs(memoire, likes=-1)
             return Response(
                 {"liked": False, "count": memoire.likes.count()},
                 status=status.HTTP_200_OK,
             )
+        publier_compteurs(memoire, likes=1)
         return Response(
             {"liked": True, "count": memoire.likes.count()},
             status=status.HTTP_201_CREATED,
@@ -244,6 +288,7 @@ class LikeOpenViewSet(viewsets.ViewSet):
 
 class CommentaireOpenViewSet(viewsets.ModelViewSet):
     permission_classes = [IsAuthenticated]
+    throttle_scope = "interactions"
 
     def get_serializer_class(self):
         if self.action == "create":
@@ -251,11 +296,12 @@ class CommentaireOpenViewSet(viewsets.ModelViewSet):
         return CommentaireListSerializer
 
     def get_queryset(self):
-        return (
-            Commentaire.objects.filter(modere=False)
-            .select_related("utilisateur", "memoire")
-            .order_by("-date")
-        )
+        qs = Commentaire.objects.filter(modere=False)
+        # ?memoire=<id> : restreint la liste à un mémoire (index memoire/modere/date)
+        memoire_id = self.request.query_params.get("memoire")
+        if memoire_id and memoire_id.isdigit():
+            qs = qs.filter(memoire_id=memoire_id)
+        return qs.select_related("utilisateur", "memoire").order_by("-date", "-id")
 
     def perform_create(self, serializer):
         commentaire = serializer.save(utilisateur=self.request.user, modere=False)
@@ -276,7 +322,9 @@ class CommentaireOpenViewSet(viewsets.ModelViewSet):
             description=f"Nouveau commentaire créé par {self.request.user.email}",
             request=self.request
         )
-        
+
+        publier_commentaire(commentaire)
+
         return commentaire
 
     def list(self, request, *args, **kwargs):
@@ -285,6 +333,23 @@ class CommentaireOpenViewSet(viewsets.ModelViewSet):
         print('[BACK] Serialisé :', serializer.data[:2])
         return Response(serializer.data)
 
+    @extend_schema(
+        summary="Commentaires d'un mémoire (pagination keyset, ?since= pour le rafraîchissement)",
+        responses={200: CommentaireListSerializer(many=True)},
+    )
+    @action(
+        detail=False,
+        methods=["get"],
+        url_path=r"memoire/(?P<memoire_id>\d+)",
+        permission_classes=[permissions.AllowAny],
+    )
+    def par_memoire(self, request, memoire_id=None):
+        qs = Commentaire.publics(memoire_id, since=parse_since(request))
+        paginator = CommentaireCursorPagination()
+        page = paginator.paginate_queryset(qs, request, view=self)
+        serializer = CommentaireListSerializer(page, many=True)
+        return paginator.get_paginated_response(serializer.data)
+
     @extend_schema(summary="Modérer un commentaire (staff ou modérateur)")
     @action(detail=True, methods=["patch"], url_path="moderer")
     def moderer(self, request, *args, **kwargs):
@@ -320,7 +385,8 @@ class CommentaireOpenViewSet(viewsets.ModelViewSet):
         # Toggle du statut de modération
         com.modere = not com.modere
         com.save()
-        
+        publier_moderation(com, "modere" if com.modere else "demodere")
+
         # LOG: Modération réussie
         create_audit_log(
             action=AuditLog.ActionType.COMMENT_MODERATE,
@@ -414,6 +480,9 @@ class CommentaireOpenViewSet(viewsets.ModelViewSet):
                 request=request
             )
             
+            # Diffusion préparée avant delete() (l'id est remis à None)
+            publier_moderation(com, "supprime")
+
             # Suppression effective
             com.delete()
         
@@ -428,6 +497,108 @@ class CommentaireOpenViewSet(viewsets.ModelViewSet):
             status=status.HTTP_200_OK
         )
 
+    @extend_schema(
+        summary="Modération en masse (moderer / demoderer / supprimer)",
+        request=CommentaireBulkSerializer,
+    )
+    @action(detail=False, methods=["post"], url_path="bulk")
+    def bulk(self, request, *args, **kwargs):
+        """
+        Applique une action à un lot d'IDs en une transaction :
+        un UPDATE/DELETE ... WHERE id IN (...) et un bulk_create des logs.
+        Les IDs introuvables ou déjà dans l'état demandé sont renvoyés dans "ignores".
+        """
+        if not IsAdminOrModerateur().has_permission(request, self):
+            create_audit_log(
+                action=AuditLog.ActionType.COMMENT_MODERATE,
+                severity=AuditLog.Severity.HIGH,
+                user=request.user,
+                target_type='Commentaire',
+                target_repr="Tentative modération en masse",
+                description=f"TENTATIVE ÉCHOUÉE de modération en masse par {request.user.email} - Permissions insuffisantes",
+                request=request
+            )
+            return Response(
+                {"detail": "Réservé aux modérateurs"},
+                status=status.HTTP_403_FORBIDDEN
+            )
+
+        ser = CommentaireBulkSerializer(data=request.data)
+        ser.is_valid(raise_exception=True)
+        ids = set(ser.validated_data["ids"])
+        operation = ser.validated_data["action"]
+        raison = ser.validated_data.get("raison") or 'Non spécifiée'
+
+        qs = Commentaire.objects.filter(id__in=ids)
+        if operation == "moderer":
+            qs = qs.filter(modere=False)
+        elif operation == "demoderer":
+            qs = qs.filter(modere=True)
+
+        with transaction.atomic():
+            rows = list(
+                qs.select_for_update(of=("self",)).values(
+                    "id", "memoire_id", "contenu", "date", "modere", "utilisateur__email"
+                )
+            )
+            traites = [row["id"] for row in rows]
+            if operation == "supprimer":
+                Commentaire.objects.filter(id__in=traites).delete()
+            else:
+                Commentaire.objects.filter(id__in=traites).update(
+                    modere=(operation == "moderer")
+                )
+
+            universites = premiere_universite_par_memoire({row["memoire_id"] for row in rows})
+            lot = f"lot de {len(rows)}"
+            logs = []
+            for row in rows:
+                previous = {
+                    'modere': row["modere"],
+                    'contenu': row["contenu"][:200],
+                    'date': row["date"].isoformat() if row["date"] else None,
+                }
+                if operation == "supprimer":
+                    logs.append(build_audit_log(
+                        action=AuditLog.ActionType.COMMENT_DELETE,
+                        severity=AuditLog.Severity.CRITICAL,
+                        user=request.user,
+                        university_id=universites.get(row["memoire_id"]),
+                        target_type='Commentaire',
+                        target_id=row["id"],
+                        target_repr=f"Commentaire ID:{row['id']} par {row['utilisateur__email']}",
+                        previous_data={**previous, 'raison': raison},
+                        description=f"Suppression en masse ({lot}) par {request.user.email}. Raison: {raison}",
+                        request=request
+                    ))
+                else:
+                    logs.append(build_audit_log(
+                        action=AuditLog.ActionType.COMMENT_MODERATE,
+                        severity=AuditLog.Severity.MEDIUM,
+                        user=request.user,
+                        university_id=universites.get(row["memoire_id"]),
+                        target_type='Commentaire',
+                        target_id=row["id"],
+                        target_repr=f"Commentaire ID:{row['id']} par {row['utilisateur__email']}",
+                        previous_data=previous,
+                        new_data={
+                            'modere': operation == "moderer",
+                            'moderated_by': request.user.email,
+                        },
+                        description=f"Modération en masse ({lot}) {'activée' if operation == 'moderer' else 'désactivée'} par {request.user.email}",
+                        request=request
+                    ))
+            audit_sink.write_many(logs)
+
+            etat = {"moderer": "modere", "demoderer": "demodere", "supprimer": "supprime"}[operation]
+            publier_moderation_lot(rows, etat)
+
+        return Response({
+            "action": operation,
+            "traites": traites,
+            "ignores": sorted(ids - set(traites)),
+        })
+
     def perform_destroy(self, instance):
         """
         Surcharge de la suppression standard (DELETE sur /commentaires/{id}/)
@@ -475,7 +646,8 @@ class CommentaireOpenViewSet(viewsets.ModelViewSet):
             description=f"Suppression directe (DELETE) du commentaire par {user.email}",
             request=self.request
         )
-        
+
+        publier_moderation(instance, "supprime")
         instance.delete()
 
 from rest_framework import serializers
@@ -504,45 +676,49 @@ class CommentaireListSerializer(serializers.ModelSerializer):
 # --------------------------------------------------
 class NotationViewSet(viewsets.ViewSet):
     permission_classes = [IsAuthenticated]
+    throttle_scope = "interactions"
 
     @extend_schema(
         summary="Noter un mémoire",
         request=NotationCreateSerializer,
     )
     def destroy(self, request, pk=None):
-        notation = get_object_or_404(
-            Notation, pk=pk
-        )
-        notation.delete()
+        with transaction.atomic():
+            # Ligne verrouillée : la note retirée des stats est celle en base
+            notation = get_object_or_404(Notation.objects.select_for_update(), pk=pk)
+            # Stats : memoires/signals.py, dans la même transaction
+            notation.delete()
         return Response(status=status.HTTP_204_NO_CONTENT)
     @action(detail=False, methods=["post"], url_path="noter")
     def noter(self, request, ser):
         memoire = get_object_or_404(Memoire, pk=ser.validated_data["memoire_id"])
+        nouvelle_note = ser.validated_data["note"]
 
-        # Tentez de récupérer l'annotation existante
-        notation = Notation.objects.filter(
-            utilisateur=request.user, memoire=memoire
-        ).first()
+        with transaction.atomic():
+            # Tentez de récupérer l'annotation existante
+            notation = Notation.objects.select_for_update().filter(
+                utilisateur=request.user, memoire=memoire
+            ).first()
 
-        if notation:
-            # Si la notation existe, mettez à jour la note
-            notation.note = ser.validated_data["note"]
-            notation.save()
-            return Response(
-                {"detail": "Note mise à jour", "note": notation.note},
-                status=status.HTTP_200_OK,
-            )
-        else:
-            # Si la notation n'existe pas, créez-en une nouvelle
-            notation = Notation.objects.create(
-                utilisateur=request.user,
-                memoire=memoire,
-                note=ser.validated_data["note"],
-            )
-            return Response(
-                {"detail": "Note enregistrée", "note": notation.note},
-                status=status.HTTP_201_CREATED,
-            )
+            if notation:
+                # Si la notation existe, mettez à jour la note (stats : memoires/signals.py)
+                notation.note = nouvelle_note
+                notation.save(update_fields=["note"])
+                return Response(
+                    {"detail": "Note mise à jour", "note": notation.note},
+                    status=status.HTTP_200_OK,
+                )
+            else:
+                # Si la notation n'existe pas, créez-en une nouvelle
+                notation = Notation.objects.create(
+                    utilisateur=request.user,
+                    memoire=memoire,
+                    note=nouvelle_note,
+                )
+                return Response(
+                    {"detail": "Note enregistrée", "note": notation.note},
+                    status=status.HTTP_201_CREATED,
+                )
 
     @extend_schema(
         summary="Liste des notes d’un mémoire",
@@ -560,18 +736,52 @@ class NotationViewSet(viewsets.ViewSet):
     )
     @action(detail=False, methods=["get"], url_path="stats/<int:memoire_id>")
     def stats(self, request, *args, **kwargs):
-        memoire = get_object_or_404(Memoire, pk=kwargs["memoire_id"])
-        stats = Notation.objects.filter(memoire=memoire).aggregate(
-            avg_note=Avg("note"), count=Count("id")
+        memoire = get_object_or_404(
+            Memoire.objects.select_related("notation_stats").only(
+                "id", "titre", "notation_stats"
+            ),
+            pk=kwargs["memoire_id"],
+        )
+        stats = self._get_notation_stats(memoire)
+        return Response(
+            {
+                "memoire": memoire.titre,
+                "note_moyenne": stats.moyenne,
+                "total_notes": stats.total_notes,
+                "score_bayesien": round(stats.score_bayesien, 3),
+            }
+        )
+
+    @extend_schema(
+        summary="Histogramme des notes (1 à 5) d’un mémoire",
+    )
+    @action(detail=False, methods=["get"], url_path="histogramme/<int:memoire_id>")
+    def histogramme(self, request, *args, **kwargs):
+        memoire = get_object_or_404(
+            Memoire.objects.select_related("notation_stats").only(
+                "id", "titre", "notation_stats"
+            ),
+            pk=kwargs["memoire_id"],
         )
+        stats = self._get_notation_stats(memoire)
         return Response(
             {
+                "memoire_id": memoire.id,
                 "memoire": memoire.titre,
-                "note_moyenne": round(stats["avg_note"] or 0, 2),
-                "total_notes": stats["count"],
+                "total_notes": stats.total_notes,
+                "note_moyenne": stats.moyenne,
+                "score_bayesien": round(stats.score_bayesien, 3),
+                "distribution": stats.distribution(),
             }
         )
 
+    def _get_notation_stats(self, memoire):
+        try:
+            return memoire.notation_stats
+        except MemoireNotationStats.DoesNotExist:
+            # Aucune note encore agrégée : ligne vide (non persistée)
+            return MemoireNotationStats(memoire=memoire)
+
     def list(self, request):
         notations = (
             Notation.objects.all()
@@ -623,6 +833,131 @@ class SignalementModerationViewSet(viewsets.ViewSet):
         signalement.save()
         return Response({"detail": "Signalement marqué comme traité."})
 
+    @extend_schema(
+        summary="Traitement en masse des signalements (traiter / rouvrir)",
+        request=SignalementBulkSerializer,
+    )
+    @action(detail=False, methods=["post"], url_path="signalements/bulk")
+    def bulk(self, request, *args, **kwargs):
+        if not IsAdminOrModerateur().has_permission(request, self):
+            return Response(
+                {"detail": "Réservé aux modérateurs"},
+                status=status.HTTP_403_FORBIDDEN
+            )
+
+        ser = SignalementBulkSerializer(data=request.data)
+        ser.is_valid(raise_exception=True)
+        ids = set(ser.validated_data["ids"])
+        traiter = ser.validated_data["action"] == "traiter"
+        raison = ser.validated_data.get("raison") or ''
+
+        with transaction.atomic():
+            rows = list(
+                Signalement.objects.filter(id__in=ids, traite=not traiter)
+                .select_for_update(of=("self",))
+                .values("id", "memoire_id", "motif", "memoire__titre")
+            )
+            traites = [row["id"] for row in rows]
+            Signalement.objects.filter(id__in=traites).update(traite=traiter)
+
+            universites = premiere_universite_par_memoire({row["memoire_id"] for row in rows})
+            audit_sink.write_many([
+                build_audit_log(
+                    action=AuditLog.ActionType.SIGNALEMENT_TRAITE,
+                    severity=AuditLog.Severity.MEDIUM,
+                    user=request.user,
+                    university_id=universites.get(row["memoire_id"]),
+                    target_type='Signalement',
+                    target_id=row["id"],
+                    target_repr=f"Signalement ID:{row['id']} ({row['motif']}) sur '{row['memoire__titre'][:50]}'",
+                    previous_data={'traite': not traiter},
+                    new_data={'traite': traiter, 'raison': raison},
+                    description=f"Signalement {'traité' if traiter else 'rouvert'} en masse (lot de {len(rows)}) par {request.user.email}",
+                    request=request
+                )
+                for row in rows
+            ])
+
+        return Response({
+            "action": ser.validated_data["action"],
+            "traites": traites,
+            "ignores": sorted(ids - set(traites)),
+        })
+
+
+class UniversiteModerationQueueView(generics.GenericAPIView):
+    """
+    GET /universites/<univ_slug>/interactions/moderation/file/
+    File de modération : signalements en attente regroupés par mémoire,
+    les plus signalés puis les plus récents d'abord. Une seule requête GROUP BY
+    (index partiel memoires_sig_attente_idx), pagination keyset via ?cursor=.
+    """
+    permission_classes = [IsAdminOfUniversite]
+    stateless_auth = True
+    page_size = 20
+    max_page_size = 100
+
+    @extend_schema(summary="File de modération priorisée (signalements en attente)")
+    def get(self, request, *args, **kwargs):
+        univ = get_universite_or_404(kwargs["univ_slug"], request)
+        try:
+            page_size = max(1, min(int(request.query_params.get("page_size", self.page_size)), self.max_page_size))
+        except ValueError:
+            page_size = self.page_size
+
+        motifs = [code for code, _ in Signalement.MOTIF_CHOICES]
+        qs = (
+            Signalement.objects.filter(
+                traite=False,
+                memoire_id__in=Memoire.universites.through.objects.filter(
+                    universite_id=univ.id
+                ).values("memoire_id"),
+            )
+            .values("memoire_id", "memoire__titre")
+            .annotate(
+                nb=Count("id"),
+                dernier=Max("created_at"),
+                **{f"motif_{i}": Count("id", filter=Q(motif=code)) for i, code in enumerate(motifs)},
+            )
+            .order_by("-nb", "-dernier", "-memoire_id")
+        )
+
+        cursor = decode_cursor(request, 3)
+        if cursor:
+            nb, dernier, memoire_id = cursor
+            try:
+                dernier = parse_datetime(str(dernier))
+            except ValueError:  # format ISO correct, date impossible
+                dernier = None
+            if dernier is None or not isinstance(nb, int) or not isinstance(memoire_id, int):
+                raise ValidationError({"cursor": "Curseur invalide."})
+            qs = qs.filter(
+                Q(nb__lt=nb)
+                | Q(nb=nb, dernier__lt=dernier)
+                | Q(nb=nb, dernier=dernier, memoire_id__lt=memoire_id)
+            )
+
+        rows = list(qs[: page_size + 1])
+        next_cursor = None
+        if len(rows) > page_size:
+            rows = rows[:page_size]
+            last = rows[-1]
+            next_cursor = encode_cursor([last["nb"], last["dernier"].isoformat(), last["memoire_id"]])
+
+        return Response({
+            "next_cursor": next_cursor,
+            "results": [
+                {
+                    "memoire_id": row["memoire_id"],
+                    "memoire_titre": row["memoire__titre"],
+                    "nb_signalements": row["nb"],
+                    "dernier_signalement": row["dernier"],
+                    "motifs": {code: row[f"motif_{i}"] for i, code in enumerate(motifs)},
+                }
+                for row in rows
+            ],
+        })
+
 
 # --------------------------------------------------
 # 1. Téléchargements
@@ -37,6 +37,7 @@ class MemoireAdmin(admin.ModelAdmin):
     filter_horizontal = ("domaines", "universites")
     date_hierarchy = "created_at"
     ordering = ("-created_at",)
+    list_select_related = ("auteur", "notation_stats")
 
     def apercu_pdf(self, obj):
         if obj.fichier_pdf:
@@ -134,4 +135,14 @@ class NotationAdmin(admin.ModelAdmin):
     list_filter = ('note', 'created_at', 'memoire__universites', 'memoire__domaines')
     search_fields = ('utilisateur__email', 'memoire__titre')
     readonly_fields = ('created_at',)
-    ordering = ('-created_at',)
\ No newline at end of file
+    ordering = ('-created_at',)
+
+from .models import MemoireNotationStats
+
+@admin.register(MemoireNotationStats)
+class MemoireNotationStatsAdmin(admin.ModelAdmin):
+    list_display = ('memoire', 'total_notes', 'moyenne', 'score_bayesien', 'updated_at')
+    list_select_related = ('memoire',)
+    search_fields = ('memoire__titre',)
+    readonly_fields = [f.name for f in MemoireNotationStats._meta.fields]
+    ordering = ('-score_bayesien',)
@@ -4,3 +4,6 @@ from django.apps import AppConfig
 class MemoiresConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'memoires'
+
+    def ready(self):
+        import memoires.signals  # noqa: F401  (agrégats de notation)
@@ -0,0 +1,12 @@
+# memoires/management/commands/rebuild_notation_stats.py
+from django.core.management.base import BaseCommand
+
+from memoires.models import MemoireNotationStats
+
+
+class Command(BaseCommand):
+    help = 'Recalcule les agrégats de notation (MemoireNotationStats) à partir de la table Notation'
+
+    def handle(self, *args, **options):
+        total = MemoireNotationStats.recalculer_tout()
+        self.stdout.write(self.style.SUCCESS(f'Agrégats recalculés pour {total} mémoire(s) noté(s).'))
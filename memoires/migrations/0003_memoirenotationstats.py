@@ -0,0 +1,57 @@
+# Generated by Django 5.2.6 on 2026-10-19 05:40
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import Count, Q, Sum
+
+
+def backfill_notation_stats(apps, schema_editor):
+    Notation = apps.get_model('memoires', 'Notation')
+    MemoireNotationStats = apps.get_model('memoires', 'MemoireNotationStats')
+    prior_moyenne, prior_poids = 3.0, 5
+    rows = (
+        Notation.objects.values('memoire_id')
+        .annotate(
+            total_notes=Count('id'),
+            somme_notes=Sum('note'),
+            **{f'nb_note_{n}': Count('id', filter=Q(note=n)) for n in range(1, 6)},
+        )
+        .order_by()
+    )
+    MemoireNotationStats.objects.bulk_create([
+        MemoireNotationStats(
+            score_bayesien=(prior_poids * prior_moyenne + row['somme_notes']) / (prior_poids + row['total_notes']),
+            **row,
+        )
+        for row in rows
+    ], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('memoires', '0002_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='MemoireNotationStats',
+            fields=[
+                ('memoire', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='notation_stats', serialize=False, to='memoires.memoire')),
+                ('total_notes', models.PositiveIntegerField(default=0)),
+                ('somme_notes', models.PositiveIntegerField(default=0)),
+                ('nb_note_1', models.PositiveIntegerField(default=0)),
+                ('nb_note_2', models.PositiveIntegerField(default=0)),
+                ('nb_note_3', models.PositiveIntegerField(default=0)),
+                ('nb_note_4', models.PositiveIntegerField(default=0)),
+                ('nb_note_5', models.PositiveIntegerField(default=0)),
+                ('score_bayesien', models.FloatField(db_index=True, default=3.0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'verbose_name': 'Statistiques de notation',
+                'verbose_name_plural': 'Statistiques de notation',
+            },
+        ),
+        migrations.RunPython(backfill_notation_stats, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 5.2.6 on 2026-10-19 05:47
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('memoires', '0003_memoirenotationstats'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='signalement',
+            index=models.Index(condition=models.Q(('traite', False)), fields=['memoire', '-created_at'], name='memoires_sig_attente_idx'),
+        ),
+    ]
@@ -1,8 +1,12 @@
 # memoires/models.py
-from django.db import models
+from django.db import models, transaction
+from django.db.models import Count, F, FloatField, Q, Sum
+from django.db.models.functions import Cast
 from django.conf import settings
+from django.core.exceptions import ObjectDoesNotExist
 from django.core.validators import MinValueValidator, MaxValueValidator
 from django.core.exceptions import ValidationError
+from django.utils import timezone
 from simple_history.models import HistoricalRecords
 from universites.models import Domaine, Universite
 
@@ -34,8 +38,17 @@ class Memoire(models.Model):
         return self.titre
 
     def note_moyenne(self):
-        notes = self.notations.values_list("note", flat=True)
-        return round(sum(notes) / len(notes), 2) if notes else 0
+        # Lecture de l'agrégat pré-calculé (penser à select_related("notation_stats"))
+        try:
+            return self.notation_stats.moyenne
+        except ObjectDoesNotExist:
+            return 0
+
+    def nb_notations(self):
+        try:
+            return self.notation_stats.total_notes
+        except ObjectDoesNotExist:
+            return 0
 
     def nb_telechargements(self):
         return self.telechargements.count()
@@ -106,6 +119,14 @@ class Signalement(models.Model):
     class Meta:
         ordering = ["-created_at"]
         unique_together = ("memoire", "utilisateur")  # 1 signalement par user/mémoire
+        indexes = [
+            # Index partiel : seuls les signalements en attente (file de modération)
+            models.Index(
+                fields=["memoire", "-created_at"],
+                name="memoires_sig_attente_idx",
+                condition=Q(traite=False),
+            ),
+        ]
 
     def __str__(self):
         return f"{self.utilisateur} → {self.memoire} ({self.motif})"
@@ -132,3 +153,147 @@ class Notation(models.Model):
 
     def __str__(self):
         return f"{self.utilisateur} → {self.memoire} : {self.note}/5"
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # (mémoire, note) en base : delta appliqué aux stats par memoires/signals.py
+        # (champs différés : pas de requête ici, les stats seront recalculées)
+        if "memoire_id" in instance.__dict__ and "note" in instance.__dict__:
+            instance._etat_charge = (instance.memoire_id, instance.note)
+        return instance
+
+
+
+# ------------------------------------------------------------------
+# 5. Agrégats de notation (maintenus incrémentalement)
+# ------------------------------------------------------------------
+class MemoireNotationStats(models.Model):
+    """
+    Somme, nombre et histogramme 1–5 des notes d'un mémoire.
+    Mis à jour à chaque création / modification / suppression de note, quelle
+    qu'en soit l'origine (API, admin, cascade) par memoires/signals.py :
+    moyenne et distribution se lisent en une ligne. Écritures en masse
+    (update(), bulk_create) : manage.py rebuild_notation_stats.
+    """
+    # Moyenne bayésienne : (poids * a_priori + somme) / (poids + nb_notes)
+    BAYES_PRIOR_MOYENNE = getattr(settings, "NOTATION_BAYES_PRIOR_MOYENNE", 3.0)
+    BAYES_PRIOR_POIDS = getattr(settings, "NOTATION_BAYES_PRIOR_POIDS", 5)
+
+    memoire = models.OneToOneField(
+        Memoire,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name="notation_stats",
+    )
+    total_notes = models.PositiveIntegerField(default=0)
+    somme_notes = models.PositiveIntegerField(default=0)
+    nb_note_1 = models.PositiveIntegerField(default=0)
+    nb_note_2 = models.PositiveIntegerField(default=0)
+    nb_note_3 = models.PositiveIntegerField(default=0)
+    nb_note_4 = models.PositiveIntegerField(default=0)
+    nb_note_5 = models.PositiveIntegerField(default=0)
+    score_bayesien = models.FloatField(default=BAYES_PRIOR_MOYENNE, db_index=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        verbose_name = "Statistiques de notation"
+        verbose_name_plural = "Statistiques de notation"
+
+    def __str__(self):
+        return f"{self.memoire_id} : {self.moyenne}/5 ({self.total_notes} notes)"
+
+    @property
+    def moyenne(self):
+        return round(self.somme_notes / self.total_notes, 2) if self.total_notes else 0
+
+    def distribution(self):
+        return {note: getattr(self, f"nb_note_{note}") for note in range(1, 6)}
+
+    @classmethod
+    def calculer_score(cls, somme, total):
+        poids = cls.BAYES_PRIOR_POIDS
+        return (poids * cls.BAYES_PRIOR_MOYENNE + somme) / (poids + total)
+
+    @classmethod
+    def appliquer(cls, memoire_id, ancienne_note=None, nouvelle_note=None):
+        """
+        Applique le delta d'une note en un seul UPDATE atomique.
+        - création     : nouvelle_note seule
+        - modification : ancienne_note et nouvelle_note
+        - suppression  : ancienne_note seule
+        À appeler dans la même transaction que l'écriture de la Notation.
+        """
+        if ancienne_note == nouvelle_note:
+            return
+        delta_total = (nouvelle_note is not None) - (ancienne_note is not None)
+        delta_somme = (nouvelle_note or 0) - (ancienne_note or 0)
+
+        updates = {
+            "total_notes": F("total_notes") + delta_total,
+            "somme_notes": F("somme_notes") + delta_somme,
+            # SQL évalue le SET sur les anciennes valeurs : on réapplique le delta
+            "score_bayesien": (
+                cls.BAYES_PRIOR_POIDS * cls.BAYES_PRIOR_MOYENNE
+                + Cast(F("somme_notes") + delta_somme, FloatField())
+            ) / (cls.BAYES_PRIOR_POIDS + F("total_notes") + delta_total),
+            "updated_at": timezone.now(),
+        }
+        if ancienne_note is not None:
+            updates[f"nb_note_{ancienne_note}"] = F(f"nb_note_{ancienne_note}") - 1
+        if nouvelle_note is not None:
+            updates[f"nb_note_{nouvelle_note}"] = F(f"nb_note_{nouvelle_note}") + 1
+
+        if not cls.objects.filter(memoire_id=memoire_id).update(**updates) and nouvelle_note is not None:
+            # Pas encore de ligne : on la construit depuis la table Notation.
+            # Suppression sans ligne (mémoire supprimé en cascade) : rien à faire
+            cls.recalculer(memoire_id)
+
+    @classmethod
+    def recalculer(cls, memoire_id):
+        """Reconstruit l'agrégat depuis la table Notation (rattrapage / backfill)."""
+        agg = Notation.objects.filter(memoire_id=memoire_id).aggregate(
+            total_notes=Count("id"),
+            somme_notes=Sum("note"),
+            **{
+                f"nb_note_{note}": Count("id", filter=Q(note=note))
+                for note in range(1, 6)
+            },
+        )
+        agg["somme_notes"] = agg["somme_notes"] or 0
+        agg["score_bayesien"] = cls.calculer_score(agg["somme_notes"], agg["total_notes"])
+        stats, _ = cls.objects.update_or_create(memoire_id=memoire_id, defaults=agg)
+        return stats
+
+    @classmethod
+    def recalculer_tout(cls):
+        """
+        Reconstruit tous les agrégats en une agrégation groupée (écritures en
+        masse hors signaux). Renvoie le nombre de mémoires notés.
+        """
+        agregats = Notation.objects.order_by().values("memoire_id").annotate(
+            total_notes=Count("id"),
+            somme_notes=Sum("note"),
+            **{
+                f"nb_note_{note}": Count("id", filter=Q(note=note))
+                for note in range(1, 6)
+            },
+        )
+        stats = [
+            cls(score_bayesien=cls.calculer_score(agg["somme_notes"], agg["total_notes"]), **agg)
+            for agg in agregats
+        ]
+        champs = ["total_notes", "somme_notes", *(f"nb_note_{note}" for note in range(1, 6)),
+                  "score_bayesien", "updated_at"]
+        with transaction.atomic():
+            # Mémoires sans note : agrégat remis à zéro
+            cls.objects.exclude(memoire_id__in=Notation.objects.values("memoire_id")).update(
+                **{champ: 0 for champ in champs[:-2]},
+                score_bayesien=cls.calculer_score(0, 0),
+                updated_at=timezone.now(),
+            )
+            cls.objects.bulk_create(
+                stats, batch_size=1000,
+                update_conflicts=True, unique_fields=["memoire"], update_fields=champs,
+            )
+        return len(stats)
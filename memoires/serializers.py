@@ -152,7 +152,7 @@ class MemoireUniversiteListSerializer(serializers.ModelSerializer):
     def get_is_liked(self, obj):
         user = self.context["request"].user
         return (
-            obj.likes.filter(utilisateur=user).exists()
+            obj.likes.filter(utilisateur_id=user.pk).exists()
             if user.is_authenticated
             else False
         )
@@ -0,0 +1,37 @@
+# memoires/signals.py
+"""
+Agrégats de notation (MemoireNotationStats) tenus à jour pour toute écriture
+d'une Notation par l'ORM : API, admin Django, suppression en cascade (mémoire
+ou compte supprimé). Le delta s'applique dans la transaction de l'écriture.
+"""
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from memoires.models import MemoireNotationStats, Notation
+
+
+@receiver(post_save, sender=Notation)
+def appliquer_note(sender, instance, created, raw=False, **kwargs):
+    if raw:  # loaddata : stats chargées avec les données
+        return
+    precedent = getattr(instance, "_etat_charge", None)
+    if created:
+        MemoireNotationStats.appliquer(instance.memoire_id, nouvelle_note=instance.note)
+    elif precedent is None:
+        # Instance construite hors base : note précédente inconnue
+        MemoireNotationStats.recalculer(instance.memoire_id)
+    elif precedent[0] == instance.memoire_id:
+        MemoireNotationStats.appliquer(
+            instance.memoire_id, ancienne_note=precedent[1], nouvelle_note=instance.note
+        )
+    else:
+        # Note déplacée vers un autre mémoire (admin)
+        MemoireNotationStats.appliquer(precedent[0], ancienne_note=precedent[1])
+        MemoireNotationStats.appliquer(instance.memoire_id, nouvelle_note=instance.note)
+    instance._etat_charge = (instance.memoire_id, instance.note)
+
+
+@receiver(post_delete, sender=Notation)
+def retirer_note(sender, instance, **kwargs):
+    memoire_id, note = getattr(instance, "_etat_charge", (instance.memoire_id, instance.note))
+    MemoireNotationStats.appliquer(memoire_id, ancienne_note=note)
@@ -1,11 +1,13 @@
 from django.shortcuts import get_object_or_404
-from django.db.models import Avg, Count
+from django.db.models import Avg, Count, F, FloatField, Value
+from django.db.models.functions import Coalesce
 from rest_framework import viewsets, permissions, status, filters, generics
 from rest_framework.decorators import action
+from users.audit_sink import audit_sink
 from users.models import AuditLog
 from rest_framework.response import Response
 from drf_spectacular.utils import extend_schema, extend_schema_view
-from memoires.models import Memoire, Encadrement
+from memoires.models import Memoire, Encadrement, MemoireNotationStats
 from memoires.serializers import (
     MemoireUniversiteListSerializer,
     MemoireUniversiteCreateSerializer,
@@ -13,6 +15,7 @@ from memoires.serializers import (
     MemoireUniversiteStatsSerializer,
 )
 from universites.models import Universite
+from universites.resolver import get_universite_or_404, universites_meres
 from universites.permissions import (
     IsMemberOfUniversite,
     IsAdminOfUniversite,
@@ -24,22 +27,29 @@ from django.db import transaction
 User = get_user_model()
 from rest_framework import generics, permissions, pagination
 from interactions.models import Commentaire
-from memoires.serializers import CommentaireSerializer
+from interactions.pagination import parse_since
+from memoires.serializers import CommentaireSerializer, UtilisateurSerializer
 class CommentaireListView(generics.ListAPIView):
     """
     GET /api/universites/<univ_slug>/memoires/<memoire_id>/commentaires/
     Renvoie la liste des commentaires d’un mémoire (non modérés).
+    Réponse inchangée : liste complète, sans enveloppe (PAGE_SIZE non défini) ;
+    ?since=<ISO 8601> pour ne récupérer que les nouveaux. Pagination keyset :
+    GET /api/interactions/commentaires/memoire/<memoire_id>/.
     """
     serializer_class = CommentaireSerializer
     permission_classes = [permissions.AllowAny]   # lecture publique
     pagination_class = pagination.PageNumberPagination   # optionnel
+    stateless_auth = True
 
     def get_queryset(self):
         memoire_id = self.kwargs["memoire_id"]
         # on exclut les commentaires masqués (modération)
-        return Commentaire.objects.filter(
-            memoire_id=memoire_id, modere=False
-        ).select_related("utilisateur").order_by("-date")
+        return Commentaire.publics(
+            memoire_id,
+            since=parse_since(self.request),
+            user_fields=UtilisateurSerializer.Meta.fields,
+        )
 @extend_schema_view(
     list=extend_schema(summary="Liste des mémoires de l’université"),
     retrieve=extend_schema(summary="Détail d’un mémoire"),
@@ -58,13 +68,25 @@ class UniversiteMemoireViewSet(viewsets.ModelViewSet):
 
     filter_backends = [filters.SearchFilter, filters.OrderingFilter]
     search_fields = ["titre", "resume", "auteur__nom", "auteur__prenom"]
-    ordering_fields = ["annee", "created_at"]
+    ordering_fields = ["annee", "created_at", "score_bayesien"]
+    stateless_auth = True  # GET : utilisateur issu du jeton (cf. users/authentication.py)
 
     def get_universite(self):
-        return get_object_or_404(Universite, slug=self.kwargs["univ_slug"])
+        return get_universite_or_404(self.kwargs["univ_slug"], self.request)
 
     def get_queryset(self):
-        qs = Memoire.objects.filter(universites=self.get_universite()).distinct()
+        qs = (
+            Memoire.objects.filter(universites=self.get_universite())
+            .select_related("notation_stats")
+            # Classement : ?ordering=-score_bayesien (pré-calculé à chaque note) ;
+            # sans ligne de stats (aucune note), score a priori et non NULL
+            .annotate(score_bayesien=Coalesce(
+                F("notation_stats__score_bayesien"),
+                Value(MemoireNotationStats.calculer_score(0, 0)),
+                output_field=FloatField(),
+            ))
+            .distinct()
+        )
         annee = self.request.query_params.get("annee")
         domaine = self.request.query_params.get("domaine")
         if annee:
@@ -103,7 +125,7 @@ class UniversiteMemoireViewSet(viewsets.ModelViewSet):
             else:
                 target_repr = str(target_obj)
         
-        AuditLog.objects.create(
+        audit_sink.write(AuditLog(
             user_id=user.id if user.is_authenticated else None,
             user_email=user.email if user.is_authenticated else 'Anonyme',
             user_role=getattr(user, 'role', '') if user.is_authenticated else '',
@@ -120,7 +142,7 @@ class UniversiteMemoireViewSet(viewsets.ModelViewSet):
             request_path=self.request.path,
             request_method=self.request.method,
             description=description
-        )
+        ))
 
     def perform_create(self, serializer):
         user = self.request.user
@@ -131,9 +153,9 @@ class UniversiteMemoireViewSet(viewsets.ModelViewSet):
         memoire.universites.add(univ)
         
         # Récupérer les universités mères et les ajouter au mémoire
-        universites_meres = univ.get_universites_meres()
-        for affiliation in universites_meres:
-            memoire.universites.add(affiliation.universite_mere)
+        meres = universites_meres(univ, self.request)
+        if meres:
+            memoire.universites.add(*meres)
         
         # LOG: Création de mémoire
         self._log_action(
@@ -383,7 +405,7 @@ class MemoireEncadrementView(generics.GenericAPIView):
         ser = EncadrementAddSerializer(data=request.data)
         ser.is_valid(raise_exception=True)
 
-        univ = get_object_or_404(Universite, slug=univ_slug)
+        univ = get_universite_or_404(univ_slug, request)
         memoire = get_object_or_404(Memoire, pk=pk, universites=univ)
         encadreur = get_object_or_404(User, pk=ser.validated_data["encadreur_id"])
 
@@ -403,7 +425,7 @@ class MemoireEncadrementView(generics.GenericAPIView):
         ser = EncadrementAddSerializer(data=request.data)
         ser.is_valid(raise_exception=True)
 
-        univ = get_object_or_404(Universite, slug=univ_slug)
+        univ = get_universite_or_404(univ_slug, request)
         memoire = get_object_or_404(Memoire, pk=pk, universites=univ)
         Encadrement.objects.filter(
             memoire=memoire,
@@ -451,13 +473,13 @@ class AuteurDashboardView(generics.GenericAPIView):
 
     def get(self, request, *args, **kwargs):
         print("Slug reçu :", kwargs.get("univ_slug"))
-        univ = get_object_or_404(Universite, slug=kwargs["univ_slug"])
+        univ = get_universite_or_404(kwargs["univ_slug"], request)
         print("Université trouvée :", univ)
 
         user = request.user
         print("User connecté :", user)
 
-        memoires = user.memoires.filter(universites=univ)
+        memoires = user.memoires.filter(universites=univ).select_related("notation_stats")
         print("Memoires count :", memoires.count())
 
         if not memoires.exists():
@@ -492,6 +514,7 @@ from rest_framework import generics, permissions
 from rest_framework.response import Response
 from django.shortcuts import get_object_or_404
 from universites.models import Universite, RoleUniversite
+from universites.roles import get_role_map
 from users.models import CustomUser
 from memoires.models import Memoire
 
@@ -505,7 +528,7 @@ class UserUniversiteStatsView(generics.GenericAPIView):
     permission_classes = [permissions.AllowAny]  # ou IsAdminOfUniversite selon besoin
 
     def get(self, request, univ_slug):
-        universite = get_object_or_404(Universite, slug=univ_slug)
+        universite = get_universite_or_404(univ_slug, request)
         
         # Récupérer tous les mémoires de l'université
         memoires_univ = Memoire.objects.filter(universites=universite)
@@ -529,7 +552,9 @@ class UserUniversiteStatsView(generics.GenericAPIView):
             memoires_encadres = memoires_univ.filter(encadrements__encadreur=user)
             
             # Tous les mémoires liés à l'user
-            memoires_lies = (memoires_auteur | memoires_encadres).distinct()
+            memoires_lies = (memoires_auteur | memoires_encadres).distinct().select_related(
+                "notation_stats"
+            )
             
             # --- STATISTIQUES GLOBALES ---
             total_memoires_auteur = memoires_auteur.count()
@@ -553,7 +578,7 @@ class UserUniversiteStatsView(generics.GenericAPIView):
                     notes.append(note_moy)
             
             note_moyenne_globale = round(sum(notes) / len(notes), 2) if notes else 0
-            total_notations = sum(m.notations.count() for m in memoires_lies)
+            total_notations = sum(m.nb_notations() for m in memoires_lies)
             
             # --- DÉTAILS PAR MÉMOIRE ---
             memoires_details = []
@@ -574,7 +599,7 @@ class UserUniversiteStatsView(generics.GenericAPIView):
                     "nb_likes": memoire.likes.count(),
                     "nb_commentaires": memoire.commentaires.filter(modere=False).count(),
                     "note_moyenne": memoire.note_moyenne(),
-                    "nb_notations": memoire.notations.count(),
+                    "nb_notations": memoire.nb_notations(),
                 })
             
             # --- STATISTIQUES PAR DOMAINE ---
@@ -624,7 +649,7 @@ class UserUniversiteStatsView(generics.GenericAPIView):
                     "type": user.type,
                     "photo_profil": request.build_absolute_uri(user.photo_profil.url) if user.photo_profil else None,
                     "linkedin": user.realisation_linkedin,
-                    "role":RoleUniversite.objects.get(utilisateur=user, universite=universite).role if RoleUniversite.objects.filter(utilisateur=user, universite=universite).exists() else "N/A",
+                    "role": get_role_map(user).role(universite_id=universite.id) or "N/A",
                 },
                 "statistiques_globales": {
                     "total_memoires_auteur": total_memoires_auteur,
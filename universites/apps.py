@@ -4,3 +4,6 @@ from django.apps import AppConfig
 class UniversitesConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'universites'
+
+    def ready(self):
+        import universites.signals  # noqa: F401  (invalidation des caches rôles / universités)
@@ -1,9 +1,36 @@
 from django.db import models
+from django.db.models.functions import Coalesce
 from django.conf import settings
 from django.utils.text import slugify
 import unicodedata
 from django.core.exceptions import ValidationError
 
+class UniversiteQuerySet(models.QuerySet):
+    def avec_totaux(self):
+        """
+        Annote nb_membres / nb_domaines par sous-requêtes corrélées :
+        pas de jointure multipliant les lignes, nombre de requêtes constant.
+        """
+        membres = (
+            RoleUniversite.objects.filter(universite=models.OuterRef("pk"))
+            .order_by()
+            .values("universite")
+            .annotate(n=models.Count("id"))
+            .values("n")
+        )
+        domaines = (
+            Domaine.universites.through.objects.filter(universite=models.OuterRef("pk"))
+            .order_by()
+            .values("universite")
+            .annotate(n=models.Count("id"))
+            .values("n")
+        )
+        return self.annotate(
+            nb_membres=Coalesce(models.Subquery(membres), 0),
+            nb_domaines=Coalesce(models.Subquery(domaines), 0),
+        )
+
+
 class Universite(models.Model):
     nom = models.CharField(max_length=200, unique=True)
     acronyme = models.CharField(max_length=20, unique=True)
@@ -13,6 +40,8 @@ class Universite(models.Model):
     slug = models.SlugField(max_length=220, unique=True, blank=True)
     created_at = models.DateTimeField(auto_now_add=True)
 
+    objects = UniversiteQuerySet.as_manager()
+
     class Meta:
         ordering = ["nom"]
 
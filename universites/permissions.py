@@ -1,5 +1,6 @@
 from rest_framework import permissions
 from universites.models import RoleUniversite
+from universites.roles import ADMIN_ROLES, has_role
 from django.contrib.auth import get_user_model
 User = get_user_model()
 
@@ -14,27 +15,20 @@ class IsMemberOfUniversite(permissions.BasePermission):
         if not request.user.is_authenticated:
             return False
         slug = view.kwargs.get('univ_slug')
-        return RoleUniversite.objects.filter(
-            utilisateur=request.user,
-            universite__slug=slug
-        ).exists()
+        return has_role(request.user, slug=slug)
 
 
 from rest_framework import permissions
 from django.apps import apps
 
 class IsAdminOfUniversite(permissions.BasePermission):
-    admin_roles = {'admin', 'superadmin', 'bigboss'}
+    admin_roles = ADMIN_ROLES
     
     def has_permission(self, request, view):
         if not request.user.is_authenticated:
             return False
         slug = view.kwargs.get('univ_slug')
-        return RoleUniversite.objects.filter(
-            utilisateur=request.user,
-            universite__slug=slug,
-            role__in=self.admin_roles
-        ).exists()
+        return has_role(request.user, self.admin_roles, slug=slug)
     
     def has_object_permission(self, request, view, obj):
         """
@@ -47,23 +41,19 @@ class IsAdminOfUniversite(permissions.BasePermission):
             
         # Vérifie simplement si l'utilisateur est admin de l'université du slug
         # Peu importe l'objet passé (Universite, Memoire, etc.)
-        return RoleUniversite.objects.filter(
-            utilisateur=request.user,
-            universite__slug=slug,
-            role__in=self.admin_roles
-        ).exists()
+        return has_role(request.user, self.admin_roles, slug=slug)
 
 class IsAuthorOrAdminOfUniversite(permissions.BasePermission):
-    admin_roles = {'admin', 'superadmin', 'bigboss'}
+    admin_roles = ADMIN_ROLES
     def has_object_permission(self, request, view, obj):
-        if obj.auteur == request.user:
+        if obj.auteur_id == request.user.pk:
             return True
         slug = view.kwargs.get('univ_slug')
-        return obj.universites.filter(
-            slug=slug,
-            roles__utilisateur=request.user,
-            roles__role__in=self.admin_roles
-        ).exists()
+        # Rôle lu dans le cache d'abord : la requête de liaison n'a lieu que si besoin
+        return (
+            has_role(request.user, self.admin_roles, slug=slug)
+            and obj.universites.filter(slug=slug).exists()
+        )
 class IsBigBossOrSuperAdmin(permissions.BasePermission):
     def has_permission(self, request, view):
         user = request.user
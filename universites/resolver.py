@@ -0,0 +1,121 @@
+# universites/resolver.py
+"""
+Résolution slug → Universite (et universités mères) partagée par toutes les vues
+scopées par université.
+
+Deux niveaux de cache :
+  - la requête HTTP (dict posé sur le HttpRequest sous-jacent) : un même slug
+    n'est résolu qu'une fois, quel que soit le nombre d'appels ;
+  - le cache Django, sous une clé versionnée changée à chaque écriture sur
+    Universite ou Affiliation (cf. universites/signals.py).
+"""
+import uuid
+
+from django.conf import settings
+from django.core.cache import cache
+from django.http import Http404
+
+CACHE_TIMEOUT = getattr(settings, "UNIVERSITE_CACHE_TIMEOUT", 60 * 60)
+VERSION_KEY = "universites:version"
+_ABSENT = "__absent__"
+_MEMO_ATTR = "_universites_resolues"
+
+
+def _version():
+    version = cache.get(VERSION_KEY)
+    if version is None:
+        cache.add(VERSION_KEY, uuid.uuid4().hex[:12], None)
+        version = cache.get(VERSION_KEY)
+    return version
+
+
+def _memo(request):
+    if request is None:
+        return {}
+    # Request DRF → HttpRequest : un seul dict pour la vue et les middlewares
+    request = getattr(request, "_request", request)
+    memo = getattr(request, _MEMO_ATTR, None)
+    if memo is None:
+        memo = {}
+        setattr(request, _MEMO_ATTR, memo)
+    return memo
+
+
+def get_universite(slug, request=None):
+    """Universite du slug, None si inconnue."""
+    if not slug:
+        return None
+    memo = _memo(request)
+    if ("slug", slug) in memo:
+        return memo[("slug", slug)]
+
+    key = f"universites:slug:{_version()}:{slug}"
+    universite = cache.get(key)
+    if universite is None:
+        from universites.models import Universite
+
+        universite = Universite.objects.filter(slug=slug).first() or _ABSENT
+        cache.set(key, universite, CACHE_TIMEOUT)
+    if universite == _ABSENT:
+        universite = None
+
+    memo[("slug", slug)] = universite
+    return universite
+
+
+def get_universite_or_404(slug, request=None):
+    universite = get_universite(slug, request)
+    if universite is None:
+        raise Http404("Aucune université ne correspond à ce slug.")
+    return universite
+
+
+def _parents(universite, request=None):
+    memo = _memo(request)
+    if ("parents", universite.pk) in memo:
+        return memo[("parents", universite.pk)]
+
+    key = f"universites:parents:{_version()}:{universite.pk}"
+    parents = cache.get(key)
+    if parents is None:
+        from universites.models import Affiliation, Universite
+
+        # Graphe d'affiliation complet (petite table) puis parcours en largeur
+        graphe = {}
+        for fille_id, mere_id in Affiliation.objects.values_list(
+            "universite_affiliee_id", "universite_mere_id"
+        ):
+            graphe.setdefault(fille_id, []).append(mere_id)
+
+        directes = list(graphe.get(universite.pk, []))
+        ancetres, a_visiter = [], list(directes)
+        while a_visiter:
+            mere_id = a_visiter.pop(0)
+            if mere_id in ancetres or mere_id == universite.pk:
+                continue
+            ancetres.append(mere_id)
+            a_visiter.extend(graphe.get(mere_id, []))
+
+        par_id = Universite.objects.in_bulk(ancetres) if ancetres else {}
+        parents = {
+            "meres": [par_id[i] for i in directes if i in par_id],
+            "ancetres": [par_id[i] for i in ancetres if i in par_id],
+        }
+        cache.set(key, parents, CACHE_TIMEOUT)
+
+    memo[("parents", universite.pk)] = parents
+    return parents
+
+
+def universites_meres(universite, request=None):
+    """Universités mères directes (équivalent de get_universites_meres())."""
+    return _parents(universite, request)["meres"]
+
+
+def universites_ancetres(universite, request=None):
+    """Mères directes puis mères des mères, sans doublon."""
+    return _parents(universite, request)["ancetres"]
+
+
+def invalidate_universites():
+    cache.set(VERSION_KEY, uuid.uuid4().hex[:12], None)
@@ -0,0 +1,135 @@
+# universites/roles.py
+"""
+Résolution des rôles universitaires d'un utilisateur.
+
+La carte {universite_id: role} (+ slug → id) est chargée une seule fois par
+requête (mémoïsée sur l'instance utilisateur, recréée à chaque requête par
+l'authentification) et partagée entre processus via le cache Django sous une
+clé versionnée :
+
+    roles:map:<version globale>:<user_id>:<version utilisateur>
+
+Une écriture sur RoleUniversite change la version de l'utilisateur, une écriture
+sur Universite (slug) change la version globale : les anciennes entrées ne sont
+plus jamais lues et expirent d'elles-mêmes.
+"""
+import uuid
+
+from django.conf import settings
+from django.core.cache import cache
+
+ADMIN_ROLES = frozenset({"admin", "superadmin", "bigboss"})
+SUPERADMIN_ROLES = frozenset({"superadmin", "bigboss"})
+
+CACHE_TIMEOUT = getattr(settings, "ROLE_CACHE_TIMEOUT", 60 * 60)
+GLOBAL_VERSION_KEY = "roles:version"
+_MEMO_ATTR = "_role_map"
+
+
+def _user_version_key(user_id):
+    return f"roles:version:{user_id}"
+
+
+def _new_version():
+    # Jeton aléatoire plutôt qu'un compteur : une clé de version évincée du
+    # cache ne peut pas ressusciter une ancienne carte
+    return uuid.uuid4().hex[:12]
+
+
+class RoleMap:
+    """Rôles d'un utilisateur, indexés par id et par slug d'université."""
+
+    def __init__(self, roles=None, slugs=None):
+        self.roles = roles or {}   # {universite_id: role}
+        self.slugs = slugs or {}   # {slug: universite_id}
+
+    def role(self, universite_id=None, slug=None):
+        if universite_id is None:
+            universite_id = self.slugs.get(slug)
+        else:
+            universite_id = int(universite_id)
+        return self.roles.get(universite_id)
+
+    def has_role(self, roles=None, universite_id=None, slug=None):
+        """roles=None : simple appartenance, quel que soit le rôle."""
+        role = self.role(universite_id=universite_id, slug=slug)
+        if role is None:
+            return False
+        return roles is None or role in roles
+
+    def universite_ids(self, roles=None):
+        return [uid for uid, role in self.roles.items() if roles is None or role in roles]
+
+
+def _versions(user_id):
+    ukey = _user_version_key(user_id)
+    versions = cache.get_many([GLOBAL_VERSION_KEY, ukey])
+    missing = [key for key in (GLOBAL_VERSION_KEY, ukey) if key not in versions]
+    for key in missing:
+        cache.add(key, _new_version(), None)
+    if missing:
+        versions = cache.get_many([GLOBAL_VERSION_KEY, ukey])
+    return versions.get(GLOBAL_VERSION_KEY), versions.get(ukey)
+
+
+def get_role_map(user):
+    """RoleMap de l'utilisateur : 0 requête SQL si déjà en cache."""
+    if user is None or not user.is_authenticated:
+        return RoleMap()
+    memo = user.__dict__.get(_MEMO_ATTR)
+    if memo is not None:
+        return memo
+
+    global_version, user_version = _versions(user.pk)
+    key = f"roles:map:{global_version}:{user.pk}:{user_version}"
+    data = cache.get(key)
+    if data is None:
+        from universites.models import RoleUniversite
+
+        data = {"roles": {}, "slugs": {}}
+        rows = RoleUniversite.objects.filter(utilisateur_id=user.pk).values_list(
+            "universite_id", "universite__slug", "role"
+        )
+        for universite_id, slug, role in rows:
+            data["roles"][universite_id] = role
+            data["slugs"][slug] = universite_id
+        cache.set(key, data, CACHE_TIMEOUT)
+
+    role_map = RoleMap(data["roles"], data["slugs"])
+    user.__dict__[_MEMO_ATTR] = role_map
+    return role_map
+
+
+def get_role_version(user_id):
+    """Version courante des rôles de l'utilisateur (globale + personnelle)."""
+    global_version, user_version = _versions(user_id)
+    return f"{global_version}.{user_version}"
+
+
+def seed_role_map(user, role_map):
+    """Pose une carte déjà connue (ex. claims JWT) comme mémoïsation de requête."""
+    user.__dict__[_MEMO_ATTR] = role_map
+
+
+def has_role(user, roles=None, universite_id=None, slug=None):
+    return get_role_map(user).has_role(roles, universite_id=universite_id, slug=slug)
+
+
+def forget_role_map(user):
+    """Oublie la mémoïsation de requête (après un changement de rôle en cours de vue)."""
+    if user is not None:
+        user.__dict__.pop(_MEMO_ATTR, None)
+
+
+def invalidate_user_roles(user_id):
+    cache.set(_user_version_key(user_id), _new_version(), None)
+
+
+def invalidate_users_roles(user_ids):
+    """Version lot (bulk_create/update ne déclenchent pas les signaux)."""
+    if user_ids:
+        cache.set_many({_user_version_key(uid): _new_version() for uid in user_ids}, None)
+
+
+def invalidate_all_roles():
+    cache.set(GLOBAL_VERSION_KEY, _new_version(), None)
@@ -33,11 +33,15 @@ class UniversiteSerializer(serializers.ModelSerializer):
         ]
         read_only_fields = ['id', 'created_at', 'slug', 'total_membres', 'total_domaines', 'logo_url']
 
+    # Annotations de Universite.objects.avec_totaux() ; count() en repli
+    # (instance créée, université imbriquée dans DomaineSerializer)
     def get_total_membres(self, obj):
-        return obj.roles.count()  # related_name='roles' dans RoleUniversite.universite
+        total = getattr(obj, 'nb_membres', None)
+        return obj.roles.count() if total is None else total
 
     def get_total_domaines(self, obj):
-        return obj.domaines.count()  # related_name='domaines' dans Domaine.universites
+        total = getattr(obj, 'nb_domaines', None)
+        return obj.domaines.count() if total is None else total
 
     def get_logo_url(self, obj):
         request = self.context.get('request')
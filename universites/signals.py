@@ -0,0 +1,46 @@
+# universites/signals.py
+from django.conf import settings
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from universites.models import Affiliation, RoleUniversite, Universite
+from universites.resolver import invalidate_universites
+from universites.roles import forget_role_map, invalidate_all_roles, invalidate_user_roles
+from users.audit_notifications import invalidate_alert_recipients
+
+
+@receiver([post_save, post_delete], sender=RoleUniversite)
+def invalider_roles_utilisateur(sender, instance, **kwargs):
+    # Après le commit : invalidée avant, la carte pourrait être relue (anciens rôles)
+    # par une requête concurrente et remise en cache sous la nouvelle version
+    user_id, universite_id = instance.utilisateur_id, instance.universite_id
+
+    def invalider():
+        invalidate_user_roles(user_id)
+        # Destinataires des alertes critiques de l'université
+        invalidate_alert_recipients(universite_id)
+
+    transaction.on_commit(invalider)
+    # L'utilisateur chargé dans la requête courante ne doit pas garder l'ancienne carte
+    forget_role_map(instance._state.fields_cache.get("utilisateur"))
+
+
+@receiver(post_save, sender=settings.AUTH_USER_MODEL)
+def invalider_roles_compte(sender, instance, created, **kwargs):
+    # Compte modifié (désactivation, type, staff) : les jetons à rôles embarqués sont périmés
+    if not created:
+        user_id = instance.pk
+        transaction.on_commit(lambda: invalidate_user_roles(user_id))
+
+
+@receiver([post_save, post_delete], sender=Universite)
+def invalider_roles_universite(sender, instance, **kwargs):
+    # Slug modifié ou université supprimée : toutes les cartes slug → id sont périmées
+    transaction.on_commit(invalidate_all_roles)
+    transaction.on_commit(invalidate_universites)
+
+
+@receiver([post_save, post_delete], sender=Affiliation)
+def invalider_affiliations(sender, instance, **kwargs):
+    transaction.on_commit(invalidate_universites)
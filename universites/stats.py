@@ -0,0 +1,111 @@
+# universites/stats.py
+"""
+Statistiques publiques d'une université, calculées en requêtes groupées
+(Count conditionnels + TruncMonth) et mises en cache quelques secondes :
+les pages publiques des universités les interrogent à chaque affichage.
+"""
+from dateutil.relativedelta import relativedelta
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Count, Q
+from django.db.models.functions import TruncMonth
+from django.utils import timezone
+
+from universites.models import Domaine, RoleUniversite
+
+CACHE_TIMEOUT = getattr(settings, "STATS_CACHE_TIMEOUT", 60)
+NB_MOIS = 12
+
+
+def _cached(key, builder):
+    data = cache.get(key)
+    if data is None:
+        data = builder()
+        cache.set(key, data, CACHE_TIMEOUT)
+    return data
+
+
+def _comptes_roles(univ, **extra):
+    """Une requête : total + un Count(filter=...) par rôle (+ agrégats extra)."""
+    aggregats = {
+        f"role_{code}": Count("id", filter=Q(role=code))
+        for code, _ in RoleUniversite.ROLE_CHOICES
+    }
+    resultat = RoleUniversite.objects.filter(universite=univ).aggregate(
+        total=Count("id"), **aggregats, **extra
+    )
+    repartition = {
+        code: resultat.pop(f"role_{code}")
+        for code, _ in RoleUniversite.ROLE_CHOICES
+        if resultat[f"role_{code}"]
+    }
+    return resultat, repartition
+
+
+def stats_membres(univ):
+    """Membres, actifs/inactifs, rôles, mémoires et évolution mensuelle : 3 requêtes."""
+    from memoires.models import Memoire
+
+    def build():
+        comptes, repartition = _comptes_roles(
+            univ,
+            actif=Count("id", filter=Q(utilisateur__is_active=True)),
+        )
+
+        # Mois calendaires, du plus ancien au mois courant (mois vides à 0)
+        debut = timezone.now().replace(day=1, hour=0, minute=0, second=0, microsecond=0)
+        debut -= relativedelta(months=NB_MOIS - 1)
+        par_mois = dict(
+            RoleUniversite.objects.filter(universite=univ, created_at__gte=debut)
+            .annotate(mois=TruncMonth("created_at"))
+            .values("mois")
+            .annotate(n=Count("id"))
+            .order_by()
+            .values_list("mois", "n")
+        )
+        par_mois = {mois.strftime("%Y-%m"): n for mois, n in par_mois.items()}
+        evolution = []
+        for i in range(NB_MOIS):
+            mois = (debut + relativedelta(months=i)).strftime("%Y-%m")
+            evolution.append({"month": mois, "new_members": par_mois.get(mois, 0)})
+
+        total_memoires = (
+            Memoire.universites.through.objects.filter(universite=univ)
+            .values("memoire_id")
+            .distinct()
+            .count()
+        )
+
+        # unique_together (utilisateur, universite) : une ligne de rôle = un membre
+        return {
+            "universite": univ.nom,
+            "total_membres": comptes["total"],
+            "actif": comptes["actif"],
+            "inactif": comptes["total"] - comptes["actif"],
+            "total_memoires": total_memoires,
+            "repartition_roles": dict(
+                sorted(repartition.items(), key=lambda item: -item[1])
+            ),
+            "evolution_mensuelle": evolution,
+        }
+
+    return _cached(f"stats:universite:{univ.pk}:membres", build)
+
+
+def stats_universite(univ):
+    """Membres par rôle et nombre de domaines : 2 requêtes."""
+
+    def build():
+        comptes, repartition = _comptes_roles(univ)
+        return {
+            "universite": univ.nom,
+            "acronyme": univ.acronyme,
+            "created_at": univ.created_at,
+            "total_membres": comptes["total"],
+            "membres_par_role": repartition,
+            "total_domaines": Domaine.universites.through.objects.filter(
+                universite=univ
+            ).count(),
+        }
+
+    return _cached(f"stats:universite:{univ.pk}:resume", build)
@@ -19,6 +19,8 @@ from .serializers import (
     AffiliationSerializer,
 )
 from universites.permissions import IsMemberOfUniversite,IsAdminOfUniversite ,IsBigBossOrSuperAdmin
+from universites.resolver import get_universite_or_404, universites_meres
+from universites.stats import stats_universite
 from django.core.mail import send_mail, EmailMessage
 from django.template.loader import render_to_string
 from users.tokens import make_email_token, verify_email_token
@@ -30,11 +32,12 @@ logger = logging.getLogger(__name__)
 # ==== IMPORTS TRAÇABILITÉ (AJOUTÉS) ====
 from users.utils import AuditMixin, serialize_instance, create_audit_log, get_client_ip
 from users.models import AuditLog
+from users.exports import Column, StreamingExport
 from users.permissions import(IsSuperAdminInUniversite,IsAdminInUniversite)
 # -------------------- Université (CRUD) --------------------
 # -------------------- Université (CRUD) --------------------
 class UniversiteViewSet(viewsets.ModelViewSet):
-    queryset = Universite.objects.all()
+    queryset = Universite.objects.avec_totaux()
     serializer_class = UniversiteSerializer
     permission_classes = [permissions.IsAuthenticated]
     filter_backends = [filters.SearchFilter]
@@ -169,21 +172,7 @@ class UniversiteStatsView(generics.GenericAPIView):
 
     def get(self, request, *args, **kwargs):
         univ = self.get_object()
-        roles = (
-            RoleUniversite.objects.filter(universite=univ)
-            .values('role')
-            .annotate(count=RoleUniversite.objects.count())
-        )
-        return Response(
-            {
-                "universite": univ.nom,
-                "acronyme": univ.acronyme,
-                "created_at": univ.created_at,
-                "total_membres": RoleUniversite.objects.filter(universite=univ).count(),
-                "membres_par_role": {r['role']: r['count'] for r in roles},
-                "total_domaines": univ.domaines.count(),
-            }
-        )
+        return Response(stats_universite(univ))
 
 
 # --------- 2. Upload / suppression logo ---------
@@ -387,6 +376,16 @@ class BulkDeleteUniversitesView(generics.GenericAPIView):
         return Response({"detail": f"{count} université(s) supprimée(s)."}, status=status.HTTP_200_OK)
 
 
+UNIVERSITES_EXPORT_COLUMNS = [
+    Column('nom', 'Nom'),
+    Column('acronyme', 'Acronyme'),
+    Column('site_web', 'Site web'),
+    Column('membres', 'Membres', field='nb_membres'),
+    Column('domaines', 'Domaines', field='nb_domaines'),
+    Column('created_at', 'Créée le', format=lambda d: d.date()),
+]
+
+
 class ExportUniversitesCSVView(generics.GenericAPIView):
     """
     GET /api/universites/export/csv/
@@ -395,23 +394,10 @@ class ExportUniversitesCSVView(generics.GenericAPIView):
     permission_classes = [permissions.IsAdminUser]
 
     def get(self, request, *args, **kwargs):
-        from django.http import HttpResponse
-
-        response = HttpResponse(content_type='text/csv')
-        response['Content-Disposition'] = 'attachment; filename="universites.csv"'
-        writer = csv.writer(response)
-        writer.writerow(['Nom', 'Acronyme', 'Site web', 'Membres', 'Domaines', 'Créée le'])
-
-        for univ in Universite.objects.all():
-            writer.writerow([
-                univ.nom,
-                univ.acronyme,
-                univ.site_web or '',
-                univ.roles.count(),
-                univ.domaines.count(),
-                univ.created_at.date(),
-            ])
-        return response
+        # Une requête (totaux annotés), lignes produites au fil de l'eau
+        return StreamingExport(
+            Universite.objects.avec_totaux(), UNIVERSITES_EXPORT_COLUMNS, filename="universites"
+        ).response(request)
 
 
 # -------------------- CRUD complet + filtres --------------------
@@ -430,7 +416,7 @@ class DomaineViewSet(viewsets.ModelViewSet):
 
     def perform_create(self, serializer):
         try:
-            univ = get_object_or_404(Universite, slug=self.kwargs['univ_slug'])
+            univ = get_universite_or_404(self.kwargs['univ_slug'], self.request)
             nom = serializer.validated_data['nom']
             cleaned = unicodedata.normalize('NFKD', nom).encode('ASCII', 'ignore').decode('ASCII')
             slug = slugify(cleaned) or slugify(nom)
@@ -477,7 +463,7 @@ class DomaineViewSet(viewsets.ModelViewSet):
         
         # ==== TRAÇABILITÉ MODIFICATION DOMAINE ====
         univ_slug = self.kwargs.get('univ_slug')
-        univ = get_object_or_404(Universite, slug=univ_slug) if univ_slug else None
+        univ = get_universite_or_404(univ_slug, self.request) if univ_slug else None
         
         create_audit_log(
             action=AuditLog.ActionType.DOMAINE_UPDATE,
@@ -497,7 +483,7 @@ class DomaineViewSet(viewsets.ModelViewSet):
     def perform_destroy(self, instance):
         previous_data = serialize_instance(instance)
         univ_slug = self.kwargs.get('univ_slug')
-        univ = get_object_or_404(Universite, slug=univ_slug) if univ_slug else None
+        univ = get_universite_or_404(univ_slug, self.request) if univ_slug else None
         
         # ==== TRAÇABILITÉ SUPPRESSION DOMAINE (HIGH) ====
         create_audit_log(
@@ -524,7 +510,7 @@ def domaine_update(request, univ_slug, domaine_slug):
     Met à jour le nom (et donc le slug) d’un domaine
     rattaché à l’université <univ_slug>.
     """
-    universite = get_object_or_404(Universite, slug=univ_slug)
+    universite = get_universite_or_404(univ_slug, request)
     domaine    = get_object_or_404(Domaine, slug=domaine_slug)
 
     # Vérifie que le domaine est bien lié à cette université
@@ -585,7 +571,7 @@ class DomaineByUniversiteListView(generics.ListAPIView):
 
     def get_queryset(self):
         univ_slug = self.kwargs['univ_slug']
-        univ = get_object_or_404(Universite, slug=univ_slug)
+        univ = get_universite_or_404(univ_slug, self.request)
         return univ.domaines.all()
 from universites.models import Universite
 from .serializers import RegisterViaUniversiteSerializer
@@ -600,7 +586,7 @@ class DomaineCreateInUniversiteView(generics.CreateAPIView):
 
     def perform_create(self, serializer):
         try:
-            univ = get_object_or_404(Universite, slug=self.kwargs['univ_slug'])
+            univ = get_universite_or_404(self.kwargs['univ_slug'], self.request)
             nom = serializer.validated_data['nom']
             cleaned = unicodedata.normalize('NFKD', nom).encode('ASCII', 'ignore').decode('ASCII')
             slug = slugify(cleaned) or slugify(nom)
@@ -632,9 +618,8 @@ class DomaineCreateInUniversiteView(generics.CreateAPIView):
             domaine.universites.add(univ)
             
             # Ajouter les universités mères
-            for affiliation in univ.get_universites_meres():
-                print(affiliation.universite_mere)
-                domaine.universites.add(affiliation.universite_mere)  # Ajouter chaque université mère
+            for mere in universites_meres(univ, self.request):
+                domaine.universites.add(mere)  # Ajouter chaque université mère
             
         except Exception as e:
             print(f"Erreur lors de la création du domaine: {e}")
@@ -647,7 +632,7 @@ class DomaineDestroyInUniversiteView(generics.DestroyAPIView):
         return Domaine.objects.all()
 
     def delete(self, request, univ_slug, domaine_slug, *args, **kwargs):
-        universite = get_object_or_404(Universite, slug=univ_slug)
+        universite = get_universite_or_404(univ_slug, request)
         domaine = get_object_or_404(Domaine, slug=domaine_slug)
         # Données avant
         previous_data = serialize_instance(domaine)
@@ -698,7 +683,7 @@ class UserRoleInUniversityView(generics.RetrieveAPIView):
 
     def get_object(self):
         user = self.request.user
-        univ = get_object_or_404(Universite, slug=self.kwargs["univ_slug"])
+        univ = get_universite_or_404(self.kwargs["univ_slug"], self.request)
         return get_object_or_404(RoleUniversite, utilisateur=user, universite=univ)
 
     def retrieve(self, request, *args, **kwargs):
@@ -716,7 +701,7 @@ class UserRoleInUniversityByIdView(generics.RetrieveAPIView):
     def get_object(self):
         univ_slug = self.kwargs["univ_slug"]
         user_id = self.kwargs["user_id"]
-        univ = get_object_or_404(Universite, slug=univ_slug)
+        univ = get_universite_or_404(univ_slug, self.request)
         return get_object_or_404(RoleUniversite, utilisateur_id=user_id, universite=univ)
 
     def retrieve(self, request, *args, **kwargs):
@@ -728,7 +713,7 @@ class NewsBySlugViewSet(viewsets.ModelViewSet):
     serializer_class = NewsSerializer
 
     def get_university(self):
-        return get_object_or_404(Universite, slug=self.kwargs['slug'])
+        return get_universite_or_404(self.kwargs['slug'], self.request)
 
     def get_queryset(self):
         return News.objects.filter(publishers=self.get_university())
@@ -739,8 +724,7 @@ class NewsBySlugViewSet(viewsets.ModelViewSet):
         news.publishers.add(univ)
         
         # universités-mères via la méthode existante
-        affiliations = univ.get_universites_meres()
-        meres = [aff.universite_mere for aff in affiliations]
+        meres = universites_meres(univ, self.request)
         if meres:
             news.publishers.add(*meres)
         
@@ -844,8 +828,7 @@ class NewsBySlugViewSet(viewsets.ModelViewSet):
         university = self.get_university()
         news = self.get_object()
         previous_publishers = [p.nom for p in news.publishers.all()]
-        affiliations = university.get_universites_meres()
-        meres = [aff.universite_mere for aff in affiliations]
+        meres = universites_meres(university, request)
         to_remove = [university] + meres
         news.publishers.remove(*to_remove)
 
@@ -888,7 +871,7 @@ class OldStudentBySlugViewSet(viewsets.ModelViewSet):
     permission_classes = [permissions.AllowAny]
 
     def get_university(self):
-        return get_object_or_404(Universite, slug=self.kwargs['slug'])
+        return get_universite_or_404(self.kwargs['slug'], self.request)
 
     def get_queryset(self):
         return OldStudent.objects.filter(publishers=self.get_university())
@@ -897,8 +880,7 @@ class OldStudentBySlugViewSet(viewsets.ModelViewSet):
         old = serializer.save()
         univ = self.get_university()
         old.publishers.add(univ)
-        affiliations = univ.get_universites_meres()
-        meres = [aff.universite_mere for aff in affiliations]
+        meres = universites_meres(univ, self.request)
         if meres:
             old.publishers.add(*meres)
         
@@ -993,8 +975,7 @@ class OldStudentBySlugViewSet(viewsets.ModelViewSet):
         university = self.get_university()
         old = self.get_object()
         previous_publishers = [p.nom for p in old.publishers.all()]
-        affiliations = university.get_universites_meres()
-        meres = [aff.universite_mere for aff in affiliations]
+        meres = universites_meres(university, request)
         to_remove = [university] + meres
         old.publishers.remove(*to_remove)
 
@@ -1044,7 +1025,7 @@ class NewsGlobalViewSet(viewsets.ModelViewSet):
         if not univ_slug:
             return Response({'publisher': 'Ce champ est obligatoire.'},
                             status=status.HTTP_400_BAD_REQUEST)
-        university = get_object_or_404(Universite, slug=univ_slug)
+        university = get_universite_or_404(univ_slug, request)
         serializer = self.get_serializer(data=request.data)
         serializer.is_valid(raise_exception=True)
         serializer.save(publisher=university)
@@ -55,6 +55,7 @@ from django.contrib import admin
 # users/admin.py
 from django.contrib import admin
 from .models import CustomUser, AuditLog, InvitationCode
+from .pagination import EstimatedCountPaginator
 
 
 @admin.register(AuditLog)
@@ -102,6 +103,9 @@ class AuditLogAdmin(admin.ModelAdmin):
         'description',
     ]
     date_hierarchy = 'created_at'
+    # Pas de COUNT(*) exact sur tout l'historique (estimation sous PostgreSQL)
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
     
     fieldsets = (
         ('Informations générales', {
@@ -181,22 +185,31 @@ class AuditLogAdmin(admin.ModelAdmin):
         return obj.target_repr or '-'
     target_short.short_description = 'Cible'
     
+    def _donnees(self, obj):
+        # États complets, payload compressé ou diff compris (cf. users/audit_payload.py)
+        if not hasattr(obj, '_donnees_audit'):
+            from .audit_payload import reconstruire
+            obj._donnees_audit = reconstruire(obj)
+        return obj._donnees_audit
+    
     def previous_data_pretty(self, obj):
         import json
         from django.utils.html import format_html
-        if not obj.previous_data:
+        previous_data = self._donnees(obj)[0]
+        if not previous_data:
             return '-'
         return format_html('<pre>{}</pre>', 
-                         json.dumps(obj.previous_data, indent=2, ensure_ascii=False))
+                         json.dumps(previous_data, indent=2, ensure_ascii=False))
     previous_data_pretty.short_description = 'Données précédentes'
     
     def new_data_pretty(self, obj):
         import json
         from django.utils.html import format_html
-        if not obj.new_data:
+        new_data = self._donnees(obj)[1]
+        if not new_data:
             return '-'
         return format_html('<pre>{}</pre>', 
-                         json.dumps(obj.new_data, indent=2, ensure_ascii=False))
+                         json.dumps(new_data, indent=2, ensure_ascii=False))
     new_data_pretty.short_description = 'Nouvelles données'
     
     def has_add_permission(self, request):
@@ -1,4 +1,11 @@
 from django.apps import AppConfig
+from django.db.models.signals import post_migrate
+
+
+def _preparer_partitions_audit(sender, **kwargs):
+    from users.audit_partitions import assurer_partitions
+
+    assurer_partitions()
 
 
 class UsersConfig(AppConfig):
@@ -7,4 +14,6 @@ class UsersConfig(AppConfig):
 # users/apps.py
 
     def ready(self):
-        import users.signals  # ← Active les signaux
\ No newline at end of file
+        import users.signals  # ← Active les signaux
+        # Partitions d'audit des mois à venir (PostgreSQL) après chaque migrate
+        post_migrate.connect(_preparer_partitions_audit, sender=self)
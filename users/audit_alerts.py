@@ -0,0 +1,233 @@
+# users/audit_alerts.py
+"""
+Alertes pour les actions CRITICAL, hors requête et regroupées.
+
+bulk_create_audit_logs (et le post_save d'AuditLog) confient les logs
+CRITICAL au répartiteur du processus ; un thread d'arrière-plan :
+  - regroupe par (université, action) : le premier lot d'une fenêtre de
+    AUDIT_ALERT_WINDOW secondes part tout de suite, en un seul message ;
+    les suivants sont cumulés et résumés en un message à la fin de la
+    fenêtre (la fenêtre est partagée entre workers via le cache) ;
+  - envoie aux admins de l'université (MailerSend, destinataires mis en
+    cache, cf. users/audit_notifications.py) et aux ADMINS du site ;
+  - plafonne chaque destinataire à AUDIT_ALERT_RECIPIENT_RATE (compteur
+    partagé de users/throttling.py) : au-delà, le message est ignoré et
+    journalisé.
+AUDIT_ALERT_ASYNC=False : envoi immédiat, regroupement limité au lot.
+"""
+import atexit
+import logging
+import os
+import threading
+import time
+from dataclasses import dataclass, field
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.mail import send_mail
+from django.db import close_old_connections, transaction
+from django.template.loader import render_to_string
+from django.utils.html import escape, linebreaks
+
+from users.throttling import SlidingWindowLimiter, parse_rate
+
+logger = logging.getLogger(__name__)
+
+# Logs détaillés par message ; au-delà, seulement le nombre
+DETAIL_MAX = 10
+
+
+def _reglage(nom, defaut):
+    return getattr(settings, nom, defaut)
+
+
+def _limiteur():
+    limite, fenetre = parse_rate(_reglage("AUDIT_ALERT_RECIPIENT_RATE", "20/h"))
+    return SlidingWindowLimiter("alert", limite, fenetre)
+
+
+@dataclass
+class Groupe:
+    """Logs d'une même (université, action) en attente de résumé."""
+    echeance: float
+    logs: list = field(default_factory=list)
+    total: int = 0
+
+    def ajouter(self, logs):
+        self.total += len(logs)
+        self.logs.extend(logs[:max(DETAIL_MAX - len(self.logs), 0)])
+
+
+class AlertDispatcher:
+    """File par processus ; réinitialisée après un fork (workers préchargés)."""
+
+    def __init__(self):
+        self._pid = None
+        self._reset()
+
+    def _reset(self):
+        self._pid = os.getpid()
+        self._lock = threading.Lock()
+        self._entrants = []
+        self._groupes = {}
+        self._wakeup = threading.Event()
+        self._thread = None
+
+    # ---------- API publique ----------
+    def signaler(self, logs):
+        """Prend en charge les logs CRITICAL d'un lot (les autres sont ignorés)."""
+        from users.models import AuditLog
+
+        critiques = [log for log in logs if log.severity == AuditLog.Severity.CRITICAL]
+        if not critiques:
+            return
+        if not _reglage("AUDIT_ALERT_ASYNC", True):
+            for cle, lot in self._par_cle(critiques).items():
+                self._envoyer(cle, lot, len(lot))
+            return
+        transaction.on_commit(lambda: self._enqueue(critiques))
+
+    def flush(self):
+        """Traite les entrants et envoie tous les résumés en attente (arrêt, tests)."""
+        self._traiter(forcer=True)
+
+    # ---------- Interne ----------
+    def _enqueue(self, logs):
+        if self._pid != os.getpid():
+            self._reset()
+        with self._lock:
+            self._entrants.extend(logs)
+            if self._thread is None:
+                self._thread = threading.Thread(
+                    target=self._run, name="audit-alerts", daemon=True
+                )
+                self._thread.start()
+        self._wakeup.set()
+
+    def _run(self):
+        while True:
+            with self._lock:
+                echeances = [g.echeance for g in self._groupes.values()]
+            attente = max(min(echeances) - time.monotonic(), 0) if echeances else None
+            self._wakeup.wait(attente)
+            self._wakeup.clear()
+            close_old_connections()
+            try:
+                self._traiter()
+            except Exception as e:  # le thread ne doit jamais mourir
+                logger.error(f"Alertes : échec du traitement : {e}")
+
+    @staticmethod
+    def _par_cle(logs):
+        lots = {}
+        for log in logs:
+            lots.setdefault((log.university_id, log.action), []).append(log)
+        return lots
+
+    def _traiter(self, forcer=False):
+        fenetre = _reglage("AUDIT_ALERT_WINDOW", 300)
+        with self._lock:
+            entrants, self._entrants = self._entrants, []
+
+        for cle, lot in self._par_cle(entrants).items():
+            with self._lock:
+                groupe = self._groupes.get(cle)
+                if groupe is not None:
+                    groupe.ajouter(lot)
+                    continue
+                groupe = self._groupes[cle] = Groupe(echeance=time.monotonic() + fenetre)
+            # add() n'écrit que si la clé est absente : un seul worker ouvre la fenêtre
+            if cache.add(f"alerts:window:{cle[0]}:{cle[1]}", 1, fenetre):
+                self._envoyer(cle, lot, len(lot))
+            else:
+                with self._lock:
+                    groupe.ajouter(lot)
+
+        maintenant = time.monotonic()
+        with self._lock:
+            echus = [
+                (cle, groupe) for cle, groupe in self._groupes.items()
+                if forcer or groupe.echeance <= maintenant
+            ]
+            for cle, _ in echus:
+                del self._groupes[cle]
+        for cle, groupe in echus:
+            if groupe.total:
+                self._envoyer(cle, groupe.logs, groupe.total, resume=True)
+
+    # ---------- Envoi ----------
+    def _envoyer(self, cle, logs, total, resume=False):
+        from users.audit_notifications import (
+            build_text_content, get_alert_recipients, send_alert_email,
+        )
+
+        premier = logs[0]
+        universite = premier.university
+        nom = universite.nom if universite else "Système"
+        if total == 1 and not resume:
+            sujet = f"🚨 [CRITIQUE] {premier.get_action_display()} - {nom}"
+            texte = build_text_content(premier)
+        else:
+            sujet = f"🚨 [CRITIQUE] {premier.get_action_display()} ×{total} - {nom}"
+            texte = self._texte_resume(logs, total, nom)
+        html = render_to_string("emails/critical_audit_alert.html", {
+            "audit_log": premier,
+            "logs": logs,
+            "total": total,
+            "university": universite,
+            "action_display": premier.get_action_display(),
+            "severity_display": premier.get_severity_display(),
+        }) or linebreaks(escape(texte))
+
+        limiteur = _limiteur()
+
+        def autorises(destinataires):
+            gardes = [d for d in destinataires if limiteur.hit(d["email"].lower()).allowed]
+            if len(gardes) < len(destinataires):
+                logger.warning(
+                    f"Alertes : {len(destinataires) - len(gardes)} destinataire(s) au plafond, "
+                    f"alerte {cle[1]} ignorée pour eux"
+                )
+            return gardes
+
+        admins_universite = autorises(get_alert_recipients(universite))
+        if admins_universite:
+            send_alert_email(admins_universite, sujet, html, texte)
+
+        admins_site = autorises([{"email": email, "name": nom_admin} for nom_admin, email in settings.ADMINS])
+        if admins_site:
+            send_mail(
+                subject=f"{settings.EMAIL_SUBJECT_PREFIX}{sujet}",
+                message=texte,
+                from_email=settings.SERVER_EMAIL,
+                recipient_list=[d["email"] for d in admins_site],
+                fail_silently=True,
+            )
+
+    @staticmethod
+    def _texte_resume(logs, total, nom):
+        lignes = [
+            "🚨 ALERTES CRITIQUES REGROUPÉES",
+            "=" * 50,
+            f"Université: {nom}",
+            f"Action: {logs[0].get_action_display()}",
+            f"Occurrences: {total}",
+            "",
+        ]
+        for log in logs:
+            lignes.append(
+                f"- {log.created_at.strftime('%d/%m/%Y %H:%M:%S')} | "
+                f"{log.user_email or 'Système'} | [{log.target_type}] {log.target_repr}"
+            )
+        if total > len(logs):
+            lignes.append(f"… et {total - len(logs)} autre(s)")
+        lignes.extend([
+            "",
+            "-" * 50,
+            f"Consultez les logs: {getattr(settings, 'FRONTEND_URL', '')}/admin/audit-logs/",
+        ])
+        return "\n".join(lignes)
+
+
+alert_dispatcher = AlertDispatcher()
+atexit.register(alert_dispatcher.flush)
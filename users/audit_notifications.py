@@ -1,20 +1,28 @@
 # users/audit_notifications.py
 import logging
 from django.conf import settings
-from django.template.loader import render_to_string
+from django.core.cache import cache
+from django.core.mail import send_mail
 from mailersend import MailerSendClient, EmailBuilder
 from decouple import config
 
 logger = logging.getLogger(__name__)
 
 
+RECIPIENTS_CACHE_KEY = "alerts:recipients:{}"
+_client = None
+
+
 def get_mailer_client():
-    """Initialise et retourne le client MailerSend."""
-    api_key = config('MAILERSEND_API_KEY', default=None)
-    if not api_key:
-        logger.error("MAILERSEND_API_KEY non configuré")
-        return None
-    return MailerSendClient(api_key=api_key)
+    """Retourne le client MailerSend du processus (créé au premier appel)."""
+    global _client
+    if _client is None:
+        api_key = config('MAILERSEND_API_KEY', default=None)
+        if not api_key:
+            logger.error("MAILERSEND_API_KEY non configuré")
+            return None
+        _client = MailerSendClient(api_key=api_key)
+    return _client
 
 
 def get_university_admins_by_role(university):
@@ -54,68 +62,77 @@ def get_university_admins_by_role(university):
     return admin_emails
 
 
-def send_critical_alert_to_admins(audit_log):
+def get_alert_recipients(university):
     """
-    Envoie une alerte email aux admins de l'université concernée
-    pour les actions CRITICAL.
+    Destinataires des alertes de l'université (admins, sinon superadmins
+    Django), mis en cache AUDIT_ALERT_RECIPIENTS_TTL secondes ; invalidé à
+    chaque écriture sur RoleUniversite (universites/signals.py).
     """
-    if audit_log.severity != audit_log.Severity.CRITICAL:
-        return
-    
-    # Récupérer les admins via RoleUniversite
-    admins = get_university_admins_by_role(audit_log.university)
-    
-    if not admins:
-        logger.warning(f"Aucun admin (role admin/superadmin/bigboss) trouvé "
-                      f"pour l'université {audit_log.university}")
-        # Fallback: superadmins Django
-        admins = get_fallback_admins()
+    key = RECIPIENTS_CACHE_KEY.format(university.pk if university else 0)
+    admins = cache.get(key)
+    if admins is None:
+        admins = get_university_admins_by_role(university)
         if not admins:
-            return
-    
-    # Initialiser MailerSend
+            logger.warning(f"Aucun admin (role admin/superadmin/bigboss) trouvé "
+                          f"pour l'université {university}")
+            # Fallback: superadmins Django
+            admins = get_fallback_admins()
+        cache.set(key, admins, getattr(settings, 'AUDIT_ALERT_RECIPIENTS_TTL', 600))
+    return admins
+
+
+def invalidate_alert_recipients(university_id):
+    cache.delete(RECIPIENTS_CACHE_KEY.format(university_id))
+
+
+def send_alert_email(recipients, subject, html_content, text_content):
+    """
+    Envoie une alerte à tous les destinataires en un seul email (MailerSend,
+    sinon backend email Django).
+    """
     ms = get_mailer_client()
-    if not ms:
-        logger.error("Impossible d'initialiser MailerSend")
-        return
-    
-    # Construire le contenu
-    html_content = render_to_string('emails/critical_audit_alert.html', {
-        'audit_log': audit_log,
-        'university': audit_log.university,
-        'action_display': audit_log.get_action_display(),
-        'severity_display': audit_log.get_severity_display(),
-    })
-    
-    text_content = build_text_content(audit_log)
-    
     try:
-        # Construire l'email avec TOUS les admins en destinataires
+        if ms is None:
+            return send_mail(
+                subject=subject,
+                message=text_content,
+                from_email=settings.DEFAULT_FROM_EMAIL,
+                recipient_list=[r["email"] for r in recipients],
+                html_message=html_content,
+                fail_silently=True,
+            )
+
         email_builder = (EmailBuilder()
             .from_email(settings.DEFAULT_FROM_EMAIL, "Système de Traçabilité")
-            .subject(f'🚨 [CRITIQUE] {audit_log.get_action_display()} - '
-                    f'{audit_log.university.nom if audit_log.university else "Système"}')
+            .subject(subject)
             .html(html_content)
             .text(text_content)
         )
-        
         # Ajouter chaque admin individuellement (MailerSend format)
-        for admin in admins:
+        for admin in recipients:
             email_builder = email_builder.to(admin["email"], admin["name"])
-        
-        email = email_builder.build()
-        
-        # Envoyer
-        response = ms.emails.send(email)
-        logger.info(f"✅ Alerte critique envoyée à {len(admins)} admins "
-                   f"({[a['email'] for a in admins]}) pour action {audit_log.action}")
+
+        response = ms.emails.send(email_builder.build())
+        logger.info(f"✅ Alerte critique envoyée à {len(recipients)} admins "
+                   f"({[r['email'] for r in recipients]})")
         return response
-        
+
     except Exception as e:
         logger.error(f"❌ Échec envoi alerte critique: {e}")
         return None
 
 
+def send_critical_alert_to_admins(audit_log):
+    """
+    Alerte les admins de l'université concernée pour une action CRITICAL.
+    Passe par le répartiteur (users/audit_alerts.py) : envoi hors requête,
+    regroupé par (université, action), débit plafonné par destinataire.
+    """
+    from users.audit_alerts import alert_dispatcher
+
+    alert_dispatcher.signaler([audit_log])
+
+
 def build_text_content(audit_log):
     """Construit le contenu texte de l'alerte."""
     lines = [
@@ -0,0 +1,136 @@
+# users/audit_partitions.py
+"""
+Partitionnement mensuel du journal d'audit.
+
+PostgreSQL : users_auditlog est une table partitionnée par plage sur
+created_at (migration 0007) ; une partition users_auditlog_pAAAAMM par mois
+(UTC), plus une partition par défaut pour les dates hors plage.
+  - les filtres created_at__gte / __lt ne lisent que les partitions concernées
+    (élagage) : éviter created_at__date, qui l'empêche ;
+  - chaque partition a ses propres index, de taille bornée ;
+  - la rétention détache puis supprime une partition entière : coût constant.
+La clé primaire devient (id, created_at) ; id reste unique (séquence).
+
+Autres moteurs (SQLite) : pas de partitionnement natif, table unique ; la
+rétention est un DELETE par plage (index created_at), sans charger les lignes.
+
+Les partitions à venir sont créées par `manage.py audit_partitions` (à planifier
+chaque mois) et après chaque migrate.
+"""
+import logging
+import re
+from datetime import datetime, timezone as dt_timezone
+
+from dateutil.relativedelta import relativedelta
+from django.db import connection, transaction
+from django.utils import timezone
+
+logger = logging.getLogger(__name__)
+
+TABLE = "users_auditlog"
+PREFIXE = f"{TABLE}_p"
+DEFAUT = f"{TABLE}_default"
+_NOM = re.compile(rf"^{PREFIXE}(\d{{4}})(\d{{2}})$")
+
+
+def est_partitionnee():
+    if connection.vendor != "postgresql":
+        return False
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT 1 FROM pg_partitioned_table p JOIN pg_class c ON c.oid = p.partrelid "
+            "WHERE c.relname = %s",
+            [TABLE],
+        )
+        return cursor.fetchone() is not None
+
+
+def debut_mois(moment):
+    """Premier instant (UTC) du mois contenant `moment`."""
+    moment = timezone.localtime(moment, dt_timezone.utc) if timezone.is_aware(moment) else moment
+    return datetime(moment.year, moment.month, 1, tzinfo=dt_timezone.utc)
+
+
+def nom_partition(mois):
+    return f"{PREFIXE}{mois:%Y%m}"
+
+
+def partitions():
+    """[(nom, début, fin)] des partitions mensuelles, triées."""
+    if not est_partitionnee():
+        return []
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT c.relname FROM pg_inherits i "
+            "JOIN pg_class c ON c.oid = i.inhrelid "
+            "JOIN pg_class p ON p.oid = i.inhparent WHERE p.relname = %s",
+            [TABLE],
+        )
+        noms = [row[0] for row in cursor.fetchall()]
+    resultat = []
+    for nom in noms:
+        match = _NOM.match(nom)
+        if match:
+            debut = datetime(int(match[1]), int(match[2]), 1, tzinfo=dt_timezone.utc)
+            resultat.append((nom, debut, debut + relativedelta(months=1)))
+    return sorted(resultat, key=lambda p: p[1])
+
+
+def creer_partition(mois, cursor):
+    debut = debut_mois(mois)
+    fin = debut + relativedelta(months=1)
+    cursor.execute(
+        f'CREATE TABLE IF NOT EXISTS "{nom_partition(debut)}" PARTITION OF "{TABLE}" '
+        f"FOR VALUES FROM ('{debut.isoformat()}') TO ('{fin.isoformat()}')"
+    )
+
+
+def assurer_partitions(mois_avance=3, depuis=None):
+    """
+    Crée les partitions de `depuis` (défaut : mois courant) à mois_avance mois
+    après. Renvoie les noms créés. Sans effet hors PostgreSQL.
+    """
+    if not est_partitionnee():
+        return []
+    existantes = {nom for nom, _, _ in partitions()}
+    mois = debut_mois(depuis or timezone.now())
+    fin = debut_mois(timezone.now()) + relativedelta(months=mois_avance)
+    creees = []
+    with connection.cursor() as cursor:
+        while mois <= fin:
+            if nom_partition(mois) not in existantes:
+                try:
+                    with transaction.atomic():
+                        creer_partition(mois, cursor)
+                    creees.append(nom_partition(mois))
+                except Exception as e:
+                    # Lignes du mois déjà présentes dans la partition par défaut
+                    logger.error(f"Partition {nom_partition(mois)} non créée : {e}")
+            mois += relativedelta(months=1)
+    return creees
+
+
+def supprimer_avant(limite):
+    """
+    Supprime les logs antérieurs à `limite`. PostgreSQL : les mois entiers sont
+    détachés et supprimés, seul le mois de `limite` subit un DELETE.
+    Renvoie le nombre de partitions supprimées et de lignes supprimées par DELETE.
+    """
+    from users.models import AuditLog
+
+    partitions_supprimees = 0
+    if est_partitionnee():
+        with connection.cursor() as cursor:
+            for nom, _, fin in partitions():
+                if fin > limite:
+                    break
+                with transaction.atomic():
+                    cursor.execute(f'ALTER TABLE "{TABLE}" DETACH PARTITION "{nom}"')
+                    cursor.execute(f'DROP TABLE "{nom}"')
+                partitions_supprimees += 1
+                logger.info(f"Partition d'audit {nom} supprimée")
+
+    # Reste du mois de la limite (ou toute la plage hors PostgreSQL) :
+    # DELETE direct, sans chargement des lignes ni signaux (aucune relation entrante)
+    lignes = AuditLog.objects.filter(created_at__lt=limite)._raw_delete(AuditLog.objects.db)
+    return partitions_supprimees, lignes
@@ -0,0 +1,236 @@
+# users/audit_payload.py
+"""
+Stockage compact de previous_data / new_data.
+
+Appliqué par bulk_create_audit_logs juste avant l'insertion (thread du
+tampon d'audit, pas la requête), via preparer_lot :
+  - avant et après sont des dictionnaires : seules les clés modifiées sont
+    conservées, récursivement (payload_format = "diff") ; une clé présente
+    d'un seul côté a été ajoutée ou retirée ;
+  - exceptions, stockées complètes (payload_format = "snap") : le premier
+    couple avant/après d'une cible (target_type, target_id), puis un sur
+    AUDIT_SNAPSHOT_EVERY ; c'est la base de la reconstruction. Sans
+    target_id, pas de chaîne possible : toujours complet ;
+  - chaînes de plus de AUDIT_TEXT_MAX caractères : remplacées selon
+    AUDIT_TEXT_POLICY, "truncate" (début + longueur + sha256) ou "hash"
+    (longueur + sha256) ;
+  - AUDIT_PAYLOAD_COMPRESS : au-delà de AUDIT_COMPRESS_MIN octets, le JSON
+    des deux côtés est compressé (zlib) dans payload_zlib.
+
+contenu(log) relit ce qui est stocké ; reconstruire(log) rejoue la chaîne
+des logs de la même cible depuis le dernier instantané pour rendre des
+états complets (les textes tronqués restent tronqués).
+"""
+import hashlib
+import json
+import zlib
+
+from django.conf import settings
+
+DIFF = "diff"
+COMPLET = "full"
+INSTANTANE = "snap"
+MARQUEUR = "_tronque"
+
+
+def _reglage(nom, defaut):
+    return getattr(settings, nom, defaut)
+
+
+# ---------- Écriture ----------
+def limiter(valeur):
+    """Applique la politique des textes longs, récursivement."""
+    if isinstance(valeur, dict):
+        return {cle: limiter(v) for cle, v in valeur.items()}
+    if isinstance(valeur, list):
+        return [limiter(v) for v in valeur]
+    maximum = _reglage("AUDIT_TEXT_MAX", 1000)
+    if isinstance(valeur, str) and len(valeur) > maximum:
+        resume = {
+            MARQUEUR: True,
+            "longueur": len(valeur),
+            "sha256": hashlib.sha256(valeur.encode("utf-8")).hexdigest(),
+        }
+        if _reglage("AUDIT_TEXT_POLICY", "truncate") == "truncate":
+            resume["debut"] = valeur[:_reglage("AUDIT_TEXT_KEEP", 200)]
+        return resume
+    return valeur
+
+
+def difference(avant, apres):
+    """(avant, après) réduits aux clés modifiées ; dictionnaires imbriqués comparés clé à clé."""
+    diff_avant, diff_apres = {}, {}
+    for cle in avant.keys() | apres.keys():
+        if cle not in apres:
+            diff_avant[cle] = avant[cle]
+        elif cle not in avant:
+            diff_apres[cle] = apres[cle]
+        elif avant[cle] != apres[cle]:
+            if isinstance(avant[cle], dict) and isinstance(apres[cle], dict):
+                diff_avant[cle], diff_apres[cle] = difference(avant[cle], apres[cle])
+            else:
+                diff_avant[cle], diff_apres[cle] = avant[cle], apres[cle]
+    return diff_avant, diff_apres
+
+
+def _couple(log):
+    """Couple avant/après de dictionnaires pas encore compacté."""
+    return (
+        log.payload_zlib is None and log.payload_format == COMPLET
+        and isinstance(log.previous_data, dict) and isinstance(log.new_data, dict)
+    )
+
+
+def _cible(log):
+    """(target_type, target_id) si le log peut être stocké en diff, sinon None."""
+    if log.target_id and _couple(log):
+        return log.target_type, str(log.target_id)
+    return None
+
+
+def _diffs_depuis_instantane(cibles):
+    """{cible: diffs stockés depuis le dernier instantané} ; cibles sans instantané absentes."""
+    from django.db.models import Count, Max, Q
+
+    from users.models import AuditLog
+
+    if not cibles:
+        return {}
+    derniers = {
+        (type_, id_): dernier
+        for type_, id_, dernier in AuditLog.objects.filter(
+            target_type__in={c[0] for c in cibles},
+            target_id__in={c[1] for c in cibles},
+            payload_format=INSTANTANE,
+        ).values_list("target_type", "target_id").annotate(dernier=Max("id")).order_by()
+        if (type_, id_) in cibles
+    }
+    if not derniers:
+        return {}
+    apres_instantane = Q()
+    for (type_, id_), dernier in derniers.items():
+        apres_instantane |= Q(target_type=type_, target_id=id_, id__gt=dernier)
+    nombres = {
+        (type_, id_): n
+        for type_, id_, n in AuditLog.objects.filter(apres_instantane, payload_format=DIFF)
+        .values_list("target_type", "target_id").annotate(n=Count("id")).order_by()
+    }
+    return {cible: nombres.get(cible, 0) for cible in derniers}
+
+
+def preparer_lot(logs):
+    """
+    preparer() pour un lot, en décidant quels logs deviennent des instantanés :
+    2 requêtes par lot, quel que soit le nombre de cibles.
+    """
+    periode = _reglage("AUDIT_SNAPSHOT_EVERY", 20)
+    cibles = {_cible(log) for log in logs} - {None}
+    depuis = _diffs_depuis_instantane(cibles)
+    for log in logs:
+        cible = _cible(log)
+        if cible is None:
+            # Sans cible, aucune chaîne à rejouer : le couple est conservé en entier
+            preparer(log, instantane=_couple(log))
+            continue
+        n = depuis.get(cible)
+        instantane = n is None or n + 1 >= periode
+        preparer(log, instantane=instantane)
+        depuis[cible] = 0 if instantane else n + 1
+    return logs
+
+
+def preparer(log, instantane=False):
+    """
+    Compacte previous_data / new_data d'un log non encore inséré.
+    instantane=True : couple avant/après conservé en entier (base de reconstruction).
+    """
+    if log.payload_zlib is not None:
+        return log
+    avant, apres = log.previous_data, log.new_data
+    if instantane:
+        log.payload_format = INSTANTANE
+    elif log.payload_format == COMPLET and isinstance(avant, dict) and isinstance(apres, dict):
+        avant, apres = difference(avant, apres)
+        log.payload_format = DIFF
+    log.previous_data = limiter(avant) if avant is not None else None
+    log.new_data = limiter(apres) if apres is not None else None
+
+    if _reglage("AUDIT_PAYLOAD_COMPRESS", False) and (log.previous_data or log.new_data):
+        brut = json.dumps(
+            {"previous": log.previous_data, "new": log.new_data},
+            ensure_ascii=False, separators=(",", ":"), default=str,
+        ).encode("utf-8")
+        if len(brut) >= _reglage("AUDIT_COMPRESS_MIN", 1024):
+            log.payload_zlib = zlib.compress(brut)
+            log.previous_data = log.new_data = None
+    return log
+
+
+# ---------- Lecture ----------
+def contenu(log):
+    """(previous_data, new_data) tels que stockés (décompressés si besoin)."""
+    if log.payload_zlib is not None:
+        data = json.loads(zlib.decompress(bytes(log.payload_zlib)))
+        return data["previous"], data["new"]
+    return log.previous_data, log.new_data
+
+
+def _appliquer(etat, avant, apres):
+    resultat = dict(etat)
+    for cle in avant.keys() - apres.keys():
+        resultat.pop(cle, None)
+    for cle, valeur in apres.items():
+        if isinstance(valeur, dict) and isinstance(avant.get(cle), dict) and isinstance(resultat.get(cle), dict):
+            resultat[cle] = _appliquer(resultat[cle], avant[cle], valeur)
+        else:
+            resultat[cle] = valeur
+    return resultat
+
+
+def _fusionner(etat, avant):
+    """État connu complété par les valeurs « avant » d'un diff (chaîne incomplète)."""
+    resultat = dict(etat)
+    for cle, valeur in avant.items():
+        if isinstance(valeur, dict) and isinstance(resultat.get(cle), dict):
+            resultat[cle] = _fusionner(resultat[cle], valeur)
+        else:
+            resultat[cle] = valeur
+    return resultat
+
+
+def reconstruire(log):
+    """
+    États complets (avant, après) de la cible au moment du log, en rejouant
+    les logs de la même cible (target_type, target_id) jusqu'à celui-ci.
+    Limité aux logs encore présents (non archivés) ; la chaîne part du
+    dernier instantané de la cible.
+    """
+    if log.payload_format != DIFF or not log.target_id:
+        return contenu(log)
+
+    from users.models import AuditLog
+
+    chaine = AuditLog.objects.filter(
+        target_type=log.target_type,
+        target_id=log.target_id,
+        created_at__lte=log.created_at,
+    )
+    instantane = (
+        chaine.filter(payload_format=INSTANTANE, created_at__lte=log.created_at)
+        .order_by("-created_at", "-id").values_list("created_at", flat=True).first()
+    )
+    if instantane is not None:
+        chaine = chaine.filter(created_at__gte=instantane)
+    chaine = chaine.order_by("created_at", "id")
+    etat = {}
+    for entree in chaine.iterator():
+        avant, apres = contenu(entree)
+        if entree.payload_format == DIFF:
+            precedent = _fusionner(etat, avant or {})
+            etat = _appliquer(precedent, avant or {}, apres or {})
+        else:
+            precedent = avant if avant is not None else etat
+            etat = apres if apres is not None else {}
+        if entree.pk == log.pk:
+            return precedent, etat
+    return contenu(log)
@@ -0,0 +1,163 @@
+# users/audit_rollups.py
+"""
+Agrégats du journal d'audit pour le tableau de bord.
+
+bulk_create_audit_logs (seul chemin d'insertion, cf. users/audit_sink.py)
+appelle enregistrer() dans la même transaction : les compteurs journaliers
+sont incrémentés par INSERT … ON CONFLICT DO UPDATE (PostgreSQL, SQLite ≥ 3.24),
+une instruction par lot. Le tableau de bord lit quelques dizaines de lignes
+d'agrégats au lieu de grouper tout l'historique.
+
+Les agrégats survivent à l'archivage des logs (historique complet) ;
+`manage.py rebuild_audit_rollups` les recalcule depuis les logs présents.
+Jours en fuseau TIME_ZONE.
+"""
+from collections import Counter
+from datetime import datetime, time, timedelta
+
+from dateutil.relativedelta import relativedelta
+from django.db import connection, transaction
+from django.db.models import Count, Min, Sum
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+
+from users.models import AuditDailyStat, AuditLog, AuditUserDailyStat
+
+LOT = 500
+
+
+def _jour(log):
+    return timezone.localdate(log.created_at) if timezone.is_aware(log.created_at) else log.created_at.date()
+
+
+def _incrementer(model, colonnes, compteur):
+    """Upsert additif : count = count + excluded.count."""
+    if not compteur:
+        return
+    qn = connection.ops.quote_name
+    table = qn(model._meta.db_table)
+    noms = ", ".join(qn(c) for c in colonnes)
+    compte = qn("count")
+    ligne = "(" + ", ".join(["%s"] * (len(colonnes) + 1)) + ")"
+    elements = list(compteur.items())
+    with connection.cursor() as cursor:
+        for i in range(0, len(elements), LOT):
+            lot = elements[i:i + LOT]
+            params = [valeur for cle, n in lot for valeur in (*cle, n)]
+            cursor.execute(
+                f"INSERT INTO {table} ({noms}, {compte}) VALUES {', '.join([ligne] * len(lot))} "
+                f"ON CONFLICT ({noms}) DO UPDATE SET {compte} = {table}.{compte} + excluded.{compte}",
+                params,
+            )
+
+
+def enregistrer(logs):
+    """Incrémente les agrégats pour des logs qui viennent d'être insérés."""
+    par_action, par_utilisateur = Counter(), Counter()
+    for log in logs:
+        jour, univ = _jour(log), log.university_id or 0
+        par_action[(univ, jour, log.action, log.severity)] += 1
+        par_utilisateur[(univ, jour, log.user_email or "", log.user_role or "")] += 1
+    _incrementer(AuditDailyStat, ("university_id", "date", "action", "severity"), par_action)
+    _incrementer(AuditUserDailyStat, ("university_id", "date", "user_email", "user_role"), par_utilisateur)
+
+
+def recalculer(depuis=None):
+    """
+    Reconstruit les agrégats à partir des logs, jour `depuis` inclus (défaut :
+    tout l'historique), par tranches mensuelles. Renvoie le nombre de logs comptés.
+    """
+    logs = AuditLog.objects.all()
+    if depuis is None:
+        premier = logs.aggregate(m=Min("created_at"))["m"]
+        if premier is None:
+            AuditDailyStat.objects.all().delete()
+            AuditUserDailyStat.objects.all().delete()
+            return 0
+        depuis = timezone.localdate(premier)
+
+    total = 0
+    with transaction.atomic():
+        AuditDailyStat.objects.filter(date__gte=depuis).delete()
+        AuditUserDailyStat.objects.filter(date__gte=depuis).delete()
+
+        debut = timezone.make_aware(datetime.combine(depuis, time.min))
+        fin_historique = timezone.now() + timedelta(days=1)
+        while debut < fin_historique:
+            fin = debut + relativedelta(months=1)
+            tranche = logs.filter(created_at__gte=debut, created_at__lt=fin).annotate(jour=TruncDate("created_at"))
+            stats = [
+                AuditDailyStat(
+                    university_id=row["university_id"] or 0, date=row["jour"],
+                    action=row["action"], severity=row["severity"], count=row["n"],
+                )
+                for row in tranche.values("university_id", "jour", "action", "severity")
+                .annotate(n=Count("id")).order_by()
+            ]
+            AuditDailyStat.objects.bulk_create(stats, batch_size=LOT)
+            AuditUserDailyStat.objects.bulk_create(
+                [
+                    AuditUserDailyStat(
+                        university_id=row["university_id"] or 0, date=row["jour"],
+                        user_email=row["user_email"], user_role=row["user_role"], count=row["n"],
+                    )
+                    for row in tranche.values("university_id", "jour", "user_email", "user_role")
+                    .annotate(n=Count("id")).order_by()
+                ],
+                batch_size=LOT,
+            )
+            total += sum(stat.count for stat in stats)
+            debut = fin
+    return total
+
+
+# ---------- Lecture (tableau de bord) ----------
+def tableau_de_bord(universite, jours=30):
+    """Compteurs, distributions, évolution et top utilisateurs : 3 requêtes sur les agrégats."""
+    aujourdhui = timezone.localdate()
+    debut = aujourdhui - timedelta(days=jours - 1)
+    stats = AuditDailyStat.objects.filter(university_id=universite.pk)
+
+    par_action, par_severite = Counter(), Counter()
+    for action, severite, n in stats.values_list("action", "severity").annotate(n=Sum("count")):
+        par_action[action] += n
+        par_severite[severite] += n
+
+    par_jour = dict(
+        stats.filter(date__gte=debut).values("date").annotate(n=Sum("count")).order_by().values_list("date", "n")
+    )
+
+    top_utilisateurs = list(
+        AuditUserDailyStat.objects.filter(university_id=universite.pk, date__gte=debut)
+        .values("user_email", "user_role")
+        .annotate(count=Sum("count"))
+        .order_by("-count")[:10]
+    )
+
+    return {
+        "total_logs": sum(par_action.values()),
+        "today_logs": par_jour.get(aujourdhui, 0),
+        "this_week_logs": sum(n for jour, n in par_jour.items() if jour > aujourdhui - timedelta(days=7)),
+        "this_month_logs": sum(par_jour.values()),
+        "critical_logs": par_severite.get(AuditLog.Severity.CRITICAL, 0),
+        "actions_distribution": [
+            {"action": action, "count": n} for action, n in par_action.most_common(10)
+        ],
+        "severity_distribution": [
+            {"severity": severite, "count": par_severite[severite]}
+            for severite in sorted(par_severite, reverse=True)
+        ],
+        "daily_evolution": [{"date": jour, "count": par_jour[jour]} for jour in sorted(par_jour)],
+        "top_active_users": top_utilisateurs,
+    }
+
+
+def comptes_par_action(universite):
+    """{action: nombre de logs} pour l'université : 1 requête."""
+    return dict(
+        AuditDailyStat.objects.filter(university_id=universite.pk)
+        .values("action")
+        .annotate(n=Sum("count"))
+        .order_by()
+        .values_list("action", "n")
+    )
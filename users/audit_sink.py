@@ -0,0 +1,236 @@
+# users/audit_sink.py
+"""
+Écriture différée des journaux d'audit.
+
+Les vues construisent un AuditLog non sauvegardé (build_audit_log) et le
+confient au tampon du processus ; un thread d'arrière-plan l'insère par
+bulk_create dès que AUDIT_BUFFER_SIZE entrées sont en attente ou toutes les
+AUDIT_FLUSH_INTERVAL secondes. La requête ne paie qu'un append sous verrou.
+
+  - l'entrée n'est mise en tampon qu'au commit de la transaction courante :
+    une action annulée ne laisse pas de trace, et aucun INSERT d'audit ne
+    s'exécute dans la transaction métier ;
+  - created_at est fixé à l'enregistrement, pas à l'insertion ;
+  - si la base est indisponible, le lot est ajouté au fichier
+    AUDIT_FALLBACK_FILE (JSONL), rejoué par `manage.py replay_audit_fallback` ;
+  - AUDIT_ASYNC=False : insertion immédiate (tests, scripts).
+"""
+import atexit
+import base64
+import json
+import logging
+import os
+import threading
+from datetime import datetime
+
+from django.conf import settings
+from django.db import IntegrityError, close_old_connections, transaction
+from django.utils import timezone
+
+logger = logging.getLogger(__name__)
+
+
+def _reglage(nom, defaut):
+    return getattr(settings, nom, defaut)
+
+
+def _vers_dict(log):
+    data = {}
+    for field in log._meta.concrete_fields:
+        if field.primary_key:
+            continue
+        value = getattr(log, field.attname)
+        if isinstance(value, datetime):
+            value = value.isoformat()
+        elif isinstance(value, (bytes, memoryview)):
+            value = {"base64": base64.b64encode(bytes(value)).decode("ascii")}
+        data[field.attname] = value
+    return data
+
+
+def _depuis_dict(data):
+    if data.get("created_at"):
+        data["created_at"] = datetime.fromisoformat(data["created_at"])
+    if isinstance(data.get("payload_zlib"), dict):
+        data["payload_zlib"] = base64.b64decode(data["payload_zlib"]["base64"])
+    return data
+
+
+class AuditSink:
+    """Tampon par processus ; réinitialisé après un fork (workers préchargés)."""
+
+    def __init__(self):
+        self._pid = None
+        self._sources = []
+        self._reset()
+
+    def _reset(self):
+        self._pid = os.getpid()
+        self._lock = threading.Lock()
+        self._buffer = []
+        self._wakeup = threading.Event()
+        self._thread = None
+
+    # ---------- API publique ----------
+    def write(self, log):
+        """Enregistre un AuditLog non sauvegardé ; renvoie l'instance."""
+        return self.write_many([log])[0]
+
+    def write_many(self, logs):
+        logs = list(logs)
+        now = timezone.now()
+        for log in logs:
+            if log.created_at is None:
+                log.created_at = now
+        if not _reglage("AUDIT_ASYNC", True):
+            self._insert(logs)
+            return logs
+        transaction.on_commit(lambda: self._enqueue(logs))
+        return logs
+
+    def add_source(self, source):
+        """
+        source() est appelée à chaque vidage et renvoie des logs à insérer avec
+        le tampon (résumés d'agrégats périodiques, cf. users/middleware.py).
+        """
+        self._sources.append(source)
+
+    def flush(self):
+        """Insère tout le tampon (appelé par le thread, à l'arrêt ou manuellement)."""
+        with self._lock:
+            batch, self._buffer = self._buffer, []
+        for source in self._sources:
+            try:
+                batch.extend(source())
+            except Exception as e:  # une source défaillante ne doit pas perdre le tampon
+                logger.error(f"Audit : échec d'une source de logs : {e}")
+        if batch:
+            self._insert(batch)
+
+    def pending(self):
+        with self._lock:
+            return len(self._buffer)
+
+    # ---------- Interne ----------
+    def _enqueue(self, logs):
+        if self._pid != os.getpid():
+            self._reset()
+        with self._lock:
+            self._buffer.extend(logs)
+            plein = len(self._buffer) >= _reglage("AUDIT_BUFFER_SIZE", 200)
+            if self._thread is None:
+                self._thread = threading.Thread(
+                    target=self._run, name="audit-sink", daemon=True
+                )
+                self._thread.start()
+        if plein:
+            self._wakeup.set()
+
+    def _run(self):
+        while True:
+            self._wakeup.wait(_reglage("AUDIT_FLUSH_INTERVAL", 2.0))
+            self._wakeup.clear()
+            close_old_connections()
+            try:
+                self.flush()
+            except Exception as e:  # le thread ne doit jamais mourir
+                logger.error(f"Audit : échec du vidage du tampon : {e}")
+
+    def _insert(self, logs):
+        from users.utils import bulk_create_audit_logs
+
+        try:
+            try:
+                bulk_create_audit_logs(logs)
+            except IntegrityError:
+                # Université supprimée entre l'action et l'insertion : on garde le log sans FK
+                self._detacher_universites_disparues(logs)
+                bulk_create_audit_logs(logs)
+        except Exception as e:
+            logger.error(f"Audit : base indisponible, {len(logs)} entrée(s) vers le fichier de secours : {e}")
+            self._fallback(logs)
+
+    @staticmethod
+    def _detacher_universites_disparues(logs):
+        from universites.models import Universite
+
+        ids = {log.university_id for log in logs if log.university_id}
+        existantes = set(Universite.objects.filter(id__in=ids).values_list("id", flat=True))
+        for log in logs:
+            log.pk = None
+            if log.university_id and log.university_id not in existantes:
+                log.university_id = None
+
+    def _fallback(self, logs):
+        chemin = _reglage("AUDIT_FALLBACK_FILE", os.path.join(settings.BASE_DIR, "audit_fallback.jsonl"))
+        try:
+            with open(chemin, "a", encoding="utf-8") as fichier:
+                for log in logs:
+                    fichier.write(json.dumps(_vers_dict(log), ensure_ascii=False, default=str) + "\n")
+        except OSError as e:
+            logger.critical(f"Audit : {len(logs)} entrée(s) perdues, fichier de secours inaccessible : {e}")
+
+
+audit_sink = AuditSink()
+atexit.register(audit_sink.flush)
+
+
+def _rejouer(en_cours, batch_size):
+    """
+    Réinsère en_cours à partir de la position enregistrée en base
+    (AuditReplayCheckpoint). Chaque lot et la nouvelle position sont validés
+    dans la même transaction : une reprise après interruption ne réinsère
+    ni ne perd aucune entrée.
+    """
+    from users.models import AuditLog, AuditReplayCheckpoint
+    from users.utils import bulk_create_audit_logs
+
+    cle = os.path.abspath(en_cours)
+    position = (
+        AuditReplayCheckpoint.objects.filter(path=cle).values_list("offset", flat=True).first() or 0
+    )
+
+    def valider(lot, position):
+        with transaction.atomic():
+            bulk_create_audit_logs(lot)
+            AuditReplayCheckpoint.objects.update_or_create(path=cle, defaults={"offset": position})
+
+    total, lot = 0, []
+    with open(en_cours, "rb") as fichier:
+        fichier.seek(position)
+        for ligne in fichier:
+            position += len(ligne)
+            if ligne.strip():
+                lot.append(AuditLog(**_depuis_dict(json.loads(ligne))))
+            if len(lot) >= batch_size:
+                valider(lot, position)
+                total, lot = total + len(lot), []
+    if lot:
+        valider(lot, position)
+        total += len(lot)
+    # Arrêt entre ces deux lignes : position orpheline, écartée au prochain renommage
+    os.remove(en_cours)
+    AuditReplayCheckpoint.objects.filter(path=cle).delete()
+    return total
+
+
+def replay_fallback(chemin=None, batch_size=1000):
+    """
+    Réinsère le fichier de secours puis le vide ; renvoie le nombre d'entrées.
+    Un rejeu interrompu (fichier .replay restant) est d'abord terminé.
+    """
+    chemin = chemin or _reglage("AUDIT_FALLBACK_FILE", os.path.join(settings.BASE_DIR, "audit_fallback.jsonl"))
+    en_cours = f"{chemin}.replay"
+    total = 0
+    if os.path.exists(en_cours):
+        total += _rejouer(en_cours, batch_size)
+    if os.path.exists(chemin):
+        from users.models import AuditReplayCheckpoint
+
+        # Nouveau fichier à rejouer depuis le début : position d'un rejeu
+        # précédent (interrompu après la suppression du fichier) écartée
+        AuditReplayCheckpoint.objects.filter(path=os.path.abspath(en_cours)).delete()
+        # Renommé d'abord : les écritures concurrentes repartent dans un nouveau fichier
+        os.replace(chemin, en_cours)
+        total += _rejouer(en_cours, batch_size)
+    return total
@@ -0,0 +1,139 @@
+# users/authentication.py
+"""
+Authentification JWT avec rôles universitaires embarqués (JWT_ROLE_CLAIMS=True).
+
+À la connexion et au rafraîchissement, le refresh token (et donc l'access token
+qui en dérive) reçoit :
+    roles : [[universite_id, slug, role], ...]
+    rv    : version des rôles (universites.roles.get_role_version)
+    email, type, is_staff, is_superuser
+
+Si `rv` correspond toujours à la version en cache, la carte des rôles est lue
+dans le jeton (aucune requête RoleUniversite) ; sur les GET des vues marquées
+`stateless_auth = True`, l'utilisateur lui-même n'est pas chargé
+(StatelessTokenUser). Un jeton dont la version est périmée (rôle modifié,
+compte modifié) retombe sur l'authentification classique, rôles relus en base.
+"""
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from rest_framework.exceptions import AuthenticationFailed
+from rest_framework.permissions import SAFE_METHODS
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.models import TokenUser
+from rest_framework_simplejwt.serializers import TokenRefreshSerializer
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from universites.models import RoleUniversite
+from universites.roles import RoleMap, get_role_version, seed_role_map
+from users.revocation import DenylistAccessToken, DenylistMixin
+
+# Au-delà, le jeton deviendrait trop gros : on n'embarque rien (chemin classique)
+ROLE_CLAIMS_MAX = getattr(settings, "JWT_ROLE_CLAIMS_MAX", 50)
+
+
+def role_claims_enabled():
+    return getattr(settings, "JWT_ROLE_CLAIMS", False)
+
+
+def embed_role_claims(token, user):
+    # Version lue AVANT les rôles : un changement concurrent rendra le jeton périmé
+    version = get_role_version(user.pk)
+    rows = list(
+        RoleUniversite.objects.filter(utilisateur_id=user.pk).values_list(
+            "universite_id", "universite__slug", "role"
+        )[: ROLE_CLAIMS_MAX + 1]
+    )
+    if len(rows) > ROLE_CLAIMS_MAX:
+        return token
+    token["roles"] = [list(row) for row in rows]
+    token["rv"] = version
+    token["email"] = user.email
+    token["type"] = user.type
+    token["is_staff"] = user.is_staff
+    token["is_superuser"] = user.is_superuser
+    return token
+
+
+def role_map_from_claims(token):
+    roles, slugs = {}, {}
+    for universite_id, slug, role in token.get("roles", []):
+        roles[universite_id] = role
+        slugs[slug] = universite_id
+    return RoleMap(roles, slugs)
+
+
+class RoleClaimsRefreshToken(DenylistMixin, RefreshToken):
+    access_token_class = DenylistAccessToken
+
+    @classmethod
+    def for_user(cls, user):
+        token = super().for_user(user)
+        if role_claims_enabled():
+            embed_role_claims(token, user)
+        return token
+
+
+class RoleClaimsTokenRefreshSerializer(TokenRefreshSerializer):
+    """Rafraîchissement : les rôles sont relus en base et ré-embarqués."""
+    token_class = RoleClaimsRefreshToken
+
+    def validate(self, attrs):
+        if role_claims_enabled():
+            refresh = self.token_class(attrs["refresh"])
+            user = get_user_model().objects.filter(
+                pk=refresh.payload.get(api_settings.USER_ID_CLAIM), is_active=True
+            ).first()
+            if user is None:
+                raise AuthenticationFailed(
+                    self.error_messages["no_active_account"], "no_active_account"
+                )
+            embed_role_claims(refresh, user)
+            attrs = {**attrs, "refresh": str(refresh)}
+        return super().validate(attrs)
+
+
+class StatelessTokenUser(TokenUser):
+    """
+    Utilisateur reconstruit depuis le jeton. Tout attribut absent du jeton
+    (champ du modèle, relation...) déclenche le chargement du vrai utilisateur.
+    """
+
+    def __getattr__(self, attr):
+        if attr.startswith("_"):
+            raise AttributeError(attr)
+        if attr in self.token:
+            return self.token[attr]
+        if "_user" not in self.__dict__:
+            self.__dict__["_user"] = get_user_model().objects.get(pk=self.id)
+        return getattr(self.__dict__["_user"], attr)
+
+
+class RoleClaimsJWTAuthentication(JWTAuthentication):
+    """Identique à JWTAuthentication tant que JWT_ROLE_CLAIMS est désactivé."""
+
+    def authenticate(self, request):
+        self.request = request
+        return super().authenticate(request)
+
+    def get_user(self, validated_token):
+        if not role_claims_enabled() or "rv" not in validated_token:
+            return super().get_user(validated_token)
+
+        user_id = validated_token[api_settings.USER_ID_CLAIM]
+        if validated_token["rv"] != get_role_version(user_id):
+            # Rôles ou compte modifiés depuis l'émission : pas de confiance aux claims
+            return super().get_user(validated_token)
+
+        request = getattr(self, "request", None)
+        view = (getattr(request, "parser_context", None) or {}).get("view")
+        if (
+            request is not None
+            and request.method in SAFE_METHODS
+            and getattr(view, "stateless_auth", False)
+        ):
+            user = StatelessTokenUser(validated_token)
+        else:
+            user = super().get_user(validated_token)
+        seed_role_map(user, role_map_from_claims(validated_token))
+        return user
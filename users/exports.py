@@ -0,0 +1,152 @@
+# users/exports.py
+"""
+Exports volumineux en flux (membres, journaux d'audit, universités).
+
+Les lignes sont lues par lots via .iterator() (curseur serveur sous
+PostgreSQL), formatées au fil de l'eau et envoyées par StreamingHttpResponse :
+la mémoire du worker reste bornée quel que soit le volume.
+
+Paramètres de requête communs :
+    ?output=csv|jsonl     format (csv par défaut ; « format » est réservé par DRF)
+    ?compress=gzip        sortie compressée (.gz)
+    ?columns=a,b,c        sous-ensemble et ordre des colonnes
+    ?after_id=<id>        reprise après le dernier id reçu (lignes triées par id)
+"""
+import csv
+import io
+import json
+import zlib
+from dataclasses import dataclass
+from typing import Callable, Optional
+
+from django.http import StreamingHttpResponse
+from rest_framework.exceptions import ValidationError
+
+CHUNK_SIZE = 2000
+BUFFER_SIZE = 64 * 1024
+
+CONTENT_TYPES = {"csv": "text/csv; charset=utf-8", "jsonl": "application/x-ndjson"}
+
+
+@dataclass(frozen=True)
+class Column:
+    key: str                             # nom dans ?columns= et clé JSONL
+    header: str                          # en-tête CSV
+    field: Optional[str] = None          # champ/annotation lu par values_list (défaut : key)
+    format: Optional[Callable] = None    # valeur brute → valeur exportée
+    raw_json: bool = False               # valeur déjà sérialisée en JSON (Cast en texte)
+
+    @property
+    def source(self):
+        return self.field or self.key
+
+
+class StreamingExport:
+    """
+    export = StreamingExport(queryset, COLUMNS, filename="membres")
+    return export.response(request)
+
+    Le queryset peut porter des annotations référencées par Column.field.
+    """
+
+    def __init__(self, queryset, columns, filename, chunk_size=CHUNK_SIZE):
+        self.queryset = queryset
+        self.columns = list(columns)
+        self.filename = filename
+        self.chunk_size = chunk_size
+
+    # ---------- Paramètres ----------
+    def _options(self, request):
+        params = request.query_params
+        output = params.get("output", "csv")
+        if output not in CONTENT_TYPES:
+            raise ValidationError({"output": f"Formats acceptés : {', '.join(CONTENT_TYPES)}."})
+
+        compress = params.get("compress")
+        if compress not in (None, "", "gzip"):
+            raise ValidationError({"compress": "Seule la compression gzip est disponible."})
+
+        columns = self.columns
+        if params.get("columns"):
+            par_cle = {col.key: col for col in self.columns}
+            demandees = [key.strip() for key in params["columns"].split(",") if key.strip()]
+            inconnues = [key for key in demandees if key not in par_cle]
+            if inconnues:
+                raise ValidationError(
+                    {"columns": f"Colonnes inconnues : {', '.join(inconnues)}. "
+                                f"Disponibles : {', '.join(par_cle)}."}
+                )
+            columns = [par_cle[key] for key in demandees]
+
+        after_id = params.get("after_id")
+        if after_id not in (None, "") and not after_id.isdigit():
+            raise ValidationError({"after_id": "Entier attendu."})
+
+        return output, compress == "gzip", columns, int(after_id) if after_id else None
+
+    # ---------- Production ----------
+    def rows(self, columns, after_id=None):
+        qs = self.queryset.order_by("pk")
+        if after_id is not None:
+            qs = qs.filter(pk__gt=after_id)
+        sources = [col.source for col in columns]
+        for values in qs.values_list(*sources).iterator(chunk_size=self.chunk_size):
+            yield [
+                col.format(value) if col.format and value is not None else value
+                for col, value in zip(columns, values)
+            ]
+
+    def _csv(self, columns, rows):
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        writer.writerow([col.header for col in columns])
+        for row in rows:
+            writer.writerow(["" if value is None else value for value in row])
+            if buffer.tell() >= BUFFER_SIZE:
+                yield buffer.getvalue().encode("utf-8")
+                buffer.seek(0)
+                buffer.truncate()
+        yield buffer.getvalue().encode("utf-8")
+
+    def _jsonl(self, columns, rows):
+        keys = [json.dumps(col.key) for col in columns]
+        buffer = []
+        taille = 0
+        for row in rows:
+            champs = []
+            for key, col, value in zip(keys, columns, row):
+                if col.raw_json and value is not None:
+                    champs.append(f"{key}:{value}")  # JSON déjà sérialisé par la base
+                else:
+                    champs.append(f"{key}:{json.dumps(value, ensure_ascii=False, default=str)}")
+            ligne = "{" + ",".join(champs) + "}\n"
+            buffer.append(ligne)
+            taille += len(ligne)
+            if taille >= BUFFER_SIZE:
+                yield "".join(buffer).encode("utf-8")
+                buffer, taille = [], 0
+        yield "".join(buffer).encode("utf-8")
+
+    @staticmethod
+    def _gzip(chunks):
+        compresseur = zlib.compressobj(6, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+        for chunk in chunks:
+            data = compresseur.compress(chunk)
+            if data:
+                yield data
+        yield compresseur.flush()
+
+    def response(self, request):
+        output, gzip, columns, after_id = self._options(request)
+        ecrire = self._csv if output == "csv" else self._jsonl
+        chunks = ecrire(columns, self.rows(columns, after_id))
+        filename = f"{self.filename}.{output}"
+        if gzip:
+            chunks = self._gzip(chunks)
+            filename += ".gz"
+
+        response = StreamingHttpResponse(
+            chunks, content_type="application/gzip" if gzip else CONTENT_TYPES[output]
+        )
+        response["Content-Disposition"] = f'attachment; filename="{filename}"'
+        return response
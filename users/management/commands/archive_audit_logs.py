@@ -1,15 +1,72 @@
 # users/management/commands/archive_audit_logs.py
+"""
+Archive puis purge les vieux logs d'audit, en flux et par lots bornés.
+
+Pour chaque lot (ordre des id) :
+  1. lecture de `--chunk-size` lignes (.iterator, pas d'instances de modèle) ;
+  2. ajout d'un membre gzip au fichier JSONL courant, flush + fsync ;
+  3. mise à jour atomique du manifeste (fichiers, lignes, taille, sha256,
+     dernier id archivé) : c'est le point de reprise ;
+  4. suppression des lignes du lot.
+Les fichiers tournent tous les `--rows-per-file` logs. Une exécution
+interrompue reprend au dernier point de reprise avec la même date limite :
+le fichier courant est tronqué à la taille consignée et les lignes déjà
+archivées mais pas encore supprimées le sont en premier.
+
+    zcat audit_logs_archive/part-00001.jsonl.gz | head
+"""
+import gzip
+import hashlib
+import json
+import os
+import zlib
+from datetime import datetime, timedelta
+
 from django.core.management.base import BaseCommand, CommandError
 from django.utils import timezone
-from datetime import timedelta
+
+from users.audit_partitions import supprimer_avant
 from users.models import AuditLog
-import json
-import os
+
+MANIFESTE = 'manifest.json'
+CHAMPS = (
+    'id', 'created_at', 'action', 'severity', 'user_id', 'user_email', 'user_role',
+    'university__nom', 'target_type', 'target_id', 'target_repr', 'previous_data',
+    'new_data', 'payload_format', 'payload_zlib', 'ip_address', 'user_agent', 'request_path',
+    'request_method', 'description',
+)
+
+
+def _ecrire_atomique(chemin, data):
+    temporaire = f'{chemin}.tmp'
+    with open(temporaire, 'w', encoding='utf-8') as f:
+        json.dump(data, f, indent=2, ensure_ascii=False)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(temporaire, chemin)
+
+
+def _sha256(chemin):
+    empreinte = hashlib.sha256()
+    with open(chemin, 'rb') as f:
+        for bloc in iter(lambda: f.read(1024 * 1024), b''):
+            empreinte.update(bloc)
+    return empreinte
+
+
+def _ligne(row):
+    row['university'] = row.pop('university__nom')
+    if row['payload_zlib'] is not None:
+        data = json.loads(zlib.decompress(bytes(row['payload_zlib'])))
+        row['previous_data'], row['new_data'] = data['previous'], data['new']
+    del row['payload_zlib']
+    row['created_at'] = row['created_at'].isoformat()
+    return json.dumps(row, ensure_ascii=False, default=str)
 
 
 class Command(BaseCommand):
-    help = 'Archive ou purge les vieux logs d\'audit'
-    
+    help = 'Archive (JSONL gzip, manifeste, reprise) puis purge les vieux logs d\'audit'
+
     def add_arguments(self, parser):
         parser.add_argument(
             '--days',
@@ -18,10 +75,29 @@ class Command(BaseCommand):
             help='Nombre de jours avant archivage (défaut: 90)'
         )
         parser.add_argument(
+            '--archive-dir',
             '--archive-path',
+            dest='archive_dir',
             type=str,
-            default='audit_logs_archive.json',
-            help='Chemin du fichier d\'archive'
+            default='audit_logs_archive',
+            help='Répertoire des fichiers d\'archive et du manifeste'
+        )
+        parser.add_argument(
+            '--chunk-size',
+            type=int,
+            default=5000,
+            help='Logs lus, écrits et supprimés par lot (défaut: 5000)'
+        )
+        parser.add_argument(
+            '--rows-per-file',
+            type=int,
+            default=500000,
+            help='Logs par fichier avant rotation (défaut: 500000)'
+        )
+        parser.add_argument(
+            '--restart',
+            action='store_true',
+            help='Ignore un archivage interrompu et repart avec une nouvelle date limite'
         )
         parser.add_argument(
             '--purge-only',
@@ -33,83 +109,140 @@ class Command(BaseCommand):
             action='store_true',
             help='Simulation sans exécution'
         )
-    
+
     def handle(self, *args, **options):
-        days = options['days']
-        archive_path = options['archive_path']
-        purge_only = options['purge_only']
-        dry_run = options['dry_run']
-        
-        cutoff_date = timezone.now() - timedelta(days=days)
-        
-        # Récupérer les vieux logs
-        old_logs = AuditLog.objects.filter(created_at__lt=cutoff_date)
-        count = old_logs.count()
-        
-        if count == 0:
-            self.stdout.write(self.style.SUCCESS('Aucun log à archiver.'))
+        self.chunk_size = options['chunk_size']
+        self.rows_per_file = options['rows_per_file']
+        if self.chunk_size < 1 or self.rows_per_file < 1:
+            raise CommandError('--chunk-size et --rows-per-file doivent être positifs.')
+
+        self.dossier = options['archive_dir']
+        self.chemin_manifeste = os.path.join(self.dossier, MANIFESTE)
+
+        if options['purge_only']:
+            cutoff_date = timezone.now() - timedelta(days=options['days'])
+            self.stdout.write(self.style.WARNING(f'Suppression des logs antérieurs au {cutoff_date.date()}...'))
+            partitions, deleted = supprimer_avant(cutoff_date)
+            self.stdout.write(self.style.SUCCESS(
+                f'Suppression terminée: {partitions} partition(s), {deleted} entrées supprimées individuellement'
+            ))
             return
-        
-        self.stdout.write(f'{count} logs trouvés avant le {cutoff_date.date()}')
-        
-        if dry_run:
+
+        manifeste = self._charger_manifeste(options['restart'], options['days'], options['dry_run'])
+        cutoff_date = datetime.fromisoformat(manifeste['cutoff'])
+        old_logs = AuditLog.objects.filter(created_at__lt=cutoff_date)
+
+        if options['dry_run']:
+            count = old_logs.filter(id__gt=manifeste['last_id']).count()
+            self.stdout.write(f'{count} logs à archiver avant le {cutoff_date.date()}')
             self.stdout.write(self.style.WARNING('MODE SIMULATION - Aucune action effectuée'))
-            for log in old_logs[:5]:
+            for log in old_logs.filter(id__gt=manifeste['last_id']).order_by('id')[:5]:
                 self.stdout.write(f'  - {log}')
             return
-        
-        # Archivage (sauf si purge-only)
-        if not purge_only:
-            self.stdout.write(f'Archivage vers {archive_path}...')
-            logs_data = []
-            for log in old_logs:
-                logs_data.append({
-                    'id': log.id,
-                    'created_at': log.created_at.isoformat(),
-                    'action': log.action,
-                    'severity': log.severity,
-                    'user_email': log.user_email,
-                    'user_role': log.user_role,
-                    'university': log.university.nom if log.university else None,
-                    'target_type': log.target_type,
-                    'target_id': log.target_id,
-                    'target_repr': log.target_repr,
-                    'previous_data': log.previous_data,
-                    'new_data': log.new_data,
-                    'ip_address': str(log.ip_address) if log.ip_address else None,
-                    'request_path': log.request_path,
-                    'request_method': log.request_method,
-                    'description': log.description,
-                })
-            
-            # Écrire dans le fichier (append ou créer)
-            mode = 'a' if os.path.exists(archive_path) else 'w'
-            with open(archive_path, mode) as f:
-                if mode == 'w':
-                    f.write('[\n')
+
+        self._archiver(manifeste, old_logs)
+
+    # ---------- Manifeste / reprise ----------
+    def _charger_manifeste(self, restart, days, dry_run=False):
+        if os.path.exists(self.chemin_manifeste):
+            with open(self.chemin_manifeste, encoding='utf-8') as f:
+                manifeste = json.load(f)
+            if manifeste.get('completed_at') is None and not restart:
+                self.stdout.write(self.style.WARNING(
+                    f"Reprise de l'archivage interrompu (limite {manifeste['cutoff']}, "
+                    f"après l'id {manifeste['last_id']})"
+                ))
+                return manifeste
+            # Archivage terminé : on continue la série de fichiers, nouveau parcours des id
+            manifeste.update(completed_at=None, last_id=0)
+        else:
+            manifeste = {'files': [], 'last_id': 0}
+        manifeste.update(
+            cutoff=(timezone.now() - timedelta(days=days)).isoformat(),
+            started_at=timezone.now().isoformat(),
+        )
+        if not dry_run:
+            os.makedirs(self.dossier, exist_ok=True)
+            _ecrire_atomique(self.chemin_manifeste, manifeste)
+        return manifeste
+
+    def _fichier_courant(self, manifeste):
+        fichiers = manifeste['files']
+        if not fichiers or fichiers[-1]['rows'] >= self.rows_per_file:
+            fichiers.append({
+                'name': f'part-{len(fichiers) + 1:05d}.jsonl.gz',
+                'rows': 0, 'bytes': 0, 'sha256': hashlib.sha256().hexdigest(),
+                'first_id': None, 'last_id': None,
+            })
+        return fichiers[-1]
+
+    # ---------- Archivage ----------
+    def _archiver(self, manifeste, old_logs):
+        cutoff_date = datetime.fromisoformat(manifeste['cutoff'])
+        self.stdout.write(f'Archivage des logs antérieurs au {cutoff_date.date()} vers {self.dossier}/...')
+
+        # Octets écrits après le dernier point de reprise : abandonnés
+        if manifeste['files']:
+            dernier = manifeste['files'][-1]
+            chemin = os.path.join(self.dossier, dernier['name'])
+            if os.path.exists(chemin) and os.path.getsize(chemin) > dernier['bytes']:
+                with open(chemin, 'r+b') as f:
+                    f.truncate(dernier['bytes'])
+
+        # Archivé au dernier point de reprise mais pas encore supprimé
+        self._supprimer(old_logs.filter(id__lte=manifeste['last_id']))
+
+        total = 0
+        fichier, empreinte = None, None
+        while True:
+            rows = list(
+                old_logs.filter(id__gt=manifeste['last_id'])
+                .order_by('id')
+                .values(*CHAMPS)[:self.chunk_size]
+                .iterator(chunk_size=self.chunk_size)
+            )
+            if not rows:
+                break
+
+            courant = self._fichier_courant(manifeste)
+            chemin = os.path.join(self.dossier, courant['name'])
+            if fichier is not courant:
+                fichier = courant
+                if os.path.exists(chemin):
+                    with open(chemin, 'r+b') as f:
+                        f.truncate(courant['bytes'])
+                    empreinte = _sha256(chemin)
                 else:
-                    # Retirer le ] final et ajouter une virgule
-                    with open(archive_path, 'r+') as f_read:
-                        f_read.seek(0, 2)  # Fin du fichier
-                        pos = f_read.tell()
-                        while pos > 0:
-                            pos -= 1
-                            f_read.seek(pos)
-                            if f_read.read(1) == ']':
-                                f_read.seek(pos)
-                                f_read.write(',\n')
-                                break
-                
-                for i, log in enumerate(logs_data):
-                    if i > 0 or mode == 'a':
-                        f.write(',\n')
-                    f.write(json.dumps(log, indent=2, ensure_ascii=False))
-                
-                f.write('\n]')
-            
-            self.stdout.write(self.style.SUCCESS(f'Archivage terminé: {count} logs'))
-        
-        # Suppression
-        self.stdout.write(self.style.WARNING(f'Suppression de {count} logs...'))
-        deleted = old_logs.delete()
-        self.stdout.write(self.style.SUCCESS(f'Suppression terminée: {deleted[0]} entrées'))
\ No newline at end of file
+                    empreinte = hashlib.sha256()
+
+            # Un membre gzip par lot : le fichier reste lisible (zcat) à chaque étape
+            data = gzip.compress(('\n'.join(_ligne(row) for row in rows) + '\n').encode('utf-8'))
+            with open(chemin, 'ab') as f:
+                f.write(data)
+                f.flush()
+                os.fsync(f.fileno())
+            empreinte.update(data)
+
+            ids = [row['id'] for row in rows]
+            courant.update(
+                rows=courant['rows'] + len(rows),
+                bytes=courant['bytes'] + len(data),
+                sha256=empreinte.hexdigest(),
+                first_id=courant['first_id'] or ids[0],
+                last_id=ids[-1],
+            )
+            manifeste['last_id'] = ids[-1]
+            _ecrire_atomique(self.chemin_manifeste, manifeste)
+
+            self._supprimer(AuditLog.objects.filter(id__in=ids))
+            total += len(rows)
+            self.stdout.write(f'  {total} logs archivés ({courant["name"]})')
+
+        manifeste['completed_at'] = timezone.now().isoformat()
+        _ecrire_atomique(self.chemin_manifeste, manifeste)
+        self.stdout.write(self.style.SUCCESS(f'Archivage terminé: {total} logs archivés et supprimés'))
+
+    @staticmethod
+    def _supprimer(queryset):
+        # DELETE direct : pas de chargement des lignes ni de signaux (aucune relation entrante)
+        return queryset._raw_delete(queryset.db)
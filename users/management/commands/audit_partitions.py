@@ -0,0 +1,56 @@
+# users/management/commands/audit_partitions.py
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+from dateutil.relativedelta import relativedelta
+
+from users.audit_partitions import assurer_partitions, debut_mois, est_partitionnee, partitions, supprimer_avant
+
+
+class Command(BaseCommand):
+    help = 'Crée les partitions mensuelles à venir du journal d\'audit et supprime les plus anciennes (à planifier mensuellement)'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--ahead',
+            type=int,
+            default=3,
+            help='Nombre de mois à venir à préparer (défaut: 3)'
+        )
+        parser.add_argument(
+            '--retention-months',
+            type=int,
+            default=None,
+            help='Supprime les mois entiers antérieurs à N mois (défaut: aucune suppression)'
+        )
+        parser.add_argument(
+            '--list',
+            action='store_true',
+            help='Affiche les partitions existantes'
+        )
+
+    def handle(self, *args, **options):
+        if not est_partitionnee():
+            self.stdout.write(self.style.WARNING(
+                'Table d\'audit non partitionnée (PostgreSQL requis) : seule la rétention s\'applique.'
+            ))
+
+        creees = assurer_partitions(mois_avance=options['ahead'])
+        for nom in creees:
+            self.stdout.write(f'  + {nom}')
+
+        retention = options['retention_months']
+        if retention is not None:
+            if retention < 1:
+                raise CommandError('--retention-months doit être au moins 1.')
+            # Limite au début d'un mois : seules des partitions entières sont supprimées
+            limite = debut_mois(timezone.now()) - relativedelta(months=retention)
+            nb_partitions, nb_lignes = supprimer_avant(limite)
+            self.stdout.write(self.style.SUCCESS(
+                f'Rétention avant le {limite.date()} : {nb_partitions} partition(s), {nb_lignes} ligne(s) supprimée(s).'
+            ))
+
+        if options['list']:
+            for nom, debut, fin in partitions():
+                self.stdout.write(f'  {nom}  [{debut.date()} → {fin.date()}[')
+
+        self.stdout.write(self.style.SUCCESS(f'{len(creees)} partition(s) créée(s).'))
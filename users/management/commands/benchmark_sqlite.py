@@ -0,0 +1,144 @@
+# users/management/commands/benchmark_sqlite.py
+"""
+Débit concurrent lecture/écriture SQLite : réglages par défaut contre
+SQLITE_PRAGMAS (config/settings.py).
+
+Base temporaire, des processus lecteurs et écrivains (comme des workers
+gunicorn) pendant --duration secondes :
+  - lecteurs : lecture d'une ligne puis d'une page de 20 lignes ;
+  - écrivains : transaction lecture puis incrément d'un compteur (like,
+    téléchargement), le motif des vues qui lisent avant d'écrire.
+Profil « défaut » : journal DELETE, BEGIN différé, une connexion par
+opération (CONN_MAX_AGE=0). Profil « optimisé » : pragmas de
+SQLITE_PRAGMAS, BEGIN IMMEDIATE, connexion persistante.
+Les « verrouillés » sont les opérations abandonnées sur
+« database is locked ».
+"""
+import multiprocessing
+import os
+import random
+import sqlite3
+import tempfile
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+PROFILS = ('défaut', 'optimisé')
+
+
+def _connecter(chemin, profil):
+    # isolation_level=None : transactions explicites, comme Django en autocommit
+    conn = sqlite3.connect(chemin, isolation_level=None)
+    if profil == 'optimisé':
+        for nom, valeur in settings.SQLITE_PRAGMAS.items():
+            conn.execute(f'PRAGMA {nom}={valeur}')
+    return conn
+
+
+def _preparer(chemin, profil, lignes):
+    conn = _connecter(chemin, profil)
+    conn.execute('PRAGMA journal_mode=%s' % ('WAL' if profil == 'optimisé' else 'DELETE'))
+    conn.execute('CREATE TABLE bench (id INTEGER PRIMARY KEY, compteur INTEGER NOT NULL, titre TEXT NOT NULL)')
+    conn.execute('BEGIN')
+    conn.executemany(
+        'INSERT INTO bench (id, compteur, titre) VALUES (?, 0, ?)',
+        ((i, f'Mémoire {i} ' + 'x' * 200) for i in range(1, lignes + 1)),
+    )
+    conn.execute('COMMIT')
+    conn.close()
+
+
+def _travailler(chemin, profil, role, lignes, fin, resultats):
+    persistante = profil == 'optimisé'
+    debut = 'BEGIN IMMEDIATE' if persistante else 'BEGIN'
+    conn = _connecter(chemin, profil) if persistante else None
+    faites = verrouillees = 0
+    while time.time() < fin:
+        if not persistante:
+            conn = _connecter(chemin, profil)
+        ident = random.randint(1, lignes)
+        try:
+            if role == 'lecture':
+                conn.execute('SELECT compteur, titre FROM bench WHERE id = ?', (ident,)).fetchone()
+                conn.execute('SELECT id, titre FROM bench WHERE id >= ? ORDER BY id LIMIT 20', (ident,)).fetchall()
+            else:
+                conn.execute(debut)
+                try:
+                    conn.execute('SELECT compteur FROM bench WHERE id = ?', (ident,)).fetchone()
+                    conn.execute('UPDATE bench SET compteur = compteur + 1 WHERE id = ?', (ident,))
+                    conn.execute('COMMIT')
+                except sqlite3.OperationalError:
+                    conn.execute('ROLLBACK')
+                    raise
+            faites += 1
+        except sqlite3.OperationalError:
+            verrouillees += 1
+        if not persistante:
+            conn.close()
+    resultats.put((role, faites, verrouillees))
+
+
+class Command(BaseCommand):
+    help = 'Mesure le débit SQLite concurrent (lectures/écritures) avant et après SQLITE_PRAGMAS'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--duration',
+            type=float,
+            default=5.0,
+            help='Durée de chaque profil en secondes (défaut: 5)'
+        )
+        parser.add_argument(
+            '--readers',
+            type=int,
+            default=4,
+            help='Processus lecteurs (défaut: 4)'
+        )
+        parser.add_argument(
+            '--writers',
+            type=int,
+            default=4,
+            help='Processus écrivains (défaut: 4)'
+        )
+        parser.add_argument(
+            '--rows',
+            type=int,
+            default=20000,
+            help='Lignes de la table de test (défaut: 20000)'
+        )
+
+    def handle(self, *args, **options):
+        duree, lignes = options['duration'], options['rows']
+        self.stdout.write(
+            f"{options['readers']} lecteur(s), {options['writers']} écrivain(s), "
+            f"{duree:g} s par profil, {lignes} lignes"
+        )
+        self.stdout.write(f"{'profil':<10} {'lectures/s':>11} {'écritures/s':>12} {'verrouillés':>12}")
+
+        for profil in PROFILS:
+            with tempfile.TemporaryDirectory() as dossier:
+                chemin = os.path.join(dossier, 'bench.sqlite3')
+                _preparer(chemin, profil, lignes)
+
+                resultats = multiprocessing.Queue()
+                fin = time.time() + duree
+                roles = ['lecture'] * options['readers'] + ['écriture'] * options['writers']
+                processus = [
+                    multiprocessing.Process(target=_travailler, args=(chemin, profil, role, lignes, fin, resultats))
+                    for role in roles
+                ]
+                for p in processus:
+                    p.start()
+                totaux = {'lecture': 0, 'écriture': 0, 'verrouillés': 0}
+                for _ in processus:
+                    role, faites, verrouillees = resultats.get()
+                    totaux[role] += faites
+                    totaux['verrouillés'] += verrouillees
+                for p in processus:
+                    p.join()
+
+            self.stdout.write(
+                f"{profil:<10} {totaux['lecture'] / duree:>11.0f} "
+                f"{totaux['écriture'] / duree:>12.0f} {totaux['verrouillés']:>12}"
+            )
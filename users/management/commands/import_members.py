@@ -0,0 +1,54 @@
+# users/management/commands/import_members.py
+import time
+
+from django.core.exceptions import ValidationError
+from django.core.management.base import BaseCommand, CommandError
+
+from universites.resolver import get_universite
+from users.onboarding import importer_membres, lire_csv
+
+
+class Command(BaseCommand):
+    help = 'Importe en masse les membres d\'une université depuis un CSV (email, nom, prenom, sexe[, role][, password])'
+
+    def add_arguments(self, parser):
+        parser.add_argument('univ_slug', help='Slug de l\'université')
+        parser.add_argument('csv_path', help='Chemin du fichier CSV (UTF-8)')
+        parser.add_argument(
+            '--workers',
+            type=int,
+            default=None,
+            help='Threads de hachage des mots de passe (défaut: nombre de CPU)'
+        )
+        parser.add_argument(
+            '--no-email',
+            action='store_true',
+            help='Ne pas envoyer les emails d\'invitation'
+        )
+
+    def handle(self, *args, **options):
+        universite = get_universite(options['univ_slug'])
+        if universite is None:
+            raise CommandError(f"Université inconnue : {options['univ_slug']}")
+
+        try:
+            with open(options['csv_path'], 'rb') as fichier:
+                lignes, erreurs = lire_csv(fichier, max_lignes=None)
+        except (OSError, UnicodeDecodeError, ValidationError) as e:
+            raise CommandError(str(e))
+
+        for erreur in erreurs:
+            self.stderr.write(f"Ligne {erreur['ligne']} ignorée : {erreur['erreurs']}")
+
+        debut = time.monotonic()
+        rapport = importer_membres(
+            universite, lignes,
+            envoyer_emails=not options['no_email'],
+            workers=options['workers'],
+            emails_en_arriere_plan=False,
+        )
+        self.stdout.write(self.style.SUCCESS(
+            f"{rapport['crees']} compte(s) créé(s), {rapport['existants']} existant(s), "
+            f"{rapport['roles_crees']} rôle(s) ajouté(s), {rapport['invitations']} invitation(s) "
+            f"en {time.monotonic() - debut:.1f} s ({len(erreurs)} ligne(s) en erreur)."
+        ))
@@ -0,0 +1,20 @@
+# users/management/commands/purge_revoked_tokens.py
+from django.core.management.base import BaseCommand
+
+from users.revocation import purge_expired
+
+
+class Command(BaseCommand):
+    help = 'Supprime les JTI révoqués dont le jeton a expiré (à planifier quotidiennement)'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=5000,
+            help='Nombre de lignes supprimées par requête (défaut: 5000)'
+        )
+
+    def handle(self, *args, **options):
+        deleted = purge_expired(batch_size=options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(f'{deleted} jeton(s) révoqué(s) expiré(s) supprimé(s).'))
@@ -0,0 +1,28 @@
+# users/management/commands/rebuild_audit_rollups.py
+from datetime import date
+
+from django.core.management.base import BaseCommand, CommandError
+
+from users.audit_rollups import recalculer
+
+
+class Command(BaseCommand):
+    help = 'Recalcule les agrégats du tableau de bord d\'audit à partir des logs'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--since',
+            type=str,
+            default=None,
+            help='Premier jour recalculé, AAAA-MM-JJ (défaut: tout l\'historique présent)'
+        )
+
+    def handle(self, *args, **options):
+        depuis = None
+        if options['since']:
+            try:
+                depuis = date.fromisoformat(options['since'])
+            except ValueError:
+                raise CommandError('--since attend une date AAAA-MM-JJ.')
+        total = recalculer(depuis)
+        self.stdout.write(self.style.SUCCESS(f'Agrégats recalculés à partir de {total} log(s).'))
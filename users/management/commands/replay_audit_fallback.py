@@ -0,0 +1,25 @@
+# users/management/commands/replay_audit_fallback.py
+from django.core.management.base import BaseCommand
+
+from users.audit_sink import replay_fallback
+
+
+class Command(BaseCommand):
+    help = "Réinsère les logs d'audit écrits dans le fichier de secours pendant une indisponibilité de la base"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--file',
+            default=None,
+            help='Fichier JSONL à rejouer (défaut: AUDIT_FALLBACK_FILE)'
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=1000,
+            help='Nombre de logs insérés par requête (défaut: 1000)'
+        )
+
+    def handle(self, *args, **options):
+        total = replay_fallback(options['file'], batch_size=options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(f"{total} log(s) d'audit réinséré(s)."))
@@ -0,0 +1,84 @@
+# users/management/commands/serve.py
+"""
+Lance le serveur de production à la place de `runserver`.
+
+  - par défaut : gunicorn (config/gunicorn.conf.py), WSGI, workers gthread
+    dimensionnés sur le nombre de CPU, application préchargée, recyclage
+    après max_requests ;
+  - --asgi : daphne sur config.asgi (HTTP + WebSockets de interactions),
+    un processus, à répliquer par conteneur.
+
+Le processus est remplacé (exec) : les signaux du conteneur (TERM, HUP, USR2)
+arrivent directement au serveur.
+"""
+import importlib.util
+import os
+import sys
+
+from decouple import config
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+CONFIG_GUNICORN = os.path.join(settings.BASE_DIR, 'config', 'gunicorn.conf.py')
+
+
+class Command(BaseCommand):
+    help = 'Lance le serveur de production (gunicorn WSGI, ou daphne ASGI avec --asgi)'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--asgi',
+            action='store_true',
+            default=config('SERVE_ASGI', default=False, cast=bool),
+            help='Servir config.asgi avec daphne (WebSockets) ; défaut: SERVE_ASGI'
+        )
+        parser.add_argument(
+            '--port',
+            type=int,
+            default=config('PORT', default=8000, cast=int),
+            help='Port d\'écoute (défaut: PORT ou 8000)'
+        )
+        parser.add_argument(
+            '--workers',
+            type=int,
+            help='Nombre de workers gunicorn (défaut: WEB_CONCURRENCY ou 2 × CPU + 1)'
+        )
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Affiche la commande sans la lancer'
+        )
+
+    def handle(self, *args, **options):
+        if settings.DEBUG:
+            self.stdout.write(self.style.WARNING('DEBUG est actif : définir DEBUG=False en production.'))
+
+        if options['asgi']:
+            serveur = 'daphne'
+            argv = [
+                sys.executable, '-m', 'daphne',
+                '--bind', '0.0.0.0', '--port', str(options['port']),
+                '--proxy-headers',
+                'config.asgi:application',
+            ]
+        else:
+            serveur = 'gunicorn'
+            argv = [
+                sys.executable, '-m', 'gunicorn',
+                '--config', CONFIG_GUNICORN,
+                '--bind', f"0.0.0.0:{options['port']}",
+            ]
+            if options['workers']:
+                argv += ['--workers', str(options['workers'])]
+            if 'uvicorn' in config('GUNICORN_WORKER_CLASS', default='gthread'):
+                argv.append('config.asgi:application')
+            else:
+                argv.append('config.wsgi:application')
+
+        self.stdout.write(' '.join(argv))
+        if options['dry_run']:
+            return
+        if importlib.util.find_spec(serveur) is None:
+            raise CommandError(f'{serveur} n\'est pas installé (pip install -r requirements.txt).')
+        sys.stdout.flush()
+        os.execv(sys.executable, argv)
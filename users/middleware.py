@@ -1,12 +1,142 @@
 # users/middleware.py
+"""
+Audit automatique des requêtes :
+  - échecs de connexion et connexions d'administrateurs ;
+  - refus (401/403) sur les routes sensibles.
+
+Chaque route est classée une seule fois (motif précompilé appliqué à
+resolver_match.route, résultat mémorisé par route). Les refus répétés d'une
+même IP sur une même route sont agrégés : le premier de la fenêtre
+AUDIT_DENIED_WINDOW est journalisé, les suivants sont comptés puis résumés
+en une seule entrée à la fin de la fenêtre (compteurs par processus, vidés
+par le thread du tampon d'audit). Aucune écriture dans la requête : tout
+passe par users/audit_sink.py.
+"""
 import logging
+import re
+import threading
+import time
+from collections import Counter
+
+from django.conf import settings
 from django.utils import timezone
-from django.contrib.auth import get_user_model
+
+from .audit_sink import audit_sink
 from .models import AuditLog
 from .utils import get_client_ip
 
 logger = logging.getLogger(__name__)
-User = get_user_model()
+
+SENSIBLES = ('admin/', 'suppression-totale', 'bulk-delete', 'role', 'moderer', 'marquer-traite')
+_MOTIF_SENSIBLE = re.compile(r'(?:^|/)(?:%s)' % '|'.join(re.escape(motif) for motif in SENSIBLES))
+
+CONNEXION = 'login'
+SENSIBLE = 'sensitive'
+ADMIN_TYPES = ('admin', 'superadmin', 'bigboss')
+
+# Couples (IP, route) suivis par processus ; au-delà, agrégés par route seule
+COMPTEURS_MAX = 10000
+UTILISATEURS_MAX = 20
+
+_routes = {}
+
+
+def classer(resolver_match):
+    """CONNEXION, SENSIBLE ou None pour la route résolue ; calculé une fois par route."""
+    if resolver_match is None:
+        return None
+    route = resolver_match.route
+    try:
+        return _routes[route]
+    except KeyError:
+        pass
+    if resolver_match.url_name == 'login':
+        categorie = CONNEXION
+    elif 'admin' in resolver_match.namespaces or _MOTIF_SENSIBLE.search(route):
+        categorie = SENSIBLE
+    else:
+        categorie = None
+    _routes[route] = categorie
+    return categorie
+
+
+def _fenetre():
+    return getattr(settings, 'AUDIT_DENIED_WINDOW', 60)
+
+
+class AgregateurRefus:
+    """Refus de la fenêtre courante par (IP, route), pour ce processus."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._compteurs = {}
+        self._echus = []
+
+    def compter(self, cle, categorie, request, response, email):
+        """True pour le premier refus de la fenêtre (à journaliser en détail)."""
+        maintenant = time.monotonic()
+        with self._lock:
+            if cle not in self._compteurs and len(self._compteurs) >= COMPTEURS_MAX:
+                cle = ('*', cle[1])
+            entree = self._compteurs.get(cle)
+            if entree is not None and maintenant - entree['debut'] >= _fenetre():
+                self._echus.append(self._compteurs.pop(cle))
+                entree = None
+            if entree is None:
+                self._compteurs[cle] = {
+                    'cle': cle, 'categorie': categorie, 'debut': maintenant,
+                    'premier': timezone.now(), 'dernier': None, 'n': 0,
+                    'statuts': Counter(), 'utilisateurs': set(), 'methode': request.method,
+                }
+                return True
+            entree['n'] += 1
+            entree['dernier'] = timezone.now()
+            entree['statuts'][response.status_code] += 1
+            entree['methode'] = request.method
+            if len(entree['utilisateurs']) < UTILISATEURS_MAX:
+                entree['utilisateurs'].add(email)
+            return False
+
+    def resumes(self):
+        """Entrées de résumé des fenêtres terminées (source du tampon d'audit)."""
+        maintenant = time.monotonic()
+        with self._lock:
+            echus, self._echus = self._echus, []
+            for cle in [c for c, e in self._compteurs.items() if maintenant - e['debut'] >= _fenetre()]:
+                echus.append(self._compteurs.pop(cle))
+        return [self._resume(entree) for entree in echus if entree['n']]
+
+    @staticmethod
+    def _resume(entree):
+        ip, route = entree['cle']
+        utilisateurs = sorted(entree['utilisateurs'])
+        statuts = ', '.join(f"{n}×{code}" for code, n in sorted(entree['statuts'].items()))
+        return AuditLog(
+            action=AuditLog.ActionType.LOGIN_FAILED,
+            severity=AuditLog.Severity.HIGH if entree['categorie'] == SENSIBLE else AuditLog.Severity.MEDIUM,
+            user_email=utilisateurs[0] if len(utilisateurs) == 1 else 'Multiple',
+            user_role='anonymous',
+            ip_address=None if ip == '*' else ip,
+            request_path=f"/{route}",
+            request_method=entree['methode'],
+            created_at=entree['dernier'],
+            description=(
+                f"{entree['n']} refus supplémentaires ({statuts}) sur /{route} depuis "
+                f"{'plusieurs IP' if ip == '*' else ip} entre {entree['premier']:%H:%M:%S} "
+                f"et {entree['dernier']:%H:%M:%S}"
+            ),
+            new_data={
+                'count': entree['n'],
+                'status_codes': {str(code): n for code, n in entree['statuts'].items()},
+                'first_at': entree['premier'].isoformat(),
+                'last_at': entree['dernier'].isoformat(),
+                'users': utilisateurs,
+            },
+        )
+
+
+refus = AgregateurRefus()
+audit_sink.add_source(refus.resumes)
 
 
 class AuditMiddleware:
@@ -14,66 +144,56 @@ class AuditMiddleware:
     Middleware pour logger automatiquement :
     - Les échecs de connexion
     - Les connexions réussies des admins
-    - Les erreurs 403 sur actions sensibles
+    - Les erreurs 401/403 sur actions sensibles (rafales agrégées)
     """
-    
+
     def __init__(self, get_response):
         self.get_response = get_response
-    
+
     def __call__(self, request):
-        # Traitement avant la vue
-        self.process_request(request)
-        
         response = self.get_response(request)
-        
-        # Traitement après la vue
+
+        # Traitement après la vue (route résolue)
         self.process_response(request, response)
-        
+
         return response
-    
-    def process_request(self, request):
-        """Capture les infos de la requête."""
-        request.audit_start_time = timezone.now()
-        request.audit_sensitive_path = self._is_sensitive_path(request.path)
-    
+
     def process_response(self, request, response):
         """Log les actions importantes après la réponse."""
-        
-        # 1. Log les échecs de connexion (401/403 sur /login/)
-        if response.status_code in [401, 403] and '/login' in request.path:
-            self._log_login_failed(request, response)
-        
-        # 2. Log les connexions réussies d'admins (POST /login/ → 200 avec token)
-        if request.method == 'POST' and '/login' in request.path and response.status_code == 200:
-            if hasattr(response, 'data') and 'user' in response.data:
-                user_data = response.data.get('user', {})
-                if user_data.get('type') in ['admin', 'superadmin', 'bigboss']:
-                    self._log_admin_login(request, response, user_data)
-        
-        # 3. Log les erreurs 403 sur chemins sensibles
-        if response.status_code == 403 and request.audit_sensitive_path:
-            self._log_forbidden_access(request, response)
-        
+        categorie = classer(getattr(request, 'resolver_match', None))
+        if categorie is None:
+            return response
+
+        status = response.status_code
+
+        # 1. Connexions réussies d'admins (POST /login/ → 200 avec token)
+        if categorie == CONNEXION and request.method == 'POST' and status == 200:
+            user_data = getattr(response, 'data', None) or {}
+            user_data = user_data.get('user') if isinstance(user_data, dict) else None
+            if user_data and user_data.get('type') in ADMIN_TYPES:
+                self._log_admin_login(request, user_data)
+
+        # 2. Échecs de connexion et accès interdits sur routes sensibles
+        elif status in (401, 403):
+            user = getattr(request, 'user', None)
+            user = user if user is not None and user.is_authenticated else None
+            email = user.email if user else 'Anonymous'
+            cle = (get_client_ip(request), request.resolver_match.route)
+            if refus.compter(cle, categorie, request, response, email):
+                if categorie == CONNEXION:
+                    self._log_login_failed(request, response)
+                else:
+                    self._log_forbidden_access(request, response, user)
+
         return response
-    
-    def _is_sensitive_path(self, path: str) -> bool:
-        """Détermine si un chemin est sensible et mérite d'être loggué en cas de 403."""
-        sensitive_patterns = [
-            '/admin/',
-            '/suppression-totale',
-            '/bulk-delete',
-            '/role',
-            '/moderer',
-            '/marquer-traite',
-        ]
-        return any(pattern in path for pattern in sensitive_patterns)
-    
+
     def _log_login_failed(self, request, response):
         """Log un échec de connexion."""
         try:
             email = request.data.get('email', 'unknown') if hasattr(request, 'data') else 'unknown'
-            
-            AuditLog.objects.create(
+            data = getattr(response, 'data', None)
+
+            audit_sink.write(AuditLog(
                 action=AuditLog.ActionType.LOGIN_FAILED,
                 severity=AuditLog.Severity.MEDIUM,
                 user_email=email,
@@ -84,49 +204,44 @@ class AuditMiddleware:
                 description=f"Tentative de connexion échouée pour {email}",
                 new_data={
                     'status_code': response.status_code,
-                    'error_detail': getattr(response, 'data', {}).get('detail', 'Unknown error')
+                    'error_detail': str(data.get('detail', 'Unknown error')) if isinstance(data, dict) else 'Unknown error',
                 }
-            )
+            ))
         except Exception as e:
             logger.error(f"Erreur logging login failed: {e}")
-    
-    def _log_admin_login(self, request, response, user_data):
-        """Log la connexion d'un administrateur."""
+
+    def _log_admin_login(self, request, user_data):
+        """Log la connexion d'un administrateur (utilisateur repris de la réponse de connexion)."""
         try:
-            user_id = user_data.get('id')
-            user = User.objects.get(id=user_id) if user_id else None
-            
-            AuditLog.objects.create(
+            audit_sink.write(AuditLog(
                 action=AuditLog.ActionType.LOGIN,
                 severity=AuditLog.Severity.LOW,
-                user=user,
-                user_email=user.email if user else user_data.get('email'),
+                user_id=user_data.get('id'),
+                user_email=user_data.get('email'),
                 user_role=user_data.get('type'),
                 ip_address=get_client_ip(request),
                 user_agent=request.META.get('HTTP_USER_AGENT', '')[:500],
                 request_path=request.path,
                 request_method=request.method,
                 description=f"Connexion administrateur ({user_data.get('type')}) : {user_data.get('email')}"
-            )
+            ))
         except Exception as e:
             logger.error(f"Erreur logging admin login: {e}")
-    
-    def _log_forbidden_access(self, request, response):
+
+    def _log_forbidden_access(self, request, response, user):
         """Log un accès interdit sur chemin sensible."""
         try:
-            user = request.user if request.user.is_authenticated else None
-            
-            AuditLog.objects.create(
+            audit_sink.write(AuditLog(
                 action=AuditLog.ActionType.LOGIN_FAILED,  # Ou créer une action dédiée
                 severity=AuditLog.Severity.HIGH,
-                user=user,
+                user_id=user.id if user else None,
                 user_email=user.email if user else 'Anonymous',
                 user_role=getattr(user, 'type', 'anonymous') if user else 'anonymous',
                 ip_address=get_client_ip(request),
                 user_agent=request.META.get('HTTP_USER_AGENT', '')[:500],
                 request_path=request.path,
                 request_method=request.method,
-                description=f"Accès interdit (403) sur ressource sensible par {user.email if user else 'Anonymous'}"
-            )
+                description=f"Accès interdit ({response.status_code}) sur ressource sensible par {user.email if user else 'Anonymous'}"
+            ))
         except Exception as e:
-            logger.error(f"Erreur logging forbidden access: {e}")
\ No newline at end of file
+            logger.error(f"Erreur logging forbidden access: {e}")
@@ -0,0 +1,60 @@
+# Generated by Django 5.2.6 on 2026-10-19 06:10
+
+from django.db import migrations, models
+
+from users.search import champs_recherche
+
+
+def remplir_recherche(apps, schema_editor):
+    CustomUser = apps.get_model('users', 'CustomUser')
+    lot = []
+    for user in CustomUser.objects.only('id', 'nom', 'prenom').iterator(chunk_size=2000):
+        for champ, valeur in champs_recherche(user.nom, user.prenom).items():
+            setattr(user, champ, valeur)
+        lot.append(user)
+        if len(lot) >= 2000:
+            CustomUser.objects.bulk_update(lot, ['nom_recherche', 'prenom_recherche'])
+            lot = []
+    if lot:
+        CustomUser.objects.bulk_update(lot, ['nom_recherche', 'prenom_recherche'])
+
+
+def creer_index_trigrammes(apps, schema_editor):
+    # Index GIN pg_trgm : PostgreSQL uniquement (SQLite garde les index B-tree de préfixe)
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+    for champ in ('nom_recherche', 'prenom_recherche'):
+        schema_editor.execute(
+            f'CREATE INDEX IF NOT EXISTS users_user_{champ}_trgm '
+            f'ON users_customuser USING gin ({champ} gin_trgm_ops)'
+        )
+
+
+def supprimer_index_trigrammes(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    for champ in ('nom_recherche', 'prenom_recherche'):
+        schema_editor.execute(f'DROP INDEX IF EXISTS users_user_{champ}_trgm')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0004_revokedtoken'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='customuser',
+            name='nom_recherche',
+            field=models.CharField(blank=True, db_index=True, editable=False, max_length=201),
+        ),
+        migrations.AddField(
+            model_name='customuser',
+            name='prenom_recherche',
+            field=models.CharField(blank=True, db_index=True, editable=False, max_length=201),
+        ),
+        migrations.RunPython(remplir_recherche, migrations.RunPython.noop),
+        migrations.RunPython(creer_index_trigrammes, supprimer_index_trigrammes),
+    ]
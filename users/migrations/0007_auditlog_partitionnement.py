@@ -0,0 +1,93 @@
+# Generated by Django 5.2.6 on 2026-10-19 10:15
+
+from dateutil.relativedelta import relativedelta
+from django.db import migrations
+from django.utils import timezone
+
+
+def partitionner(apps, schema_editor):
+    """
+    PostgreSQL uniquement : recrée users_auditlog en table partitionnée par mois
+    sur created_at, avec les mêmes colonnes, index et clés étrangères.
+    """
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+
+    from users.audit_partitions import DEFAUT, TABLE, creer_partition, debut_mois
+
+    ancienne = f'{TABLE}_avant_partition'
+    with schema_editor.connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT 1 FROM pg_partitioned_table p JOIN pg_class c ON c.oid = p.partrelid WHERE c.relname = %s",
+            [TABLE],
+        )
+        if cursor.fetchone():
+            return
+
+        # Définitions existantes, rejouées sur la nouvelle table
+        cursor.execute(
+            "SELECT indexname, indexdef FROM pg_indexes WHERE tablename = %s",
+            [TABLE],
+        )
+        index = [(nom, definition) for nom, definition in cursor.fetchall() if not nom.endswith('_pkey')]
+        cursor.execute(
+            "SELECT conname, pg_get_constraintdef(oid) FROM pg_constraint "
+            "WHERE conrelid = %s::regclass AND contype = 'f'",
+            [TABLE],
+        )
+        cles = cursor.fetchall()
+
+        # Colonne serial (anciennes bases) : la séquence suit la nouvelle table
+        cursor.execute("SELECT pg_get_serial_sequence(%s, 'id')", [TABLE])
+        sequence = cursor.fetchone()[0]
+        cursor.execute(
+            "SELECT attidentity FROM pg_attribute WHERE attrelid = %s::regclass AND attname = 'id'",
+            [TABLE],
+        )
+        identite = cursor.fetchone()[0] != ''
+
+        cursor.execute(f'ALTER TABLE "{TABLE}" RENAME TO "{ancienne}"')
+
+        cursor.execute(
+            f'CREATE TABLE "{TABLE}" (LIKE "{ancienne}" INCLUDING DEFAULTS INCLUDING IDENTITY) '
+            'PARTITION BY RANGE (created_at)'
+        )
+        # Une contrainte unique sur une table partitionnée doit inclure la clé de partition
+        cursor.execute(f'ALTER TABLE "{TABLE}" ADD PRIMARY KEY (id, created_at)')
+        if sequence and not identite:
+            cursor.execute(f'ALTER SEQUENCE {sequence} OWNED BY "{TABLE}".id')
+
+        cursor.execute(f'SELECT MIN(created_at), MAX(created_at) FROM "{ancienne}"')
+        premier, dernier = cursor.fetchone()
+        maintenant = timezone.now()
+        mois = debut_mois(premier or maintenant)
+        fin = debut_mois(max(dernier or maintenant, maintenant)) + relativedelta(months=3)
+        while mois <= fin:
+            creer_partition(mois, cursor)
+            mois += relativedelta(months=1)
+        cursor.execute(f'CREATE TABLE "{DEFAUT}" PARTITION OF "{TABLE}" DEFAULT')
+
+        cursor.execute(f'INSERT INTO "{TABLE}" SELECT * FROM "{ancienne}"')
+        cursor.execute(
+            f"SELECT setval(pg_get_serial_sequence('{TABLE}', 'id'), "
+            f'COALESCE((SELECT MAX(id) FROM "{TABLE}"), 0) + 1, false)'
+        )
+        cursor.execute(f'DROP TABLE "{ancienne}"')
+
+        # Index partitionnés (déclinés sur chaque partition) et clés étrangères, mêmes noms
+        for _, definition in index:
+            cursor.execute(definition)
+        for nom, definition in cles:
+            cursor.execute(f'ALTER TABLE "{TABLE}" ADD CONSTRAINT "{nom}" {definition}')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0006_auditlog_created_at_default'),
+    ]
+
+    operations = [
+        # Retour arrière sans effet : la table partitionnée reste compatible avec le modèle
+        migrations.RunPython(partitionner, migrations.RunPython.noop),
+    ]
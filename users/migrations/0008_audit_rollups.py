@@ -0,0 +1,83 @@
+# Generated by Django 5.2.6 on 2026-10-19 11:05
+
+from django.db import migrations, models
+from django.db.models import Count
+from django.db.models.functions import TruncDate
+
+
+def remplir_agregats(apps, schema_editor):
+    """Agrégats initiaux à partir des logs existants (une passe groupée)."""
+    AuditLog = apps.get_model('users', 'AuditLog')
+    AuditDailyStat = apps.get_model('users', 'AuditDailyStat')
+    AuditUserDailyStat = apps.get_model('users', 'AuditUserDailyStat')
+
+    logs = AuditLog.objects.annotate(jour=TruncDate('created_at'))
+    AuditDailyStat.objects.bulk_create(
+        [
+            AuditDailyStat(
+                university_id=row['university_id'] or 0, date=row['jour'],
+                action=row['action'], severity=row['severity'], count=row['n'],
+            )
+            for row in logs.values('university_id', 'jour', 'action', 'severity').annotate(n=Count('id')).order_by()
+        ],
+        batch_size=500,
+    )
+    AuditUserDailyStat.objects.bulk_create(
+        [
+            AuditUserDailyStat(
+                university_id=row['university_id'] or 0, date=row['jour'],
+                user_email=row['user_email'], user_role=row['user_role'], count=row['n'],
+            )
+            for row in logs.values('university_id', 'jour', 'user_email', 'user_role').annotate(n=Count('id')).order_by()
+        ],
+        batch_size=500,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0007_auditlog_partitionnement'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AuditDailyStat',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField()),
+                ('university_id', models.IntegerField(default=0)),
+                ('action', models.CharField(choices=[('MEMOIRE_CREATE', 'Création de mémoire'), ('MEMOIRE_UPDATE', 'Modification de mémoire'), ('MEMOIRE_DELETE', 'Suppression de mémoire'), ('MEMOIRE_DELETE_TOTAL', 'Suppression totale de mémoire'), ('USER_ROLE_UPDATE', 'Modification de rôle utilisateur'), ('USER_REMOVE', 'Retrait utilisateur université'), ('USER_DEACTIVATE', 'Désactivation compte'), ('USER_BULK_INVITE', 'Invitation en masse'), ('COMMENT_CREATE', 'Création commentaire'), ('COMMENT_MODERATE', 'Modération commentaire'), ('COMMENT_DELETE', 'Suppression commentaire'), ('SIGNALEMENT_TRAITE', 'Signalement traité'), ('UNIV_LOGO_UPDATE', 'Mise à jour logo'), ('UNIV_LOGO_DELETE', 'Suppression logo'), ('UNIV_BULK_DELETE', 'Suppression multiple universités'), ('UNIV_AFFILIATION_CREATE', 'Création affiliation'), ('DOMAINE_CREATE', 'Création domaine'), ('DOMAINE_UPDATE', 'Modification domaine'), ('DOMAINE_DELETE', 'Suppression domaine'), ('NEWS_CREATE', 'Création news'), ('NEWS_DELETE', 'Suppression news'), ('NEWS_DISSOCIATE', 'Dissociation news'), ('OLDSTUDENT_CREATE', 'Création ancien étudiant'), ('OLDSTUDENT_DELETE', 'Suppression ancien étudiant'), ('OLDSTUDENT_DISSOCIATE', 'Dissociation ancien étudiant'), ('ENCADREMENT_ADD', 'Ajout encadreur'), ('ENCADREMENT_REMOVE', 'Retrait encadreur'), ('LOGIN', 'Connexion'), ('LOGIN_FAILED', 'Échec connexion'), ('PASSWORD_RESET', 'Réinitialisation mot de passe')], max_length=30)),
+                ('severity', models.CharField(choices=[('LOW', 'Faible'), ('MEDIUM', 'Moyenne'), ('HIGH', 'Élevée'), ('CRITICAL', 'Critique')], max_length=10)),
+                ('count', models.PositiveIntegerField(default=0)),
+            ],
+            options={
+                'verbose_name': "Statistique d'audit journalière",
+                'verbose_name_plural': "Statistiques d'audit journalières",
+            },
+        ),
+        migrations.CreateModel(
+            name='AuditUserDailyStat',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField()),
+                ('university_id', models.IntegerField(default=0)),
+                ('user_email', models.EmailField(blank=True, max_length=254)),
+                ('user_role', models.CharField(blank=True, max_length=20)),
+                ('count', models.PositiveIntegerField(default=0)),
+            ],
+            options={
+                'verbose_name': "Activité d'audit journalière par utilisateur",
+                'verbose_name_plural': "Activités d'audit journalières par utilisateur",
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='auditdailystat',
+            constraint=models.UniqueConstraint(fields=('university_id', 'date', 'action', 'severity'), name='users_auditdailystat_unique'),
+        ),
+        migrations.AddConstraint(
+            model_name='audituserdailystat',
+            constraint=models.UniqueConstraint(fields=('university_id', 'date', 'user_email', 'user_role'), name='users_audituserdailystat_unique'),
+        ),
+        migrations.RunPython(remplir_agregats, migrations.RunPython.noop),
+    ]
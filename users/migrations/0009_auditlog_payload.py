@@ -0,0 +1,23 @@
+# Generated by Django 5.2.6 on 2026-10-19 11:40
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0008_audit_rollups'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='auditlog',
+            name='payload_format',
+            field=models.CharField(default='full', editable=False, max_length=5, verbose_name='Format des données'),
+        ),
+        migrations.AddField(
+            model_name='auditlog',
+            name='payload_zlib',
+            field=models.BinaryField(blank=True, editable=False, null=True, verbose_name='Données compressées'),
+        ),
+    ]
@@ -0,0 +1,29 @@
+# Generated by Django 5.2.6 on 2026-10-19 12:20
+
+from django.db import migrations, models
+from django.db.models.functions import Lower, Trim
+
+
+def remplir_email_norm(apps, schema_editor):
+    AuditLog = apps.get_model('users', 'AuditLog')
+    AuditLog.objects.exclude(user_email='').update(user_email_norm=Lower(Trim('user_email')))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0009_auditlog_payload'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='auditlog',
+            name='user_email_norm',
+            field=models.CharField(blank=True, editable=False, max_length=254, verbose_name='Email normalisé'),
+        ),
+        migrations.RunPython(remplir_email_norm, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='auditlog',
+            index=models.Index(fields=['university', 'user_email_norm', 'created_at'], name='users_audit_univ_email_idx'),
+        ),
+    ]
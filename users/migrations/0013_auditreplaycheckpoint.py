@@ -0,0 +1,25 @@
+# Generated by Django 5.2.6 on 2026-10-19 18:05
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0012_customuser_email_lower'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AuditReplayCheckpoint',
+            fields=[
+                ('path', models.CharField(max_length=255, primary_key=True, serialize=False)),
+                ('offset', models.BigIntegerField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'verbose_name': "Reprise de rejeu d'audit",
+                'verbose_name_plural': "Reprises de rejeu d'audit",
+            },
+        ),
+    ]
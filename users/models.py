@@ -1,11 +1,13 @@
 # users/models.py
 import logging
 from django.db import models
+from django.db.models.functions import Lower
 from django.contrib.auth.models import AbstractBaseUser, PermissionsMixin
 from django.utils import timezone
-from django.contrib.auth.hashers import make_password
+from django.contrib.auth.hashers import UNUSABLE_PASSWORD_PREFIX, make_password
 from django.core.validators import RegexValidator
 from .managers import CustomUserManager
+from .search import champs_recherche
 
 logger = logging.getLogger(__name__)
 
@@ -42,6 +44,9 @@ class CustomUser(AbstractBaseUser, PermissionsMixin):
     is_staff = models.BooleanField(default=False)
     is_active = models.BooleanField(default=True)
     date_joined = models.DateTimeField(default=timezone.now)
+    # Texte normalisé pour la recherche (users/search.py), tenu à jour par save()
+    nom_recherche = models.CharField(max_length=201, blank=True, editable=False, db_index=True)
+    prenom_recherche = models.CharField(max_length=201, blank=True, editable=False, db_index=True)
 
     objects = CustomUserManager()
     USERNAME_FIELD = 'email'
@@ -50,10 +55,21 @@ class CustomUser(AbstractBaseUser, PermissionsMixin):
     class Meta:
         verbose_name = "Utilisateur"
         verbose_name_plural = "Utilisateurs"
+        indexes = [
+            # Préfixe d'email insensible à la casse (users/search.py)
+            models.Index(Lower('email'), name='users_user_email_lower_idx'),
+        ]
 
     def save(self, *args, **kwargs):
-        if not self.password.startswith('pbkdf2_'):
+        # Mot de passe inutilisable (« ! », comptes importés) : ne pas le hacher
+        if not self.password.startswith(('pbkdf2_', UNUSABLE_PASSWORD_PREFIX)):
             self.password = make_password(self.password)
+        champs = champs_recherche(self.nom, self.prenom)
+        for champ, valeur in champs.items():
+            setattr(self, champ, valeur)
+        update_fields = kwargs.get("update_fields")
+        if update_fields is not None and {"nom", "prenom"} & set(update_fields):
+            kwargs["update_fields"] = set(update_fields) | set(champs)
         super().save(*args, **kwargs)
     def get_full_name(self):
         return f"{self.prenom} {self.nom}" 
@@ -74,6 +90,7 @@ class AuditLog(models.Model):
         USER_REMOVE = 'USER_REMOVE', 'Retrait utilisateur université'
         USER_DEACTIVATE = 'USER_DEACTIVATE', 'Désactivation compte'
         USER_BULK_INVITE = 'USER_BULK_INVITE', 'Invitation en masse'
+        COMMENT_CREATE = 'COMMENT_CREATE', 'Création commentaire'
         COMMENT_MODERATE = 'COMMENT_MODERATE', 'Modération commentaire'
         COMMENT_DELETE = 'COMMENT_DELETE', 'Suppression commentaire'
         SIGNALEMENT_TRAITE = 'SIGNALEMENT_TRAITE', 'Signalement traité'
@@ -107,6 +124,8 @@ class AuditLog(models.Model):
     # On stocke juste les infos en dur
     user_id = models.IntegerField(null=True, blank=True, verbose_name='ID Utilisateur')
     user_email = models.EmailField(blank=True, verbose_name='Email utilisateur')
+    # Email en minuscules, rempli à l'insertion : filtres exacts / par préfixe indexés
+    user_email_norm = models.CharField(max_length=254, blank=True, editable=False, verbose_name='Email normalisé')
     user_role = models.CharField(max_length=20, blank=True, verbose_name='Rôle utilisateur')
     
     action = models.CharField(max_length=30, choices=ActionType.choices, verbose_name='Type d\'action')
@@ -127,13 +146,18 @@ class AuditLog(models.Model):
     
     previous_data = models.JSONField(null=True, blank=True, verbose_name='Données avant action')
     new_data = models.JSONField(null=True, blank=True, verbose_name='Données après action')
+    # "diff" : seules les clés modifiées, "snap" : instantané complet (base de reconstruction) ;
+    # payload_zlib : les deux côtés compressés (users/audit_payload.py)
+    payload_format = models.CharField(max_length=5, default='full', editable=False, verbose_name='Format des données')
+    payload_zlib = models.BinaryField(null=True, blank=True, editable=False, verbose_name='Données compressées')
     
     ip_address = models.GenericIPAddressField(null=True, blank=True, verbose_name='Adresse IP')
     user_agent = models.TextField(blank=True, verbose_name='User Agent')
     request_path = models.TextField(blank=True, verbose_name='Chemin de la requête')
     request_method = models.CharField(max_length=10, blank=True, verbose_name='Méthode HTTP')
     description = models.TextField(blank=True, verbose_name='Description détaillée')
-    created_at = models.DateTimeField(auto_now_add=True, verbose_name='Date de l\'action')
+    # Fixé à l'enregistrement de l'action, pas à l'insertion différée (users.audit_sink)
+    created_at = models.DateTimeField(default=timezone.now, editable=False, verbose_name='Date de l\'action')
     
     class Meta:
         ordering = ['-created_at']
@@ -146,6 +170,7 @@ class AuditLog(models.Model):
             models.Index(fields=['severity', 'created_at']),
             models.Index(fields=['target_type', 'target_id']),
             models.Index(fields=['created_at']),
+            models.Index(fields=['university', 'user_email_norm', 'created_at'], name='users_audit_univ_email_idx'),
         ]
     
     def __str__(self):
@@ -206,4 +231,105 @@ class InvitationCode(models.Model):
         try:
             return CustomUser.objects.get(id=self.used_by_id)
         except CustomUser.DoesNotExist:
-            return None
\ No newline at end of file
+            return None
+
+
+# ========== RÉVOCATION JWT (liste de refus des JTI) ==========
+
+class RevokedToken(models.Model):
+    """
+    JTI révoqués (rotation de refresh, déconnexion). Une ligne n'est utile que
+    jusqu'à l'expiration du jeton : purge_revoked_tokens supprime le reste.
+    """
+    jti = models.CharField(max_length=255, unique=True)
+    expires_at = models.DateTimeField(db_index=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        verbose_name = 'Jeton révoqué'
+        verbose_name_plural = 'Jetons révoqués'
+
+    def __str__(self):
+        return f"{self.jti} (expire le {self.expires_at:%d/%m/%Y %H:%M})"
+
+
+class RateLimitCounter(models.Model):
+    """
+    Compteurs de limitation de débit quand le cache n'a pas d'incrément
+    atomique (file, db) : incrémentés par INSERT … ON CONFLICT (users/throttling.py).
+    """
+    key = models.CharField(max_length=255, primary_key=True)
+    count = models.PositiveIntegerField(default=0)
+    expires_at = models.DateTimeField(db_index=True)
+
+    class Meta:
+        verbose_name = 'Compteur de limitation'
+        verbose_name_plural = 'Compteurs de limitation'
+
+    def __str__(self):
+        return f"{self.key} = {self.count}"
+
+
+class AuditReplayCheckpoint(models.Model):
+    """
+    Progression du rejeu d'un fichier de secours d'audit (users/audit_sink.py) :
+    octets déjà réinsérés, mis à jour dans la transaction de chaque lot.
+    """
+    path = models.CharField(max_length=255, primary_key=True)
+    offset = models.BigIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        verbose_name = 'Reprise de rejeu d\'audit'
+        verbose_name_plural = 'Reprises de rejeu d\'audit'
+
+    def __str__(self):
+        return f"{self.path} @ {self.offset}"
+
+
+class AuditDailyStat(models.Model):
+    """
+    Agrégat journalier du journal d'audit (jour × université × action × sévérité),
+    tenu à jour à chaque insertion de logs (users/audit_rollups.py).
+    university_id = 0 : logs sans université (une clé unique ne peut contenir NULL).
+    """
+    date = models.DateField()
+    university_id = models.IntegerField(default=0)
+    action = models.CharField(max_length=30, choices=AuditLog.ActionType.choices)
+    severity = models.CharField(max_length=10, choices=AuditLog.Severity.choices)
+    count = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        verbose_name = 'Statistique d\'audit journalière'
+        verbose_name_plural = 'Statistiques d\'audit journalières'
+        constraints = [
+            models.UniqueConstraint(
+                fields=['university_id', 'date', 'action', 'severity'],
+                name='users_auditdailystat_unique',
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.date} univ={self.university_id} {self.action}/{self.severity} : {self.count}"
+
+
+class AuditUserDailyStat(models.Model):
+    """Nombre d'actions par utilisateur, par jour et par université (top utilisateurs)."""
+    date = models.DateField()
+    university_id = models.IntegerField(default=0)
+    user_email = models.EmailField(blank=True)
+    user_role = models.CharField(max_length=20, blank=True)
+    count = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        verbose_name = 'Activité d\'audit journalière par utilisateur'
+        verbose_name_plural = 'Activités d\'audit journalières par utilisateur'
+        constraints = [
+            models.UniqueConstraint(
+                fields=['university_id', 'date', 'user_email', 'user_role'],
+                name='users_audituserdailystat_unique',
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.date} univ={self.university_id} {self.user_email or 'Système'} : {self.count}"
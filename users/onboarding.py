@@ -0,0 +1,258 @@
+# users/onboarding.py
+"""
+Inscription en masse des membres d'une université à partir d'un CSV.
+
+Colonnes : email, nom, prenom, sexe (M/F/A), role (optionnel, « standard » par
+défaut), password (optionnel).
+
+  - mots de passe fournis : soumis à AUTH_PASSWORD_VALIDATORS (ligne rejetée
+    sinon), puis hachés (PBKDF2, ~100 ms CPU chacun) dans un pool
+    de threads (pbkdf2_hmac libère le GIL ; pas de fork d'un worker gunicorn
+    multi-thread), hors du thread de la requête ;
+  - sans mot de passe : compte créé sans mot de passe utilisable, l'email
+    d'invitation contient un lien de définition (uid + jeton de réinitialisation) ;
+  - utilisateurs et rôles (université + universités mères) créés par
+    bulk_create ; les comptes déjà existants (email comparé sans la casse)
+    reçoivent seulement les rôles ;
+  - emails envoyés après le commit, dans un thread, sur une seule connexion SMTP.
+"""
+import csv
+import io
+import logging
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.password_validation import validate_password
+from django.contrib.auth.tokens import PasswordResetTokenGenerator
+from django.core.exceptions import ValidationError
+from django.core.mail import EmailMessage, get_connection
+from django.core.validators import validate_email
+from django.db import transaction
+from django.db.models.functions import Lower
+from django.template.loader import render_to_string
+from django.utils.encoding import force_bytes
+from django.utils.http import urlsafe_base64_encode
+
+from universites.models import RoleUniversite
+from universites.resolver import universites_meres
+from universites.roles import invalidate_users_roles
+from users.search import champs_recherche
+
+User = get_user_model()
+logger = logging.getLogger(__name__)
+
+BATCH_SIZE = 1000
+MAX_LIGNES = getattr(settings, "MEMBER_IMPORT_MAX_ROWS", 5000)
+# En dessous, le démarrage d'un pool coûte plus qu'il ne rapporte
+SEUIL_POOL = 20
+
+_ROLES = {code for code, _ in RoleUniversite.ROLE_CHOICES}
+_SEXES = {code for code, _ in User.Sexe.choices}
+
+
+# ---------- Lecture / validation ----------
+def lire_csv(fichier, max_lignes=MAX_LIGNES):
+    """
+    Renvoie (lignes valides, erreurs). fichier : bytes, str ou fichier binaire ;
+    max_lignes=None : pas de limite (commande import_members).
+    Chaque erreur : {"ligne": n, "erreurs": {...}} (n = numéro de ligne du CSV).
+    """
+    if hasattr(fichier, "read"):
+        fichier = fichier.read()
+    if isinstance(fichier, bytes):
+        fichier = fichier.decode("utf-8-sig")
+    lecteur = csv.DictReader(io.StringIO(fichier))
+    if not lecteur.fieldnames or not {"email", "nom", "prenom", "sexe"} <= {
+        (nom or "").strip().lower() for nom in lecteur.fieldnames
+    }:
+        raise ValidationError("Colonnes requises : email, nom, prenom, sexe.")
+
+    lignes, erreurs, vus = [], [], set()
+    for numero, brute in enumerate(lecteur, start=2):
+        if max_lignes is not None and numero - 1 > max_lignes:
+            raise ValidationError(f"Au plus {max_lignes} lignes par import.")
+        ligne = {(cle or "").strip().lower(): (valeur or "").strip() for cle, valeur in brute.items()}
+        ligne["email"] = User.objects.normalize_email(ligne.get("email", "")).lower()
+        ligne["role"] = ligne.get("role") or "standard"
+        ligne["sexe"] = ligne.get("sexe", "").upper()
+
+        probleme = {}
+        try:
+            validate_email(ligne["email"])
+        except ValidationError:
+            probleme["email"] = "Adresse invalide."
+        if ligne["email"] in vus:
+            probleme["email"] = "Adresse en double dans le fichier."
+        for champ in ("nom", "prenom"):
+            if not ligne.get(champ):
+                probleme[champ] = "Champ obligatoire."
+        if ligne["sexe"] not in _SEXES:
+            probleme["sexe"] = f"Valeurs acceptées : {', '.join(sorted(_SEXES))}."
+        if ligne["role"] not in _ROLES:
+            probleme["role"] = f"Valeurs acceptées : {', '.join(sorted(_ROLES))}."
+        if ligne.get("password"):
+            # Mêmes validateurs que l'inscription et SetPasswordView
+            try:
+                validate_password(ligne["password"], user=User(
+                    email=ligne["email"], nom=ligne.get("nom", ""), prenom=ligne.get("prenom", ""),
+                ))
+            except ValidationError as e:
+                probleme["password"] = " ".join(e.messages)
+
+        if probleme:
+            erreurs.append({"ligne": numero, "erreurs": probleme})
+        else:
+            vus.add(ligne["email"])
+            lignes.append(ligne)
+    return lignes, erreurs
+
+
+# ---------- Hachage ----------
+def _hacher_lot(mots_de_passe):
+    return [make_password(mdp) for mdp in mots_de_passe]
+
+
+def hacher(mots_de_passe, workers=None):
+    """make_password en parallèle ; ordre des résultats = ordre d'entrée."""
+    workers = workers or os.cpu_count() or 1
+    if len(mots_de_passe) < SEUIL_POOL or workers == 1:
+        return [make_password(mdp) for mdp in mots_de_passe]
+    taille = max(len(mots_de_passe) // (workers * 4), 1)
+    lots = [mots_de_passe[i:i + taille] for i in range(0, len(mots_de_passe), taille)]
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="hachage") as pool:
+        return [h for lot in pool.map(_hacher_lot, lots) for h in lot]
+
+
+# ---------- Import ----------
+def _par_email(emails):
+    """
+    Utilisateurs dont l'email, en minuscules, figure dans emails (déjà en
+    minuscules, cf. lire_csv) : les emails sont conservés tels que saisis,
+    l'index fonctionnel users_user_email_lower_idx sert la recherche.
+    """
+    for i in range(0, len(emails), BATCH_SIZE):
+        yield from User.objects.annotate(email_minuscule=Lower("email")).filter(
+            email_minuscule__in=emails[i:i + BATCH_SIZE]
+        )
+
+
+def importer_membres(universite, lignes, envoyer_emails=True, workers=None, auteur=None,
+                     emails_en_arriere_plan=True):
+    """
+    Crée comptes et rôles pour les lignes validées par lire_csv().
+    emails_en_arriere_plan=False : envoi bloquant (commande, le processus se termine ensuite).
+    Renvoie {"crees", "existants", "roles_crees", "invitations"}.
+    """
+    # Clé : email en minuscules ; un compte existant ne reçoit que les rôles
+    existants = {user.email_minuscule: user.pk for user in _par_email([ligne["email"] for ligne in lignes])}
+    nouvelles = [ligne for ligne in lignes if ligne["email"] not in existants]
+
+    # Hachage hors transaction : aucun verrou tenu pendant le calcul
+    avec_mdp = [ligne for ligne in nouvelles if ligne.get("password")]
+    for ligne, hache in zip(avec_mdp, hacher([l["password"] for l in avec_mdp], workers)):
+        ligne["hache"] = hache
+
+    cibles = [universite] + list(universites_meres(universite))
+    with transaction.atomic():
+        User.objects.bulk_create(
+            [
+                User(
+                    email=ligne["email"],
+                    nom=ligne["nom"],
+                    prenom=ligne["prenom"],
+                    sexe=ligne["sexe"],
+                    # "!…" : mot de passe inutilisable, défini via le lien d'invitation
+                    password=ligne.get("hache") or make_password(None),
+                    is_active=True,
+                    **champs_recherche(ligne["nom"], ligne["prenom"]),
+                )
+                for ligne in nouvelles
+            ],
+            batch_size=BATCH_SIZE,
+        )
+        nouveaux_emails = [ligne["email"] for ligne in nouvelles]
+        crees = list(_par_email(nouveaux_emails))
+        ids = dict(existants)
+        ids.update((user.email_minuscule, user.pk) for user in crees)
+
+        roles = [
+            RoleUniversite(utilisateur_id=ids[ligne["email"]], universite=univ, role=ligne["role"])
+            for ligne in lignes
+            for univ in cibles
+        ]
+        avant = RoleUniversite.objects.filter(universite__in=cibles).count()
+        # Rôle déjà présent (membre existant) : conservé tel quel
+        RoleUniversite.objects.bulk_create(roles, batch_size=BATCH_SIZE, ignore_conflicts=True)
+        roles_crees = RoleUniversite.objects.filter(universite__in=cibles).count() - avant
+
+        # bulk_create ne déclenche pas les signaux : invalidation explicite des cartes de rôles
+        user_ids = list(ids.values())
+        transaction.on_commit(lambda: invalidate_users_roles(user_ids))
+
+        invitations = 0
+        if envoyer_emails and nouvelles:
+            a_inviter = crees
+            invitations = len(a_inviter)
+            transaction.on_commit(
+                lambda: envoyer_invitations(universite, a_inviter, emails_en_arriere_plan)
+            )
+
+    logger.info(
+        f"Import de {len(lignes)} membres dans {universite.slug} "
+        f"({len(nouvelles)} créés) par {auteur or 'commande'}"
+    )
+    return {
+        "crees": len(nouvelles),
+        "existants": len(existants),
+        "roles_crees": roles_crees,
+        "invitations": invitations,
+    }
+
+
+# ---------- Emails ----------
+def _message_invitation(universite, user, generateur):
+    uid = urlsafe_base64_encode(force_bytes(user.pk))
+    if user.has_usable_password():
+        url = f"{settings.FRONTEND_URL}/login"
+    else:
+        token = generateur.make_token(user)
+        url = f"{settings.FRONTEND_URL}/definir-mot-de-passe.html?uid={uid}&token={token}"
+    html = render_to_string(
+        "emails/invite_user_preset_role.html",
+        {"invite_url": url, "verification_url": url, "univ": universite, "user": user},
+    )
+    message = EmailMessage(
+        subject=f"Votre compte {universite.nom} est prêt",
+        body=html,
+        from_email=settings.DEFAULT_FROM_EMAIL,
+        to=[user.email],
+    )
+    message.content_subtype = "html"
+    return message
+
+
+def _envoyer(universite, users):
+    generateur = PasswordResetTokenGenerator()
+    envoyes = 0
+    try:
+        with get_connection() as connexion:
+            for i in range(0, len(users), 100):
+                messages = [_message_invitation(universite, u, generateur) for u in users[i:i + 100]]
+                envoyes += connexion.send_messages(messages) or 0
+    except Exception as e:
+        logger.error(f"Envoi des invitations {universite.slug} interrompu après {envoyes} emails : {e}")
+        return
+    logger.info(f"{envoyes} invitations envoyées pour {universite.slug}")
+
+
+def envoyer_invitations(universite, users, background=True):
+    """Emails d'invitation sur une seule connexion SMTP, dans un thread par défaut."""
+    if not background:
+        return _envoyer(universite, users)
+    thread = threading.Thread(target=_envoyer, args=(universite, users), daemon=True)
+    thread.start()
+    return thread
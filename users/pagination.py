@@ -0,0 +1,89 @@
+# users/pagination.py
+"""
+Pagination du journal d'audit sans COUNT(*) exact ni OFFSET.
+
+  - AuditLogCursorPagination : keyset sur (created_at, id), coût constant
+    quelle que soit la profondeur ; ?ordering=created_at pour l'ordre croissant ;
+  - estimer_nombre : estimation du planificateur (PostgreSQL, EXPLAIN) ou
+    comptage plafonné (autres moteurs) ; exact en dessous de SEUIL_EXACT ;
+  - EstimatedCountPaginator : même estimation pour l'admin Django.
+"""
+import json
+from collections import OrderedDict
+
+from django.core.paginator import Paginator
+from django.db import connections
+from django.utils.functional import cached_property
+from rest_framework import pagination
+from rest_framework.response import Response
+
+SEUIL_EXACT = 1000
+
+
+def estimer_nombre(queryset):
+    """
+    (nombre, exact). Au-delà de SEUIL_EXACT lignes : estimation PostgreSQL
+    (« Plan Rows » d'EXPLAIN), ou SEUIL_EXACT + 1 avec exact=False ailleurs.
+    """
+    queryset = queryset.order_by()
+    # Comptage borné : SELECT COUNT(*) FROM (… LIMIT n)
+    borne = queryset[:SEUIL_EXACT + 1].count()
+    if borne <= SEUIL_EXACT:
+        return borne, True
+
+    connexion = connections[queryset.db]
+    if connexion.vendor == "postgresql":
+        sql, params = queryset.query.sql_with_params()
+        with connexion.cursor() as cursor:
+            cursor.execute(f"EXPLAIN (FORMAT JSON) {sql}", params)
+            plan = cursor.fetchone()[0]
+        if isinstance(plan, str):
+            plan = json.loads(plan)
+        return max(int(plan[0]["Plan"]["Plan Rows"]), borne), False
+    return borne, False
+
+
+class AuditLogCursorPagination(pagination.CursorPagination):
+    page_size = 50
+    page_size_query_param = "page_size"
+    max_page_size = 200
+    ordering = ("-created_at", "-id")
+
+    def get_ordering(self, request, queryset, view):
+        if request.query_params.get("ordering") == "created_at":
+            return ("created_at", "id")
+        return self.ordering
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.count, self.count_is_exact = estimer_nombre(queryset)
+        return super().paginate_queryset(queryset, request, view)
+
+    def get_paginated_response(self, data):
+        return Response(OrderedDict([
+            ("count", self.count),
+            ("count_is_estimate", not self.count_is_exact),
+            ("next", self.get_next_link()),
+            ("previous", self.get_previous_link()),
+            ("results", data),
+        ]))
+
+    def get_paginated_response_schema(self, schema):
+        schema = super().get_paginated_response_schema(schema)
+        schema["properties"]["count"] = {"type": "integer", "example": 123}
+        schema["properties"]["count_is_estimate"] = {"type": "boolean"}
+        return schema
+
+
+class EstimatedCountPaginator(Paginator):
+    """
+    Paginator de l'admin : nombre estimé au-delà de SEUIL_EXACT lignes sous
+    PostgreSQL. Ailleurs (pas d'estimation), comptage exact pour garder
+    toutes les pages accessibles.
+    """
+
+    @cached_property
+    def count(self):
+        # Pas d'estimation hors PostgreSQL : le comptage plafonné serait un COUNT de plus
+        if connections[self.object_list.db].vendor != "postgresql":
+            return super().count
+        return estimer_nombre(self.object_list)[0]
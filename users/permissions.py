@@ -1,6 +1,8 @@
 from rest_framework import permissions
 from django.contrib.auth import get_user_model
 
+from universites.roles import ADMIN_ROLES, has_role
+
 User = get_user_model()
 
 
@@ -23,11 +25,10 @@ class HasRoleInUniversite(permissions.BasePermission):
             "universite_id"
         )  # Récupération de l'ID de l'université
         if universite_id:
-            return obj.universites.filter(
-                id=universite_id,
-                roles__utilisateur=request.user,
-                roles__role__in=self.role_list,
-            ).exists()
+            return (
+                has_role(request.user, self.role_list, universite_id=universite_id)
+                and obj.universites.filter(id=universite_id).exists()
+            )
         return False
 
 
@@ -43,11 +44,10 @@ class IsAdminInUniversite(permissions.BasePermission):
     def has_object_permission(self, request, view, obj):
         universite_id = view.kwargs.get("universite_id")
         if universite_id:
-            return obj.universites.filter(
-                id=universite_id,
-                roles__utilisateur=request.user,
-                roles__role__in=self.role_list,
-            ).exists()
+            return (
+                has_role(request.user, self.role_list, universite_id=universite_id)
+                and obj.universites.filter(id=universite_id).exists()
+            )
         return False
 
 
@@ -63,11 +63,10 @@ class IsSuperAdminInUniversite(permissions.BasePermission):
     def has_object_permission(self, request, view, obj):
         universite_id = view.kwargs.get("universite_id")
         if universite_id:
-            return obj.universites.filter(
-                id=universite_id,
-                roles__utilisateur=request.user,
-                roles__role__in=self.role_list,
-            ).exists()
+            return (
+                has_role(request.user, self.role_list, universite_id=universite_id)
+                and obj.universites.filter(id=universite_id).exists()
+            )
         return False
 
 
@@ -85,13 +84,12 @@ class IsAuteurOrAdminInUniversite(permissions.BasePermission):
             # Écriture : auteur OU admin d'une université liée
             if request.method in permissions.SAFE_METHODS:
                 return True
-            if obj.auteur == request.user:
+            if obj.auteur_id == request.user.pk:
                 return True
-            return obj.universites.filter(
-                id=universite_id,
-                roles__utilisateur=request.user,
-                roles__role__in=["admin", "superadmin", "bigboss"],
-            ).exists()
+            return (
+                has_role(request.user, ADMIN_ROLES, universite_id=universite_id)
+                and obj.universites.filter(id=universite_id).exists()
+            )
         return False
 class IsAdminInUniversite(permissions.BasePermission):
     """
@@ -106,10 +104,11 @@ class IsAdminInUniversite(permissions.BasePermission):
         universite_slug = view.kwargs.get('univ_slug')
         if universite_slug:
             # Vérifie que l'utilisateur a le rôle admin pour cette université
-            return obj.universites.filter(
-                slug=universite_slug,
-                roles__utilisateur=request.user,
-                roles__role__in=['admin', 'superadmin', 'bigboss']
-            ).exists()
+            if not has_role(request.user, ADMIN_ROLES, slug=universite_slug):
+                return False
+            # Objets liés à plusieurs universités (M2M) ou à une seule (AuditLog.university)
+            if hasattr(obj, 'universites'):
+                return obj.universites.filter(slug=universite_slug).exists()
+            return getattr(obj, 'university', None) is not None and obj.university.slug == universite_slug
             
         return False
\ No newline at end of file
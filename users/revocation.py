@@ -0,0 +1,90 @@
+# users/revocation.py
+"""
+Révocation des JWT par liste de refus des JTI.
+
+Contrairement à token_blacklist (OutstandingToken pour chaque jeton émis), seuls
+les jetons révoqués sont stockés, et uniquement jusqu'à leur expiration :
+  - cache partagé : jwt:revoked:<jti> → 1 (révoqué) / 0 (valide), TTL = durée
+    de vie restante du jeton ;
+  - base (RevokedToken) : source de vérité si le cache a perdu la clé,
+    purgée par `manage.py purge_revoked_tokens`.
+"""
+from datetime import datetime, timezone as dt_timezone
+
+from django.core.cache import cache
+from django.utils import timezone
+from django.utils.translation import gettext_lazy as _
+from rest_framework_simplejwt.exceptions import TokenError
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.tokens import AccessToken
+
+from users.models import RevokedToken
+
+
+def _key(jti):
+    return f"jwt:revoked:{jti}"
+
+
+def _ttl(expires_at):
+    return max(int((expires_at - timezone.now()).total_seconds()), 1)
+
+
+def revoke(jti, expires_at):
+    """Révoque un JTI jusqu'à `expires_at` (datetime aware). Idempotent."""
+    if expires_at <= timezone.now():
+        return  # déjà expiré : rien à retenir
+    RevokedToken.objects.bulk_create(
+        [RevokedToken(jti=jti, expires_at=expires_at)], ignore_conflicts=True
+    )
+    cache.set(_key(jti), 1, _ttl(expires_at))
+
+
+def is_revoked(jti, expires_at=None):
+    """O(1) : une lecture cache, une requête indexée seulement si la clé manque."""
+    state = cache.get(_key(jti))
+    if state is None:
+        state = int(RevokedToken.objects.filter(jti=jti).exists())
+        if expires_at is not None:
+            # Négatif mis en cache aussi ; add() pour ne jamais écraser un revoke() concurrent
+            cache.add(_key(jti), state, _ttl(expires_at))
+    return bool(state)
+
+
+def purge_expired(batch_size=5000):
+    """Supprime les lignes expirées par lots ; renvoie le nombre supprimé."""
+    total = 0
+    now = timezone.now()
+    while True:
+        ids = list(
+            RevokedToken.objects.filter(expires_at__lt=now).values_list("id", flat=True)[:batch_size]
+        )
+        if not ids:
+            return total
+        total += RevokedToken.objects.filter(id__in=ids).delete()[0]
+
+
+class DenylistMixin:
+    """
+    À combiner avec un Token simplejwt : même API que BlacklistMixin
+    (verify / blacklist / outstand), utilisée telle quelle par
+    TokenRefreshSerializer lors de la rotation.
+    """
+
+    def _expires_at(self):
+        return datetime.fromtimestamp(self.payload["exp"], tz=dt_timezone.utc)
+
+    def verify(self, *args, **kwargs):
+        super().verify(*args, **kwargs)
+        if is_revoked(self.payload[api_settings.JTI_CLAIM], self._expires_at()):
+            raise TokenError(_("Token is blacklisted"))
+
+    def blacklist(self):
+        revoke(self.payload[api_settings.JTI_CLAIM], self._expires_at())
+
+    def outstand(self):
+        # Rien à enregistrer : seuls les jetons révoqués sont stockés
+        return None
+
+
+class DenylistAccessToken(DenylistMixin, AccessToken):
+    pass
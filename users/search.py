@@ -0,0 +1,89 @@
+# users/search.py
+"""
+Recherche de membres (autocomplétion, annuaire).
+
+Les colonnes CustomUser.nom_recherche (« nom prénom ») et prenom_recherche
+(« prénom nom ») contiennent le texte normalisé (minuscules, sans accents) :
+  - SQLite / tous moteurs : recherche par préfixe en intervalle
+    (col >= q AND col < q + U+FFFF), servie par l'index B-tree ;
+  - PostgreSQL : index GIN pg_trgm en plus (migration 0005), pour les
+    sous-chaînes (LIKE '%q%') et le classement par similarité.
+L'email est conservé tel que saisi : le préfixe porte sur LOWER(email),
+servi par l'index fonctionnel users_user_email_lower_idx.
+Le filtrage par université passe par un EXISTS sur RoleUniversite : pas de
+jointure multipliant les lignes, donc pas de DISTINCT.
+"""
+import unicodedata
+
+from django.db import connection
+from django.db.models import Case, Exists, IntegerField, OuterRef, Q, Value, When
+from django.db.models.functions import Lower
+
+PREFIX_MAX = "\uffff"
+
+
+def normaliser(texte):
+    """« Élodie  N'Guessan » → « elodie n'guessan »."""
+    texte = unicodedata.normalize("NFKD", texte or "")
+    texte = "".join(c for c in texte if not unicodedata.combining(c))
+    return " ".join(texte.lower().split())
+
+
+def champs_recherche(nom, prenom):
+    """Valeurs des colonnes de recherche pour un utilisateur."""
+    nom, prenom = normaliser(nom), normaliser(prenom)
+    return {
+        "nom_recherche": f"{nom} {prenom}".strip(),
+        "prenom_recherche": f"{prenom} {nom}".strip(),
+    }
+
+
+def _prefixe(champ, q):
+    return Q(**{f"{champ}__gte": q, f"{champ}__lt": q + PREFIX_MAX})
+
+
+def membres_de(queryset, universite):
+    """Restreint un queryset d'utilisateurs aux membres de l'université."""
+    from universites.models import RoleUniversite
+
+    return queryset.filter(
+        Exists(RoleUniversite.objects.filter(universite=universite, utilisateur=OuterRef("pk")))
+    )
+
+
+def rechercher(queryset, q):
+    """
+    Filtre et classe par pertinence :
+    0 nom exact, 1 préfixe du nom, 2 préfixe du prénom, 3 préfixe de l'email,
+    4 (PostgreSQL) sous-chaîne, départagée par similarité trigramme.
+    None si la requête normalisée fait moins de 2 caractères.
+    """
+    q = normaliser(q)
+    if len(q) < 2:
+        return None
+
+    conditions = (
+        _prefixe("nom_recherche", q)
+        | _prefixe("prenom_recherche", q)
+        | _prefixe("email_minuscule", q)
+    )
+    postgres = connection.vendor == "postgresql"
+    if postgres:
+        # LIKE '%q%' servi par l'index GIN gin_trgm_ops
+        conditions |= Q(nom_recherche__contains=q)
+
+    rang = Case(
+        When(Q(nom_recherche=q) | Q(prenom_recherche=q), then=Value(0)),
+        When(_prefixe("nom_recherche", q), then=Value(1)),
+        When(_prefixe("prenom_recherche", q), then=Value(2)),
+        When(_prefixe("email_minuscule", q), then=Value(3)),
+        default=Value(4),
+        output_field=IntegerField(),
+    )
+    qs = queryset.annotate(email_minuscule=Lower("email")).filter(conditions).annotate(rang=rang)
+    if postgres:
+        from django.contrib.postgres.search import TrigramWordSimilarity
+
+        qs = qs.annotate(similarite=TrigramWordSimilarity(q, "nom_recherche"))
+        return qs.order_by("rang", "-similarite", "nom_recherche", "id")
+    return qs.order_by("rang", "nom_recherche", "id")
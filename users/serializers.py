@@ -4,6 +4,7 @@ from django.contrib.auth import get_user_model, authenticate
 from django.core.exceptions import ValidationError
 from django.contrib.auth.password_validation import validate_password
 from django.utils.translation import gettext_lazy as _
+from universites.roles import get_role_map, has_role
 
 User = get_user_model()
 
@@ -39,13 +40,22 @@ class UserSerializer(serializers.ModelSerializer):
         request = self.context.get("request")
         if request and request.user != instance:
             # garder l'email visible aux membres de la même université
-            same_univ = instance.roles_univ.filter(
-                universite__slug=request.user.roles_univ.first().universite.slug
-            ).exists()
-            if not same_univ:
+            if not self._meme_universite(request.user, instance):
                 rep.pop("email", None)
         return rep
 
+    def _meme_universite(self, user, instance):
+        # Liste scopée par université (context["universite_id"]) : tous les
+        # membres listés la partagent, seul le demandeur est vérifié (0 requête
+        # si sa carte de rôles est en cache)
+        universite_id = self.context.get("universite_id")
+        if universite_id is not None:
+            return has_role(user, universite_id=universite_id)
+        mes_universites = set(get_role_map(user).universite_ids())
+        return bool(mes_universites) and bool(
+            mes_universites & set(get_role_map(instance).universite_ids())
+        )
+
 
 # -------------------- Inscription (double password) --------------------
 class RegisterSerializer(serializers.ModelSerializer):
@@ -109,6 +119,11 @@ class LoginSerializer(serializers.Serializer):
         return attrs
 
 
+# -------------------- Déconnexion (révocation JWT) --------------------
+class LogoutSerializer(serializers.Serializer):
+    refresh = serializers.CharField()
+
+
 # -------------------- Changement de mot de passe --------------------
 class ChangePasswordSerializer(serializers.Serializer):
     old_password = serializers.CharField(required=True)
@@ -297,6 +312,31 @@ class ResetPasswordConfirmSerializer(serializers.Serializer):
             )
         return attrs
 
+class SetPasswordSerializer(serializers.Serializer):
+    """Définition du premier mot de passe (comptes importés en masse)."""
+    uidb64 = serializers.CharField()
+    token = serializers.CharField()
+    password1 = serializers.CharField(
+        write_only=True, style={"input_type": "password"}, validators=[validate_password]
+    )
+    password2 = serializers.CharField(
+        write_only=True, style={"input_type": "password"}
+    )
+
+    def validate(self, attrs):
+        if attrs["password1"] != attrs["password2"]:
+            raise serializers.ValidationError(
+                {"password2": "Les mots de passe ne correspondent pas."}
+            )
+        return attrs
+
+
+class MemberImportSerializer(serializers.Serializer):
+    """CSV : email, nom, prenom, sexe[, role][, password] (cf. users/onboarding.py)."""
+    fichier = serializers.FileField()
+    envoyer_emails = serializers.BooleanField(default=True)
+
+
 # dans la même app que UserSerializer
 class RegisterViaUniversiteSerializer2(RegisterSerializer):
     universite_slug = serializers.SlugField(write_only=True)
@@ -376,6 +416,8 @@ class AuditLogDetailSerializer(serializers.ModelSerializer):
     user_name = serializers.SerializerMethodField()
     user_info = serializers.SerializerMethodField()  # Nouveau champ enrichi
     university_name = serializers.CharField(source='university.nom', read_only=True, default=None)
+    previous_data = serializers.SerializerMethodField()
+    new_data = serializers.SerializerMethodField()
     
     class Meta:
         model = AuditLog
@@ -386,7 +428,7 @@ class AuditLogDetailSerializer(serializers.ModelSerializer):
             'user_id', 'user_email', 'user_name', 'user_role', 'user_info',
             'university', 'university_name',
             'target_type', 'target_id', 'target_repr',
-            'previous_data', 'new_data',
+            'payload_format', 'previous_data', 'new_data',
             'description',
             'ip_address', 'user_agent', 'request_path', 'request_method',
         ]
@@ -398,6 +440,20 @@ class AuditLogDetailSerializer(serializers.ModelSerializer):
             return obj.user_email
         return "Système"
     
+    def _donnees(self, obj):
+        # Diff stocké, ou états complets reconstruits si context["reconstruire"]
+        if not hasattr(obj, '_donnees_audit'):
+            from .audit_payload import contenu, reconstruire
+            lire = reconstruire if self.context.get('reconstruire') else contenu
+            obj._donnees_audit = lire(obj)
+        return obj._donnees_audit
+    
+    def get_previous_data(self, obj):
+        return self._donnees(obj)[0]
+    
+    def get_new_data(self, obj):
+        return self._donnees(obj)[1]
+    
     def get_user_info(self, obj):
         """
         Retourne les infos utilisateur enrichies.
@@ -478,6 +534,8 @@ class AuditLogSerializer(serializers.ModelSerializer):
     severity_display = serializers.CharField(source='get_severity_display', read_only=True)
     user_name = serializers.SerializerMethodField()
     university_name = serializers.CharField(source='university.nom', read_only=True, default=None)
+    previous_data = serializers.SerializerMethodField()
+    new_data = serializers.SerializerMethodField()
     
     class Meta:
         model = AuditLog
@@ -494,4 +552,9 @@ class AuditLogSerializer(serializers.ModelSerializer):
         # CORRECTION: Pas de obj.user
         if obj.user_email:
             return obj.user_email
-        return None
\ No newline at end of file
+        return None
+    
+    # Payload compressé ou diff : même lecture que le détail (context["reconstruire"])
+    _donnees = AuditLogDetailSerializer._donnees
+    get_previous_data = AuditLogDetailSerializer.get_previous_data
+    get_new_data = AuditLogDetailSerializer.get_new_data
\ No newline at end of file
@@ -0,0 +1,175 @@
+# users/throttling.py
+"""
+Limitation de débit partagée entre workers.
+
+Compteur à fenêtre glissante (deux fenêtres fixes pondérées) : une
+incrémentation atomique par requête, sans liste d'horodatages à
+relire/réécrire comme SimpleRateThrottle.
+  - cache Redis (INCR) ou LocMem (verrou, un seul processus) : compteurs
+    dans le cache ;
+  - autres backends (file, db) : leur incr() est un get + set, perdu sous
+    concurrence ; les compteurs vont dans la table RateLimitCounter,
+    incrémentés par INSERT … ON CONFLICT DO UPDATE … RETURNING.
+
+Usage déclaratif sur une vue DRF :
+
+    class LoginView(GenericAPIView):
+        throttle_scope = "login"      # taux dans DEFAULT_THROTTLE_RATES
+"""
+import math
+import random
+import time
+from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone as dt_timezone
+
+from django.core.cache import DEFAULT_CACHE_ALIAS, cache, caches
+from django.core.cache.backends.locmem import LocMemCache
+from django.core.cache.backends.redis import RedisCache
+from django.db import connection
+from rest_framework.settings import api_settings
+from rest_framework.throttling import BaseThrottle
+
+_PERIODES = {"s": 1, "m": 60, "h": 3600, "d": 86400}
+
+
+def parse_rate(rate):
+    """
+    "5/min" → (5, 60) ; "5/15m" → (5, 900). Même syntaxe que DRF, avec un
+    multiplicateur optionnel devant l'unité. None → (None, None).
+    """
+    if rate is None:
+        return None, None
+    num, period = rate.split("/")
+    multiple = "".join(c for c in period if c.isdigit())
+    unite = period[len(multiple):][:1]
+    return int(num), int(multiple or 1) * _PERIODES[unite]
+
+
+# Part des hits qui purgent les compteurs expirés de la table
+PURGE_PROBABILITE = 0.01
+
+
+def incr_atomique():
+    """Le cache par défaut a-t-il un incr() atomique ? (Redis, django-redis, LocMem)"""
+    backend = caches[DEFAULT_CACHE_ALIAS]
+    return isinstance(backend, (RedisCache, LocMemCache)) or "redis" in type(backend).__module__
+
+
+def _table():
+    from users.models import RateLimitCounter
+
+    return RateLimitCounter
+
+
+def _incr_table(key, timeout):
+    """Incrément atomique d'un compteur de la table ; renvoie la nouvelle valeur."""
+    model = _table()
+    qn = connection.ops.quote_name
+    table = qn(model._meta.db_table)
+    now = datetime.now(dt_timezone.utc)
+    with connection.cursor() as cursor:
+        if random.random() < PURGE_PROBABILITE:
+            model.objects.filter(expires_at__lt=now)._raw_delete(model.objects.db)
+        cursor.execute(
+            f"INSERT INTO {table} ({qn('key')}, {qn('count')}, {qn('expires_at')}) VALUES (%s, 1, %s) "
+            f"ON CONFLICT ({qn('key')}) DO UPDATE SET {qn('count')} = {table}.{qn('count')} + 1 "
+            f"RETURNING {qn('count')}",
+            [key, now + timedelta(seconds=timeout)],
+        )
+        return cursor.fetchone()[0]
+
+
+@dataclass
+class Decision:
+    allowed: bool
+    count: float
+    limit: int
+    retry_after: int
+
+
+class SlidingWindowLimiter:
+    """limit requêtes par window secondes et par identifiant, dans un scope."""
+
+    def __init__(self, scope, limit, window):
+        self.scope = scope
+        self.limit = limit
+        self.window = window
+
+    def _keys(self, ident, now):
+        slot = int(now // self.window)
+        prefix = f"rl:{self.scope}:{ident}"
+        return f"{prefix}:{slot}", f"{prefix}:{slot - 1}", slot
+
+    def _estimate(self, current, previous, now, slot):
+        # Part de la fenêtre précédente encore couverte par la fenêtre glissante
+        elapsed = now - slot * self.window
+        return previous * (1 - elapsed / self.window) + current
+
+    def _retry_after(self, now, slot):
+        # Fin de la fenêtre courante : borne simple, le client peut réessayer avant
+        return max(math.ceil((slot + 1) * self.window - now), 1)
+
+    def hit(self, ident):
+        """Compte une requête ; allowed=False si la limite est dépassée."""
+        now = time.time()
+        current_key, previous_key, slot = self._keys(ident, now)
+        if incr_atomique():
+            # add() crée la clé sans écraser un compteur concurrent, puis incr() atomique
+            cache.add(current_key, 0, self.window * 2)
+            try:
+                current = cache.incr(current_key)
+            except ValueError:
+                # Clé expirée/évincée entre add() et incr()
+                cache.add(current_key, 1, self.window * 2)
+                current = 1
+            previous = cache.get(previous_key, 0)
+        else:
+            current = _incr_table(current_key, self.window * 2)
+            previous = (
+                _table().objects.filter(key=previous_key).values_list("count", flat=True).first() or 0
+            )
+        count = self._estimate(current, previous, now, slot)
+        allowed = count <= self.limit
+        return Decision(
+            allowed=allowed,
+            count=count,
+            limit=self.limit,
+            retry_after=0 if allowed else self._retry_after(now, slot),
+        )
+
+    def reset(self, ident):
+        now = time.time()
+        current_key, previous_key, _ = self._keys(ident, now)
+        if incr_atomique():
+            cache.delete_many([current_key, previous_key])
+        else:
+            _table().objects.filter(key__in=[current_key, previous_key]).delete()
+
+
+class ScopedSlidingWindowThrottle(BaseThrottle):
+    """
+    Throttle DRF par `throttle_scope` de la vue (classe ou @action(throttle_scope=...)).
+    Identifiant : utilisateur authentifié, sinon IP (NUM_PROXIES respecté).
+    Les méthodes sûres (GET/HEAD/OPTIONS) ne sont pas limitées.
+    """
+
+    def allow_request(self, request, view):
+        self.decision = None
+        scope = getattr(view, "throttle_scope", None)
+        if not scope or request.method in ("GET", "HEAD", "OPTIONS"):
+            return True
+        limit, window = parse_rate(api_settings.DEFAULT_THROTTLE_RATES.get(scope))
+        if limit is None:
+            return True
+
+        user = getattr(request, "user", None)
+        if user is not None and user.is_authenticated:
+            ident = f"user:{user.pk}"
+        else:
+            ident = f"ip:{self.get_ident(request)}"
+
+        self.decision = SlidingWindowLimiter(scope, limit, window).hit(ident)
+        return self.decision.allowed
+
+    def wait(self):
+        return self.decision.retry_after if self.decision else None
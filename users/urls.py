@@ -6,6 +6,8 @@ from .views import (
     UpdateRoleView,
     VerifyEmailView,
     LoginView,
+    TokenRefreshRolesView,
+    LogoutView,
     ProfileView,
     ChangePasswordView,
     ResetPasswordRequestView,
@@ -18,6 +20,8 @@ from .views import (
     UniversiteUsersListView,
     UniversiteUserAddView,
     UniversiteInviteUserView,
+    UniversiteMembersImportView,
+    SetPasswordView,
     JoinWithCodeView,
     UniversiteUserRemoveView,
     UniversiteUserRoleUpdateView,
@@ -49,6 +53,8 @@ urlpatterns = [
     path("register/", RegisterView.as_view(), name="register"),
     path("verify-email/", VerifyEmailView.as_view(), name="verify-email"),
     path("login/", LoginView.as_view(), name="login"),
+    path("token/refresh/", TokenRefreshRolesView.as_view(), name="token-refresh"),
+    path("logout/", LogoutView.as_view(), name="logout"),
     path("profile/", ProfileView.as_view(), name="profile"),
     path("change-password/", ChangePasswordView.as_view(), name="change-password"),
     path(
@@ -61,6 +67,7 @@ urlpatterns = [
         ResetPasswordConfirmView.as_view(),
         name="reset-password-confirm",
     ),
+    path("set-password/", SetPasswordView.as_view(), name="set-password"),
     path("users/search/", GetUserByEmailView.as_view(), name="user-by-email"),
     path("users/<int:pk>/role/", RoleUpdateView.as_view(), name="user-role-update"),
     path("users/deactivate/", DeactivateAccountView.as_view(), name="user-deactivate"),
@@ -83,6 +90,12 @@ urlpatterns = [
     ),
         path('<slug:univ_slug>/users/profile/<int:pk>/', UserProfileView.as_view(), name='user-profile'),
 
+    # 2 bis. Import CSV en masse
+    path(
+        "<slug:univ_slug>/users/import/",
+        UniversiteMembersImportView.as_view(),
+        name="univ-users-import",
+    ),
     # 3.  Inviter un nouvel utilisateur (code chiffré + rôle prédéfini)
     path(
         "<slug:univ_slug>/users/invite/",
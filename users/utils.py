@@ -25,72 +25,32 @@ def send_verification_email(to_email: str, verification_url: str):
 # users/signals.py
 from django.db.models.signals import post_save
 from django.dispatch import receiver
-from django.core.mail import mail_admins
-from django.conf import settings
+from .audit_alerts import alert_dispatcher
 from .models import AuditLog
 
 
 @receiver(post_save, sender=AuditLog)
 def alert_critical_action(sender, instance, created, **kwargs):
     """
-    Envoie une alerte email pour toute action CRITICAL.
+    Alerte pour toute action CRITICAL enregistrée par save() (le chemin
+    normal, bulk_create_audit_logs, signale ses lots directement) : envoi
+    hors requête et regroupé, cf. users/audit_alerts.py.
     """
     if not created:
         return
-    
-    if instance.severity != AuditLog.Severity.CRITICAL:
-        return
-    
-    # Construire le message
-    subject = f'🚨 [CRITIQUE] {instance.get_action_display()} - {instance.user_email or "Système"}'
-    
-    message = f"""
-ACTION CRITIQUE DÉTECTÉE
-========================
 
-Action      : {instance.get_action_display()}
-Sévérité    : {instance.get_severity_display()}
-Date        : {instance.created_at}
-Utilisateur : {instance.user_email or 'Système'} (Rôle: {instance.user_role or 'N/A'})
-Université  : {instance.university.nom if instance.university else 'N/A'}
-IP          : {instance.ip_address or 'N/A'}
+    alert_dispatcher.signaler([instance])
 
-Cible       : [{instance.target_type}] {instance.target_repr}
 
-Description :
-{instance.description or 'Aucune description'}
-
-Données avant :
-{instance.previous_data or 'N/A'}
-
-Données après :
-{instance.new_data or 'N/A'}
-
----
-Ce message est automatique. Consultez l'admin Django pour plus de détails.
-{settings.ADMIN_URL if hasattr(settings, 'ADMIN_URL') else '/admin/'}
-"""
-    
-    # Envoyer aux admins
-    try:
-        mail_admins(
-            subject=subject,
-            message=message,
-            fail_silently=True
-        )
-    except Exception as e:
-        # Ne pas bloquer si l'email échoue
-        import logging
-        logger = logging.getLogger(__name__)
-        logger.error(f"Échec envoi alerte critique: {e}")
 # users/audit_utils.py
 import json
 from functools import wraps
-from django.db import models
+from django.db import models, transaction
 from django.http import HttpRequest
 from django.shortcuts import get_object_or_404
 from .models import AuditLog, CustomUser
 from universites.models import Universite
+from universites.resolver import get_universite
 
 
 def get_client_ip(request: HttpRequest) -> str:
@@ -124,8 +84,13 @@ def serialize_instance(instance: models.Model) -> dict:
                 }
             elif hasattr(value, 'url'):
                 data[field.name] = str(value)
+            elif value is None or isinstance(value, (bool, int, float)):
+                data[field.name] = value
+            elif hasattr(value, 'isoformat'):
+                data[field.name] = value.isoformat()
             else:
-                data[field.name] = str(value)[:500] if value is not None else ''
+                # Textes longs : tronqués ou hachés à l'insertion (users/audit_payload.py)
+                data[field.name] = str(value)
                 
         except Exception as e:
             data[field.name] = f'[Erreur: {str(e)}]'
@@ -149,7 +114,37 @@ def create_audit_log(
     request=None,
     **extra_fields
 ):
-    """Crée un log d'audit sans ForeignKey problématique."""
+    """
+    Enregistre un log d'audit sans ForeignKey problématique. L'insertion est
+    différée (users.audit_sink) : l'instance renvoyée n'a pas encore de pk.
+    """
+    from .audit_sink import audit_sink
+
+    log = build_audit_log(
+        action, severity, user=user, university=university, target=target,
+        target_type=target_type, target_id=target_id, target_repr=target_repr,
+        previous_data=previous_data, new_data=new_data, description=description,
+        request=request, **extra_fields
+    )
+    return audit_sink.write(log)
+
+
+def build_audit_log(
+    action,
+    severity,
+    user=None,
+    university=None,
+    target=None,
+    target_type=None,
+    target_id=None,
+    target_repr=None,
+    previous_data=None,
+    new_data=None,
+    description=None,
+    request=None,
+    **extra_fields
+):
+    """Même chose que create_audit_log, sans enregistrement (pour audit_sink.write_many)."""
     log_data = {
         'action': action,
         'severity': severity,
@@ -187,7 +182,30 @@ def create_audit_log(
     
     log_data.update(extra_fields)
     
-    return AuditLog.objects.create(**log_data)
+    return AuditLog(**log_data)
+
+
+def bulk_create_audit_logs(logs):
+    """
+    Insère un lot de logs en une requête (bulk_create ne déclenche pas post_save) :
+    les actions CRITICAL du lot sont confiées au répartiteur d'alertes.
+    Insertion immédiate (avec les agrégats, users/audit_rollups.py) : les vues
+    passent par audit_sink.write_many.
+    """
+    from .audit_payload import preparer_lot
+    from .audit_rollups import enregistrer
+
+    # Diff avant/après (instantanés périodiques), textes longs, compression : cf. users/audit_payload.py
+    logs = preparer_lot(list(logs))
+    for log in logs:
+        log.user_email_norm = (log.user_email or '').strip().lower()
+    with transaction.atomic():
+        logs = AuditLog.objects.bulk_create(logs)
+        # Agrégats du tableau de bord, dans la même transaction que les logs
+        enregistrer(logs)
+    # Toutes les actions CRITICAL du lot : regroupées par le répartiteur
+    alert_dispatcher.signaler(logs)
+    return logs
 
 class AuditMixin:
     """
@@ -225,10 +243,7 @@ class AuditMixin:
         if not hasattr(self, '_cached_university'):
             slug = self.get_univ_slug_from_url()
             if slug:
-                try:
-                    self._cached_university = get_object_or_404(Universite, slug=slug)
-                except Exception:
-                    self._cached_university = None
+                self._cached_university = get_universite(slug, getattr(self, 'request', None))
             else:
                 self._cached_university = None
         return self._cached_university
@@ -335,10 +350,7 @@ def audit_log(
             # Récupération auto de l'université depuis l'URL
             university = None
             if with_university and 'univ_slug' in kwargs:
-                try:
-                    university = Universite.objects.get(slug=kwargs['univ_slug'])
-                except Universite.DoesNotExist:
-                    pass
+                university = get_universite(kwargs['univ_slug'], request)
             
             # Récupération de la cible si fournie
             target = None
@@ -11,25 +11,41 @@ from django.conf import settings
 from django.core.mail import send_mail, EmailMessage
 from django.template.loader import render_to_string
 from django.shortcuts import get_object_or_404
-from django.core.cache import cache
 from django.utils.decorators import method_decorator
 from django.views.decorators.cache import never_cache
 from django.views.decorators.vary import vary_on_cookie
 from universites.models import Universite, RoleUniversite
+from universites.roles import ADMIN_ROLES, has_role
+from universites.resolver import get_universite_or_404
+from universites.stats import stats_membres
 from users.models import InvitationCode
 from users.permissions import IsAdminInUniversite
 from django.http import HttpResponse
-from django.db.models import Count, Q
+from django.db.models import Count, Q, TextField
+from django.db.models.functions import Cast
 import csv
-from rest_framework import generics, status, permissions, filters, viewsets
+from rest_framework import generics, status, permissions, filters, viewsets, pagination
 from rest_framework.generics import GenericAPIView
 from rest_framework.response import Response
-from rest_framework_simplejwt.tokens import RefreshToken
+from rest_framework_simplejwt.views import TokenRefreshView
+from rest_framework_simplejwt.exceptions import TokenError
+from users.authentication import RoleClaimsRefreshToken, RoleClaimsTokenRefreshSerializer
+from users.revocation import DenylistAccessToken
+from users.throttling import SlidingWindowLimiter
+from users.exports import Column, StreamingExport
+from users.search import membres_de, rechercher
+from users.onboarding import importer_membres, lire_csv
+from users.utils import create_audit_log
+from users.models import AuditLog
+from django.core.exceptions import ValidationError as DjangoValidationError
 from memoires.models import Memoire
 from .serializers import (
     RegisterSerializer,
     UserSerializer,
     LoginSerializer,
+    LogoutSerializer,
+    MemberImportSerializer,
+    SetPasswordSerializer,
     ChangePasswordSerializer,
     RegisterViaUniversiteSerializer2,
     ResetPasswordRequestSerializer,
@@ -54,6 +70,7 @@ logger = logging.getLogger(__name__)
 class RegisterView(generics.CreateAPIView):
     serializer_class = RegisterSerializer
     permission_classes = [permissions.AllowAny]
+    throttle_scope = "register"
 
     def perform_create(self, serializer):
         user = serializer.save()
@@ -82,6 +99,7 @@ class RegisterViaUniversiteView(generics.CreateAPIView):
 
     serializer_class = RegisterViaUniversiteSerializer
     permission_classes = [permissions.AllowAny]
+    throttle_scope = "register"
 
     def perform_create(self, serializer):
         user = serializer.save()
@@ -144,6 +162,7 @@ import ipaddress
 class LoginView(generics.GenericAPIView):
     serializer_class = LoginSerializer
     permission_classes = [permissions.AllowAny]
+    throttle_scope = "login"
 
     def get_client_ip(self, request):
         """
@@ -173,23 +192,24 @@ class LoginView(generics.GenericAPIView):
                 status=status.HTTP_400_BAD_REQUEST,
             )
 
-        # Rate limiting
-        cache_key = f"login_attempt_{ip}"
-        attempts = cache.get(cache_key, 0)
-        
-        if attempts >= 5:
+        # Verrouillage après échecs : chaque tentative est comptée atomiquement,
+        # un succès remet le compteur à zéro
+        failures = SlidingWindowLimiter(
+            "login_failures", settings.LOGIN_MAX_FAILURES, settings.LOGIN_FAILURE_WINDOW
+        )
+        decision = failures.hit(ip)
+        if not decision.allowed:
             logger.warning(f"Too many login attempts from {ip}")
             return Response(
                 {"detail": f"Too many attempts, please try again later."},
                 status=status.HTTP_429_TOO_MANY_REQUESTS,
+                headers={"Retry-After": str(decision.retry_after)},
             )
 
         # Validation credentials
         serializer = self.get_serializer(data=request.data)
         
         if not serializer.is_valid():
-            # Incrémente le compteur SEULEMENT en cas d'échec
-            cache.set(cache_key, attempts + 1, timeout=300)  # 5 minutes
             return Response(
                 serializer.errors,
                 status=status.HTTP_400_BAD_REQUEST,
@@ -198,10 +218,10 @@ class LoginView(generics.GenericAPIView):
         user = serializer.validated_data["user"]
         
         # Succès : reset du compteur
-        cache.delete(cache_key)
+        failures.reset(ip)
         
         # Génération JWT
-        refresh = RefreshToken.for_user(user)
+        refresh = RoleClaimsRefreshToken.for_user(user)
         logger.info(f"Successful login for {user.email} from {ip}")
 
         return Response({
@@ -210,6 +230,31 @@ class LoginView(generics.GenericAPIView):
             "user": UserSerializer(user).data,
         })
 
+class TokenRefreshRolesView(TokenRefreshView):
+    """POST /api/auth/token/refresh/ — rotation du refresh token, rôles ré-embarqués."""
+    serializer_class = RoleClaimsTokenRefreshSerializer
+
+
+class LogoutView(GenericAPIView):
+    """
+    POST /api/auth/logout/ {"refresh": "..."}
+    Révoque le refresh token et, si présent, l'access token de la requête.
+    """
+    permission_classes = [permissions.AllowAny]
+    serializer_class = LogoutSerializer
+
+    def post(self, request, *args, **kwargs):
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        try:
+            RoleClaimsRefreshToken(serializer.validated_data["refresh"]).blacklist()
+        except TokenError:
+            pass  # déjà expiré ou révoqué : la déconnexion reste un succès
+        if isinstance(request.auth, DenylistAccessToken):
+            request.auth.blacklist()
+        return Response(status=status.HTTP_205_RESET_CONTENT)
+
+
 # -------------------- Profil personnel --------------------
 class ProfileView(generics.RetrieveUpdateAPIView):
     serializer_class = UserSerializer
@@ -244,6 +289,7 @@ class ChangePasswordView(GenericAPIView):
 class ResetPasswordRequestView(GenericAPIView):
     serializer_class = ResetPasswordRequestSerializer
     permission_classes = [permissions.AllowAny]
+    throttle_scope = "password_reset"
 
     def post(self, request, *args, **kwargs):
         serializer = self.get_serializer(data=request.data)
@@ -363,7 +409,7 @@ class UserProfileView(generics.RetrieveAPIView):
 
     def get(self, request, univ_slug, *args, **kwargs):
         # Récupérer l'université par son slug
-        universite = get_object_or_404(Universite, slug=univ_slug)
+        universite = get_universite_or_404(univ_slug, request)
 
         # Obtenir les informations de l'utilisateur
         user_id = kwargs.get('pk')
@@ -452,7 +498,7 @@ class UniversiteUsersListView(generics.ListAPIView):
     ordering_fields = ["date_joined", "nom"]
 
     def get_queryset(self):
-        univ = get_object_or_404(Universite, slug=self.kwargs["univ_slug"])
+        univ = get_universite_or_404(self.kwargs["univ_slug"], self.request)
         return User.objects.filter(roles_univ__universite=univ).distinct()
 
 class UniversiteUserAddView(GenericAPIView):
@@ -467,10 +513,10 @@ class UniversiteUserAddView(GenericAPIView):
         role = serializer.validated_data.get("role", "standard")
 
         user = get_object_or_404(User, email=email)
-        univ = get_object_or_404(Universite, slug=kwargs["univ_slug"])
+        univ = get_universite_or_404(kwargs["univ_slug"], request)
 
         # Vérifie que l'utilisateur requérant le changement a bien le rôle admin dans cette université
-        if not univ.roles.filter(utilisateur=request.user, role__in=['admin', 'superadmin', 'bigboss']).exists():
+        if not has_role(request.user, ADMIN_ROLES, universite_id=univ.id):
             return Response({"detail": "Vous n'avez pas les droits nécessaires."}, status=status.HTTP_403_FORBIDDEN)
 
         obj, created = RoleUniversite.objects.get_or_create(
@@ -483,9 +529,75 @@ class UniversiteUserAddView(GenericAPIView):
         return Response({"detail": "Membre ajouté."}, status=status.HTTP_201_CREATED)
 
 
+class UniversiteMembersImportView(GenericAPIView):
+    """
+    POST /api/auth/<slug>/users/import/  (multipart : fichier, envoyer_emails)
+    Inscription en masse depuis un CSV ; les lignes invalides sont ignorées
+    et renvoyées dans « erreurs » (cf. users/onboarding.py).
+    """
+    permission_classes = [IsAdminInUniversite]
+    throttle_scope = "invitations"
+    serializer_class = MemberImportSerializer
+
+    def post(self, request, *args, **kwargs):
+        univ = get_universite_or_404(kwargs["univ_slug"], request)
+        if not has_role(request.user, ADMIN_ROLES, universite_id=univ.id):
+            return Response({"detail": "Vous n'avez pas les droits nécessaires."}, status=status.HTTP_403_FORBIDDEN)
+
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        try:
+            lignes, erreurs = lire_csv(serializer.validated_data["fichier"])
+        except (DjangoValidationError, UnicodeDecodeError) as e:
+            message = e.messages[0] if isinstance(e, DjangoValidationError) else "Fichier non UTF-8."
+            return Response({"fichier": message}, status=status.HTTP_400_BAD_REQUEST)
+
+        rapport = importer_membres(
+            univ, lignes,
+            envoyer_emails=serializer.validated_data["envoyer_emails"],
+            auteur=request.user.email,
+        )
+        create_audit_log(
+            action=AuditLog.ActionType.USER_BULK_INVITE,
+            severity=AuditLog.Severity.MEDIUM,
+            user=request.user,
+            university=univ,
+            new_data=rapport,
+            request=request,
+            description=f"Import CSV de {len(lignes)} membres dans {univ.nom}",
+        )
+        return Response({**rapport, "erreurs": erreurs}, status=status.HTTP_201_CREATED)
+
+
+class SetPasswordView(GenericAPIView):
+    """
+    POST /api/auth/set-password/ {uidb64, token, password1, password2}
+    Premier mot de passe d'un compte importé (lien de l'email d'invitation).
+    """
+    permission_classes = [permissions.AllowAny]
+    throttle_scope = "password_reset"
+    serializer_class = SetPasswordSerializer
+
+    def post(self, request, *args, **kwargs):
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        data = serializer.validated_data
+        try:
+            user = User.objects.get(pk=force_str(urlsafe_base64_decode(data["uidb64"])))
+        except (ValueError, OverflowError, User.DoesNotExist):
+            return Response({"detail": "Lien invalide."}, status=status.HTTP_400_BAD_REQUEST)
+        if not PasswordResetTokenGenerator().check_token(user, data["token"]):
+            return Response({"detail": "Lien invalide ou expiré."}, status=status.HTTP_400_BAD_REQUEST)
+
+        user.set_password(data["password1"])
+        user.save(update_fields=["password"])
+        return Response({"detail": "Mot de passe défini."})
+
+
 # users/views.py
 class UniversiteInviteUserView(GenericAPIView):
     permission_classes = [IsAdminInUniversite]  # Vérifie que l'utilisateur est admin
+    throttle_scope = "invitations"
     serializer_class = InviteUserSerializer
 
     def post(self, request, *args, **kwargs):
@@ -494,10 +606,10 @@ class UniversiteInviteUserView(GenericAPIView):
 
         email = serializer.validated_data["email"]
         role = serializer.validated_data.get("role", "standard")
-        univ = get_object_or_404(Universite, slug=kwargs["univ_slug"])
+        univ = get_universite_or_404(kwargs["univ_slug"], request)
 
         # Vérifie que l'utilisateur requérant l'invitation a bien le rôle admin dans cette université
-        if not univ.roles.filter(utilisateur=request.user, role__in=['admin', 'superadmin', 'bigboss']).exists():
+        if not has_role(request.user, ADMIN_ROLES, universite_id=univ.id):
             return Response({"detail": "Vous n'avez pas les droits nécessaires."}, status=status.HTTP_403_FORBIDDEN)
 
         # Créez le code d'invitation
@@ -532,6 +644,7 @@ class UniversiteInviteUserView(GenericAPIView):
 # users/views.py
 class JoinWithCodeView(GenericAPIView):
     permission_classes = [permissions.AllowAny]
+    throttle_scope = "register"
     serializer_class = JoinWithCodeSerializer  # Ajout du sérialiseur
 
     def post(self, request, *args, **kwargs):
@@ -622,7 +735,7 @@ class UniversiteUserRemoveView(GenericAPIView):
 
     def delete(self, request, *args, **kwargs):
         user_id = kwargs["user_id"]
-        univ = get_object_or_404(Universite, slug=kwargs["univ_slug"])
+        univ = get_universite_or_404(kwargs["univ_slug"], request)
         role_obj = get_object_or_404(
             RoleUniversite, utilisateur_id=user_id, universite=univ
         )
@@ -639,7 +752,7 @@ class UniversiteUserRoleUpdateView(GenericAPIView):
         serializer.is_valid(raise_exception=True)
 
         new_role = serializer.validated_data["role"]
-        univ = get_object_or_404(Universite, slug=kwargs["univ_slug"])
+        univ = get_universite_or_404(kwargs["univ_slug"], request)
         role_obj = get_object_or_404(
             RoleUniversite, utilisateur_id=kwargs["user_id"], universite=univ
         )
@@ -651,31 +764,27 @@ class UniversiteUserRoleUpdateView(GenericAPIView):
         return Response({"detail": "Rôle mis à jour."}, status=status.HTTP_200_OK)
 
 
+MEMBRES_EXPORT_COLUMNS = [
+    Column("id", "ID"),
+    Column("nom", "Nom", field="utilisateur__nom"),
+    Column("prenom", "Prénom", field="utilisateur__prenom"),
+    Column("email", "Email", field="utilisateur__email"),
+    Column("role", "Rôle"),
+    Column("date_arrivee", "Date d’arrivée", field="created_at", format=lambda d: d.date()),
+]
+
+
 class UniversiteUsersExportCSVView(generics.GenericAPIView):
     permission_classes = [IsAdminInUniversite]
     serializer_class = RoleSerializer
 
     def get(self, request, *args, **kwargs):
-        univ = get_object_or_404(Universite, slug=kwargs["univ_slug"])
-        users = User.objects.filter(roles_univ__universite=univ).distinct()
-        response = HttpResponse(content_type="text/csv")
-        response["Content-Disposition"] = (
-            f'attachment; filename="{univ.slug}_membres.csv"'
-        )
-        writer = csv.writer(response)
-        writer.writerow(["Nom", "Prénom", "Email", "Rôle", "Date d’arrivée"])
-        for u in users:
-            role = u.roles_univ.filter(universite=univ).first()
-            writer.writerow(
-                [
-                    u.nom,
-                    u.prenom,
-                    u.email,
-                    role.role if role else "",
-                    role.created_at.date() if role else "",
-                ]
-            )
-        return response
+        univ = get_universite_or_404(kwargs["univ_slug"], request)
+        # Une ligne de rôle par membre (unique_together) : pas de requête par ligne
+        roles = RoleUniversite.objects.filter(universite=univ)
+        return StreamingExport(
+            roles, MEMBRES_EXPORT_COLUMNS, filename=f"{univ.slug}_membres"
+        ).response(request)
 
 
 class UniversiteTopContribView(generics.GenericAPIView):
@@ -683,7 +792,7 @@ class UniversiteTopContribView(generics.GenericAPIView):
     def get(self, request, *args, **kwargs):
         from interactions.models import Telechargement
 
-        univ = get_object_or_404(Universite, slug=kwargs["univ_slug"])
+        univ = get_universite_or_404(kwargs["univ_slug"], request)
         data = (
             User.objects.filter(memoires__universites=univ)
             .annotate(
@@ -697,79 +806,70 @@ class UniversiteTopContribView(generics.GenericAPIView):
 
 
 class UniversiteUserSearchView(generics.ListAPIView):
+    """
+    GET /<slug>/users/search/?q=dup
+    Autocomplétion : 20 membres au plus, classés par pertinence (users/search.py).
+    """
     serializer_class = UserSerializer
     permission_classes = [permissions.IsAuthenticated]
+    pagination_class = None
+
+    def get_serializer_context(self):
+        context = super().get_serializer_context()
+        context["universite_id"] = self.universite.pk
+        return context
 
     def get_queryset(self):
-        univ = get_object_or_404(Universite, slug=self.kwargs["univ_slug"])
-        q = self.request.GET.get("q", "")
-        if len(q) < 2:
+        self.universite = get_universite_or_404(self.kwargs["univ_slug"], self.request)
+        qs = rechercher(membres_de(User.objects.all(), self.universite), self.request.GET.get("q", ""))
+        if qs is None:
             return User.objects.none()
-        return (
-            User.objects.filter(roles_univ__universite=univ)
-            .filter(Q(nom__icontains=q) | Q(prenom__icontains=q) | Q(email__icontains=q))
-            .distinct()[:20]
-        )
+        return qs[:20]
+
+
+class AnnuairePagination(pagination.CursorPagination):
+    ordering = ("nom_recherche", "id")
+    page_size = 50
+    page_size_query_param = "page_size"
+    max_page_size = 200
 
 
 class UniversiteAnnuaireView(generics.ListAPIView):
+    """
+    GET /<slug>/users/annuaire/[?q=...]
+    Membres actifs par ordre alphabétique, paginés par curseur.
+    """
     serializer_class = UserSerializer
     permission_classes = [permissions.AllowAny]
+    pagination_class = AnnuairePagination
+
+    def get_serializer_context(self):
+        context = super().get_serializer_context()
+        context["universite_id"] = self.universite.pk
+        return context
 
     def get_queryset(self):
-        univ = get_object_or_404(Universite, slug=self.kwargs["univ_slug"])
-        return User.objects.filter(roles_univ__universite=univ, is_active=True).distinct()
+        self.universite = get_universite_or_404(self.kwargs["univ_slug"], self.request)
+        qs = membres_de(User.objects.filter(is_active=True), self.universite)
+        q = self.request.GET.get("q")
+        if q:
+            # Filtre seul : l'ordre alphabétique du curseur prime sur le classement
+            resultats = rechercher(qs, q)
+            qs = qs.none() if resultats is None else resultats
+        return qs
 
 
 from django.db.models import Count, Q
 from django.utils import timezone
-from dateutil.relativedelta import relativedelta
 
 
 class UniversiteUsersStatsView(generics.GenericAPIView):
     permission_classes =  [permissions.AllowAny] 
 
     def get(self, request, *args, **kwargs):
-        univ = get_object_or_404(Universite, slug=kwargs["univ_slug"])
-
-        # 1. répartition par rôle
-        role_counts = (
-            RoleUniversite.objects.filter(universite=univ)
-            .values("role")
-            .annotate(total=Count("id"))
-            .order_by("-total")
-        )
-
-        # 2. évolution mensuelle (12 derniers mois)
-        monthly = []
-        today = timezone.now().date()
-        for i in range(12):
-            start = today - relativedelta(months=i + 1)
-            end = today - relativedelta(months=i)
-            count = RoleUniversite.objects.filter(
-                universite=univ, created_at__date__gte=start, created_at__date__lt=end
-            ).count()
-            monthly.append({"month": start.strftime("%Y-%m"), "new_members": count})
-
-        # 3. actif / inactif
-        members = User.objects.filter(roles_univ__universite=univ).distinct()
-        active_count = members.filter(is_active=True).count()
-        inactive_count = members.filter(is_active=False).count()
-        memoires=Memoire.objects.filter(universites=univ).distinct()
-
-        return Response(
-            {
-                "universite": univ.nom,
-                "total_membres": members.count(),
-                "actif": active_count,
-                "inactif": inactive_count,
-                "total_memoires": memoires.count(),
-                "repartition_roles": {r["role"]: r["total"] for r in role_counts},
-                "evolution_mensuelle": list(
-                    reversed(monthly)
-                ),  # du plus ancien au plus récent
-            }
-        )
+        univ = get_universite_or_404(kwargs["univ_slug"], request)
+        # Requêtes groupées + cache court (universites/stats.py)
+        return Response(stats_membres(univ))
 
 
 # users/views.py
@@ -786,6 +886,7 @@ class BulkCodesSerializer(serializers.Serializer):
 
 class UniversiteBulkCodesView(generics.CreateAPIView):
     permission_classes = [IsAdminInUniversite]
+    throttle_scope = "invitations"
     serializer_class = BulkCodesSerializer
 
     def create(self, request, *args, **kwargs):
@@ -793,7 +894,7 @@ class UniversiteBulkCodesView(generics.CreateAPIView):
         serializer.is_valid(raise_exception=True)
         nb = serializer.validated_data["nb"]
         role = serializer.validated_data["role"]
-        univ = get_object_or_404(Universite, slug=kwargs["univ_slug"])
+        univ = get_universite_or_404(kwargs["univ_slug"], request)
 
         codes_clear = []  # versions claires pour l’admin
         for _ in range(nb):
@@ -848,7 +949,8 @@ class UpdateRoleView(generics.UpdateAPIView):
 # users/views.py
 import csv
 import json
-from datetime import timedelta
+import zlib
+from datetime import date, datetime, time, timedelta
 from django.utils import timezone
 from django.http import HttpResponse
 from django.shortcuts import get_object_or_404
@@ -856,10 +958,14 @@ from django.db.models import Count, Q
 from rest_framework import generics, permissions, filters, status, pagination
 from rest_framework.response import Response
 from rest_framework.views import APIView
+from rest_framework.exceptions import ValidationError
 from django_filters import rest_framework as df_filters
 from django_filters.filters import CharFilter, DateFromToRangeFilter, ChoiceFilter
 
 from .models import AuditLog, CustomUser
+from .audit_rollups import comptes_par_action, tableau_de_bord
+from .pagination import AuditLogCursorPagination
+from .search import PREFIX_MAX
 from universites.models import Universite
 from .permissions import IsAdminInUniversite, IsSuperAdminInUniversite
 from .serializers import (
@@ -884,7 +990,9 @@ class AuditLogFilter(df_filters.FilterSet):
         field_name='severity',
         lookup_expr='exact'
     )
-    user_email = CharFilter(field_name='user_email', lookup_expr='icontains')
+    # Colonne normalisée indexée (université, email, date) : préfixe ou adresse exacte
+    user_email = CharFilter(method='filter_user_email_prefix')
+    user_email_exact = CharFilter(method='filter_user_email_exact')
     target_type = CharFilter(field_name='target_type', lookup_expr='exact')
     target_id = CharFilter(field_name='target_id', lookup_expr='exact')
     created_at = DateFromToRangeFilter(field_name='created_at')
@@ -892,14 +1000,20 @@ class AuditLogFilter(df_filters.FilterSet):
     class Meta:
         model = AuditLog
         fields = ['action', 'severity', 'user_email', 'target_type', 'target_id', 'created_at']
+    
+    def filter_user_email_prefix(self, queryset, name, value):
+        return filtrer_email(queryset, value)
+    
+    def filter_user_email_exact(self, queryset, name, value):
+        return queryset.filter(user_email_norm=value.strip().lower())
 
 
-# ============ PAGINATION ============
-
-class CustomAuditLogPagination(pagination.PageNumberPagination):
-    page_size = 50
-    page_size_query_param = 'page_size'
-    max_page_size = 200
+def filtrer_email(queryset, value):
+    """Préfixe sur user_email_norm en intervalle (index B-tree, tous moteurs)."""
+    prefixe = value.strip().lower()
+    if not prefixe:
+        return queryset
+    return queryset.filter(user_email_norm__gte=prefixe, user_email_norm__lt=prefixe + PREFIX_MAX)
 
 
 # ============ VUES ============
@@ -908,45 +1022,54 @@ class UniversiteAuditLogListView(generics.ListAPIView):
     """
     GET /<slug:univ_slug>/audit-logs/
     
-    Liste paginée des logs d'audit de l'université.
+    Liste des logs d'audit de l'université, paginée par curseur sur
+    (created_at, id) : ?cursor=… (liens next/previous), ?ordering=created_at
+    pour l'ordre chronologique. « count » est estimé au-delà de 1000 logs
+    (count_is_estimate), cf. users/pagination.py.
     """
     serializer_class = AuditLogListSerializer
     permission_classes = [IsAdminInUniversite]
+    stateless_auth = True
     filter_backends = [
         filters.SearchFilter,
-        filters.OrderingFilter,
         df_filters.DjangoFilterBackend,
     ]
     filterset_class = AuditLogFilter
     search_fields = ['user_email', 'target_repr', 'description', 'target_id']
-    ordering_fields = ['created_at', 'severity', 'action', 'user_email']
-    ordering = ['-created_at']
-    pagination_class = CustomAuditLogPagination
+    pagination_class = AuditLogCursorPagination
     
     def get_queryset(self):
         univ_slug = self.kwargs['univ_slug']
-        univ = get_object_or_404(Universite, slug=univ_slug)
+        univ = get_universite_or_404(univ_slug, self.request)
         
         # CORRECTION: Retirer select_related('user') car pas de FK User
         # Seulement select_related('university') car c'est la seule FK
         return AuditLog.objects.filter(
             university=univ
-        ).select_related('university').order_by('-created_at')
+        ).select_related('university')
 
 
 class UniversiteAuditLogDetailView(generics.RetrieveAPIView):
     """
     GET /<slug:univ_slug>/audit-logs/<int:pk>/
     
-    Détail complet d'un log spécifique.
+    Détail complet d'un log spécifique. previous_data / new_data : diff stocké
+    (payload_format "diff") ; ?full=1 : états complets reconstruits à partir
+    des logs précédents de la même cible.
     """
     serializer_class = AuditLogDetailSerializer
     permission_classes = [IsAdminInUniversite]
+    stateless_auth = True
     lookup_url_kwarg = 'pk'
     
+    def get_serializer_context(self):
+        context = super().get_serializer_context()
+        context['reconstruire'] = self.request.query_params.get('full') in ('1', 'true')
+        return context
+    
     def get_queryset(self):
         univ_slug = self.kwargs['univ_slug']
-        univ = get_object_or_404(Universite, slug=univ_slug)
+        univ = get_universite_or_404(univ_slug, self.request)
         # CORRECTION: Pas de select_related('user')
         return AuditLog.objects.filter(university=univ).select_related('university')
 
@@ -955,79 +1078,25 @@ class UniversiteAuditLogStatsView(APIView):
     """
     GET /<slug:univ_slug>/audit-logs/stats/
     
-    Statistiques des actions d'audit pour le dashboard.
+    Statistiques des actions d'audit pour le dashboard, lues dans les
+    agrégats journaliers (users/audit_rollups.py) : 4 requêtes quel que soit l'historique.
     """
     permission_classes = [IsAdminInUniversite]
+    stateless_auth = True
     
     def get(self, request, univ_slug):
-        univ = get_object_or_404(Universite, slug=univ_slug)
-        
-        # Base queryset pour cette université
-        base_qs = AuditLog.objects.filter(university=univ)
-        
-        # Périodes
-        today = timezone.now().date()
-        week_ago = timezone.now() - timedelta(days=7)
-        month_ago = timezone.now() - timedelta(days=30)
+        univ = get_universite_or_404(univ_slug, request)
         
-        # Stats globales
-        total_logs = base_qs.count()
-        today_logs = base_qs.filter(created_at__date=today).count()
-        this_week_logs = base_qs.filter(created_at__gte=week_ago).count()
-        this_month_logs = base_qs.filter(created_at__gte=month_ago).count()
-        critical_logs = base_qs.filter(severity=AuditLog.Severity.CRITICAL).count()
-        
-        # Distribution par action (top 10)
-        actions_distribution = list(
-            base_qs.values('action')
-            .annotate(count=Count('id'))
-            .order_by('-count')[:10]
-        )
-        
-        # Distribution par sévérité
-        severity_distribution = list(
-            base_qs.values('severity')
-            .annotate(count=Count('id'))
-            .order_by('-severity')
-        )
-        
-        # Évolution quotidienne (30 derniers jours)
-        # CORRECTION: Utiliser TruncDate au lieu de extra() pour plus de portabilité
-        from django.db.models.functions import TruncDate
-        daily_evolution = list(
-            base_qs.filter(created_at__gte=month_ago)
-            .annotate(date=TruncDate('created_at'))
-            .values('date')
-            .annotate(count=Count('id'))
-            .order_by('date')
-        )
-        
-        # Top utilisateurs actifs
-        top_active_users = list(
-            base_qs.filter(created_at__gte=month_ago)
-            .values('user_email', 'user_role')
-            .annotate(count=Count('id'))
-            .order_by('-count')[:10]
-        )
+        # Compteurs, distributions et évolution lus dans les agrégats journaliers
+        stats = tableau_de_bord(univ)
         
         # Actions critiques récentes (5 dernières)
         # CORRECTION: Pas de select_related('user')
-        recent_critical = base_qs.filter(
-            severity=AuditLog.Severity.CRITICAL
+        recent_critical = AuditLog.objects.filter(
+            university=univ, severity=AuditLog.Severity.CRITICAL
         )[:5]
         
-        serializer = AuditLogStatsSerializer({
-            'total_logs': total_logs,
-            'today_logs': today_logs,
-            'this_week_logs': this_week_logs,
-            'this_month_logs': this_month_logs,
-            'critical_logs': critical_logs,
-            'actions_distribution': actions_distribution,
-            'severity_distribution': severity_distribution,
-            'daily_evolution': daily_evolution,
-            'top_active_users': top_active_users,
-            'recent_critical': recent_critical,
-        })
+        serializer = AuditLogStatsSerializer({**stats, 'recent_critical': recent_critical})
         
         return Response(serializer.data)
 
@@ -1041,17 +1110,15 @@ class UniversiteAuditLogActionsView(APIView):
     permission_classes = [IsAdminInUniversite]
     
     def get(self, request, univ_slug):
-        univ = get_object_or_404(Universite, slug=univ_slug)
+        univ = get_universite_or_404(univ_slug, request)
         
-        # Actions présentes dans les logs de cette université
-        present_actions = AuditLog.objects.filter(
-            university=univ
-        ).values_list('action', flat=True).distinct()
+        # Actions présentes et nombre de logs par action : une requête sur les agrégats
+        action_counts = comptes_par_action(univ)
         
         actions = [
             {'value': action.value, 'label': action.label}
             for action in AuditLog.ActionType
-            if action.value in present_actions
+            if action.value in action_counts
         ]
         
         severities = [
@@ -1059,35 +1126,57 @@ class UniversiteAuditLogActionsView(APIView):
             for sev in AuditLog.Severity
         ]
         
-        # Stats par action pour indication visuelle
-        action_counts = list(
-            AuditLog.objects.filter(university=univ)
-            .values('action')
-            .annotate(count=Count('id'))
-        )
-        
         serializer = AuditLogActionsChoicesSerializer({
             'actions': actions,
             'severities': severities,
-            'action_counts': {item['action']: item['count'] for item in action_counts},
+            'action_counts': action_counts,
         })
         
         return Response(serializer.data)
 
 
+_ACTIONS = dict(AuditLog.ActionType.choices)
+_SEVERITES = dict(AuditLog.Severity.choices)
+
+AUDIT_EXPORT_COLUMNS = [
+    Column('id', 'ID'),
+    Column('date', 'Date', field='created_at', format=lambda d: d.strftime('%Y-%m-%d %H:%M:%S')),
+    Column('action', 'Action', format=lambda v: _ACTIONS.get(v, v)),
+    Column('severity', 'Sévérité', format=lambda v: _SEVERITES.get(v, v)),
+    Column('user_email', 'Utilisateur Email'),
+    Column('user_role', 'Utilisateur Rôle'),
+    Column('target_type', 'Type Cible'),
+    Column('target_id', 'ID Cible'),
+    Column('target_repr', 'Représentation Cible'),
+    Column('description', 'Description'),
+    Column('ip_address', 'IP Address'),
+    Column('previous_data', 'Données Précédentes', field='previous_data_json', raw_json=True),
+    Column('new_data', 'Nouvelles Données', field='new_data_json', raw_json=True),
+    Column('payload_format', 'Format Données'),
+    # Logs compressés (AUDIT_PAYLOAD_COMPRESS) : {"previous": …, "new": …}
+    Column('payload', 'Données Compressées', field='payload_zlib',
+           format=lambda b: zlib.decompress(bytes(b)).decode('utf-8'), raw_json=True),
+]
+
+
+def _debut_jour(texte):
+    """« 2026-10-19 » → minuit (fuseau courant), aware."""
+    return timezone.make_aware(datetime.combine(date.fromisoformat(texte), time.min))
+
+
 class UniversiteAuditLogExportCSVView(APIView):
     """
     GET /<slug:univ_slug>/audit-logs/export/csv/
     
-    Export CSV des logs de l'université.
+    Export des logs de l'université en flux (CSV ou JSONL, gzip, colonnes,
+    reprise ?after_id=) : cf. users/exports.py.
     """
     permission_classes = [IsSuperAdminInUniversite]
     
     def get(self, request, univ_slug):
-        univ = get_object_or_404(Universite, slug=univ_slug)
+        univ = get_universite_or_404(univ_slug, request)
         
-        # CORRECTION: Pas de select_related('user')
-        logs = AuditLog.objects.filter(university=univ).select_related('university')
+        logs = AuditLog.objects.filter(university=univ)
         
         # Appliquer les filtres si présents
         action = request.query_params.get('action')
@@ -1101,39 +1190,22 @@ class UniversiteAuditLogExportCSVView(APIView):
         if severity:
             logs = logs.filter(severity=severity)
         if user_email:
-            logs = logs.filter(user_email__icontains=user_email)
-        if date_from:
-            logs = logs.filter(created_at__date__gte=date_from)
-        if date_to:
-            logs = logs.filter(created_at__date__lte=date_to)
-        
-        # Création CSV
-        response = HttpResponse(content_type='text/csv')
-        response['Content-Disposition'] = f'attachment; filename="audit_logs_{univ.slug}_{timezone.now().date()}.csv"'
-        
-        writer = csv.writer(response)
-        writer.writerow([
-            'Date', 'Action', 'Sévérité',
-            'Utilisateur Email', 'Utilisateur Rôle',
-            'Type Cible', 'ID Cible', 'Représentation Cible',
-            'Description', 'IP Address',
-            'Données Précédentes', 'Nouvelles Données'
-        ])
-        
-        for log in logs:
-            writer.writerow([
-                log.created_at.strftime('%Y-%m-%d %H:%M:%S'),
-                log.get_action_display(),
-                log.get_severity_display(),
-                log.user_email,
-                log.user_role,
-                log.target_type,
-                log.target_id,
-                log.target_repr,
-                log.description,
-                log.ip_address,
-                json.dumps(log.previous_data, ensure_ascii=False) if log.previous_data else '',
-                json.dumps(log.new_data, ensure_ascii=False) if log.new_data else '',
-            ])
+            logs = filtrer_email(logs, user_email)
+        # Plage demi-ouverte en timestamp : index et élagage des partitions d'audit
+        try:
+            if date_from:
+                logs = logs.filter(created_at__gte=_debut_jour(date_from))
+            if date_to:
+                logs = logs.filter(created_at__lt=_debut_jour(date_to) + timedelta(days=1))
+        except ValueError:
+            raise ValidationError({"created_at": "Dates attendues au format AAAA-MM-JJ."})
         
-        return response
\ No newline at end of file
+        # Flux CSV/JSONL : JSON renvoyé tel quel par la base, libellés par dictionnaire
+        logs = logs.annotate(
+            previous_data_json=Cast('previous_data', TextField()),
+            new_data_json=Cast('new_data', TextField()),
+        )
+        return StreamingExport(
+            logs, AUDIT_EXPORT_COLUMNS,
+            filename=f"audit_logs_{univ.slug}_{timezone.now().date()}",
+        ).response(request)